@@ -0,0 +1,124 @@
+"""
+Benchmarks the single-pass arXiv listing parser against the previous
+BeautifulSoup implementation over saved listing fixtures.
+
+    python benchmarks/bench_listing_parser.py [--entries 600] [--repeat 5] [fixture.html ...]
+
+Each fixture's new-submission entries are replicated (with unique ids) up to
+--entries to approximate a full daily /list/cs/new page.
+"""
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from vibe.listing_parser import parse_listing  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def legacy_parse(html):
+    """
+    The BeautifulSoup parser previously used by fetch_arxiv_list.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    articles = []
+    dl = soup.find("dl")
+    dts = dl.find_all("dt")
+    dds = dl.find_all("dd")
+    for dt, dd in zip(dts, dds):
+        id_link = dt.find("a", title="Abstract")
+        if not id_link:
+            continue
+        pdf_link = dt.find("a", title="Download PDF")
+        title_div = dd.find("div", class_="list-title")
+        abstract_div = dd.find("p", class_="mathjax")
+        articles.append({
+            "id": id_link.text.strip(),
+            "title": title_div.text.replace("Title:", "").strip() if title_div else "No title",
+            "abstract": abstract_div.text.strip() if abstract_div else "No abstract",
+            "pdf_url": "https://arxiv.org" + pdf_link["href"] if pdf_link else None,
+        })
+    return articles
+
+
+def scale_fixture(html, entries):
+    """
+    Replicates the <dt>/<dd> pairs of the first <dl> until it holds `entries` items.
+    """
+    start = html.index("<dl")
+    end = html.index("</dl>", start)
+    blocks = re.findall(r"<dt>.*?</dd>", html[start:end], re.DOTALL)
+    if not blocks:
+        return html
+    copies = []
+    for k in range(entries):
+        block = blocks[k % len(blocks)]
+        copies.append(re.sub(r"\d{4}\.\d{5}", lambda m: f"9{k // 100000:03d}.{k % 100000:05d}", block))
+    first_dt = html.index("<dt>", start)
+    return html[:first_dt] + "\n".join(copies) + "\n" + html[end:]
+
+
+def best_time(func, arg, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def _norm(text):
+    return " ".join(text.split()) if isinstance(text, str) else text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark arXiv listing parsers.")
+    parser.add_argument("fixtures", nargs="*", help="Saved listing HTML files (default: benchmarks/fixtures/*.html).")
+    parser.add_argument("--entries", type=int, default=600, help="Entries per scaled fixture.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions; the best run is reported.")
+    args = parser.parse_args()
+
+    try:
+        import bs4  # noqa: F401
+        have_bs4 = True
+    except ImportError:
+        have_bs4 = False
+        print("beautifulsoup4 is not installed; only the new parser is timed.")
+
+    paths = args.fixtures or sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html")))
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            html = scale_fixture(f.read(), args.entries)
+
+        new_time, (_, entries) = best_time(parse_listing, html, args.repeat)
+        new_entries = [e for e in entries if e["announce_type"] == "new"]
+        print(f"{os.path.basename(path)}: {len(html) / 1024:.0f} KiB, {len(entries)} entries")
+        print(f"  single-pass parser: {new_time * 1000:8.1f} ms")
+        if not have_bs4:
+            continue
+
+        old_time, old_entries = best_time(legacy_parse, html, args.repeat)
+        print(f"  BeautifulSoup:      {old_time * 1000:8.1f} ms")
+        print(f"  speedup:            {old_time / new_time:8.1f}x")
+
+        fields = ("id", "title", "abstract", "pdf_url")
+        mismatches = sum(
+            1 for old, new in zip(old_entries, new_entries)
+            if any(_norm(old[k]) != _norm(new[k]) for k in fields)
+        )
+        if mismatches or len(old_entries) != len(new_entries):
+            print(f"  MISMATCH: {mismatches} differing entries, {len(old_entries)} vs {len(new_entries)} parsed")
+            sys.exit(1)
+        print(f"  outputs match for {len(new_entries)} new submissions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Offline end-to-end benchmark of the vibe pipeline. A fake arXiv server,
+an OpenAI-compatible stub LLM and a stub TTS engine stand in for the
+network services and Kokoro; PDF download, Docling conversion, the
+orchestrator and ffmpeg encoding run for real against a fresh cache.
+
+    python benchmarks/bench_pipeline.py [--jobs 4] [--concurrency 2] [--entries 200] [--stream]
+                                        [--baseline benchmarks/baseline.json] [--save-baseline]
+
+Reports per-stage and end-to-end latency, job throughput and peak RSS; with
+--stream, reports are streamed (LLM tokens into sentence-by-sentence speech)
+and the time to the first MP3 byte is reported as well. With
+--baseline, metrics more than --tolerance worse than the stored baseline are
+reported as regressions and the script exits with status 1. Timings only
+compare on the machine and settings they were recorded with, so no baseline
+is committed: a missing baseline, or one recorded elsewhere or with other
+settings, exits with status 2 unless --no-baseline is given.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import statistics
+import concurrent.futures
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FakeArxivServer, StubLLMServer, make_stub_tts_engine  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Differences below this many seconds are treated as noise when comparing to the baseline.
+MIN_SECONDS_DELTA = 0.05
+# Exit status when there is no baseline the results can be compared with.
+BASELINE_UNUSABLE = 2
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def run_benchmark(args):
+    workdir = tempfile.mkdtemp(prefix="vibe-bench-")
+    llm = StubLLMServer(latency=args.llm_latency, tokens_per_second=args.llm_tps).start()
+    arxiv = FakeArxivServer(entries=args.entries, pdf_delay=args.pdf_delay).start()
+
+    # vibe reads its configuration at import time, so point it at the stand-ins first.
+    os.environ["VIBE_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["VIBE_LLM_CONFIG"] = llm.write_config(os.path.join(workdir, "llm_config.toml"))
+    os.environ["DOWNLOAD_MIN_INTERVAL"] = "0"
+
+    from vibe import tts
+    from vibe.metrics import run_report
+    from vibe.orchestrator import build_report_segments, stream_report_sentences
+
+    tts._engine = make_stub_tts_engine()
+    first_audio = []
+
+    def job(index):
+        started = time.time()
+        user_info = f"Benchmark listener {index}: machine learning, language models and agents"
+        output = os.path.join(workdir, f"job{index}.mp3")
+        if args.stream:
+            sentences = stream_report_sentences(user_info, arxiv_url=arxiv.listing_url, max_articles=args.max_articles)
+            with open(output, "wb") as f:
+                for data in tts.get_engine().stream_mp3(sentences):
+                    if f.tell() == 0:
+                        first_audio.append(time.time() - started)
+                    f.write(data)
+            return time.time() - started
+        segments = build_report_segments(user_info, arxiv_url=arxiv.listing_url, max_articles=args.max_articles)
+        tts.segments_to_speech(segments, output)
+        return time.time() - started
+
+    with run_report() as report:
+        started = time.time()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            latencies = list(executor.map(job, range(args.jobs)))
+        wall = time.time() - started
+    data = report.to_dict()
+    llm.stop()
+    arxiv.stop()
+
+    stages = {
+        stage: {
+            "count": values["count"],
+            "mean_seconds": values["total_seconds"] / values["count"],
+            "max_seconds": values["max_seconds"],
+            "total_seconds": values["total_seconds"],
+        }
+        for stage, values in data["stages"].items()
+    }
+    return {
+        "config": {
+            "jobs": args.jobs, "concurrency": args.concurrency, "entries": args.entries,
+            "max_articles": args.max_articles, "llm_latency": args.llm_latency, "llm_tps": args.llm_tps,
+            "stream": args.stream,
+        },
+        "machine": {
+            "platform": platform.platform(), "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(), "python": platform.python_version(),
+        },
+        "end_to_end": {
+            "mean_seconds": statistics.mean(latencies),
+            "p50_seconds": _percentile(latencies, 0.5),
+            "p95_seconds": _percentile(latencies, 0.95),
+            "max_seconds": max(latencies),
+            "wall_seconds": wall,
+            "jobs_per_minute": args.jobs * 60 / wall,
+            "first_audio_p50_seconds": _percentile(first_audio, 0.5) if first_audio else None,
+        },
+        "stages": stages,
+        "llm": data["llm"],
+        "caches": data["caches"],
+        "peak_rss_mb": {
+            # ru_maxrss is in KiB on Linux; conversion workers and ffmpeg count as children.
+            "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        },
+        "requests": {"llm": llm.calls, **arxiv.requests},
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns human-readable regressions of results against baseline.
+    """
+    checks = [(("end_to_end", key), False)
+              for key in ("mean_seconds", "p95_seconds", "wall_seconds", "first_audio_p50_seconds")]
+    checks.append((("end_to_end", "jobs_per_minute"), True))
+    checks += [(("stages", stage, "mean_seconds"), False) for stage in baseline.get("stages", {})]
+    checks += [(("peak_rss_mb", "self"), False), (("peak_rss_mb", "children"), False)]
+
+    regressions = []
+    for path, higher_is_better in checks:
+        old, new = baseline, results
+        for key in path:
+            old = old.get(key, {}) if isinstance(old, dict) else {}
+            new = new.get(key, {}) if isinstance(new, dict) else {}
+        if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or not old:
+            continue
+        change = (new - old) / old
+        worse = change < -tolerance if higher_is_better else change > tolerance
+        if worse and (not path[-1].endswith("seconds") or abs(new - old) > MIN_SECONDS_DELTA):
+            regressions.append(f"{'.'.join(path)}: {old:.3f} -> {new:.3f} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the vibe pipeline.")
+    parser.add_argument("--jobs", type=int, default=4, help="Reports to generate.")
+    parser.add_argument("--concurrency", type=int, default=2, help="Reports generated at the same time.")
+    parser.add_argument("--entries", type=int, default=200, help="Articles in the fake listing.")
+    parser.add_argument("--max-articles", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub LLM seconds per call.")
+    parser.add_argument("--llm-tps", type=float, default=200.0, help="Stub LLM completion tokens per second.")
+    parser.add_argument("--pdf-delay", type=float, default=0.05, help="Fake arXiv seconds per PDF download.")
+    parser.add_argument("--stream", action="store_true", help="Stream reports instead of building them first.")
+    parser.add_argument("--output", type=str, default=None, help="Write the results JSON here.")
+    parser.add_argument("--baseline", type=str, default=DEFAULT_BASELINE, help="Baseline results to compare with.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline.")
+    parser.add_argument("--no-baseline", action="store_true", help="Only report; skip the baseline comparison.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before failing.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    e2e = results["end_to_end"]
+    print(f"{args.jobs} jobs, concurrency {args.concurrency}: mean {e2e['mean_seconds']:.2f}s, "
+          f"p95 {e2e['p95_seconds']:.2f}s, wall {e2e['wall_seconds']:.2f}s, {e2e['jobs_per_minute']:.1f} jobs/min")
+    if e2e["first_audio_p50_seconds"] is not None:
+        print(f"  first audio after {e2e['first_audio_p50_seconds']:.2f}s (p50)")
+    for stage, values in sorted(results["stages"].items()):
+        print(f"  {stage:<10} x{values['count']:<4} mean {values['mean_seconds']:7.3f}s  max {values['max_seconds']:7.3f}s")
+    llm = results["llm"]
+    print(f"  LLM: {llm['calls']} calls, {llm['prompt_tokens']} prompt / {llm['completion_tokens']} completion tokens")
+    print(f"  peak RSS: {results['peak_rss_mb']['self']:.0f} MiB (children {results['peak_rss_mb']['children']:.0f} MiB)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+    if args.no_baseline:
+        return
+    if not os.path.exists(args.baseline):
+        print(f"SKIPPED: no baseline at {args.baseline}; record one with `make bench-baseline` "
+              "or pass --no-baseline.")
+        sys.exit(BASELINE_UNUSABLE)
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    for section, what in (("config", "settings"), ("machine", "machine")):
+        if baseline.get(section) != results[section]:
+            print(f"SKIPPED: the baseline was recorded with a different {what}: "
+                  f"{baseline.get(section)} != {results[section]}.")
+            sys.exit(BASELINE_UNUSABLE)
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Measures startup cost: how long importing the vibe modules takes in a fresh
+interpreter, the wall time of `python -m vibe.main --help`, and first versus
+second call latency of the lazily created engines (LLM client, Docling
+converter, Kokoro TTS).
+
+    python benchmarks/bench_startup.py [--repeat 5] [--output startup.json]
+
+The LLM is the local stub from benchmarks/fakes.py; Docling and Kokoro are
+timed only when installed.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(BENCH_DIR, ".."))
+# Marks the child's result line; logging may write to stdout as well.
+RESULT_PREFIX = "RESULT "
+MODULES = ["vibe.llm", "vibe.converter", "vibe.tts", "vibe.orchestrator", "vibe.main", "vibe.server"]
+
+
+def _child_env():
+    env = dict(os.environ, PYTHONPATH=ROOT, VIBE_CACHE_DIR=tempfile.mkdtemp(prefix="vibe-startup-"))
+    env.pop("VIBE_WARMUP", None)
+    return env
+
+
+def time_import(module, repeat):
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], env=_child_env(), cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def time_help(repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "vibe.main", "--help"], env=_child_env(), cwd=ROOT,
+                       capture_output=True, check=True)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def _twice(func):
+    started = time.perf_counter()
+    func()
+    first = time.perf_counter() - started
+    started = time.perf_counter()
+    func()
+    return {"first_seconds": first, "second_seconds": time.perf_counter() - started}
+
+
+def first_request():
+    """
+    Runs in a child process: times the first and second use of each engine.
+    """
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, BENCH_DIR)
+    from fakes import StubLLMServer, make_paper
+
+    workdir = os.environ["VIBE_CACHE_DIR"]
+    llm_server = StubLLMServer(latency=0.0).start()
+    os.environ["VIBE_LLM_CONFIG"] = llm_server.write_config(os.path.join(workdir, "llm_config.toml"))
+    results = {}
+
+    from vibe.llm import chat_llm
+    calls = iter(range(1000))
+    results["llm"] = _twice(lambda: chat_llm(f"Summarize request {next(calls)}", use_cache=False))
+
+    try:
+        import docling  # noqa: F401
+    except ImportError:
+        results["docling"] = None
+    else:
+        from vibe.converter import _convert_pdf
+        pdf_path = os.path.join(workdir, "paper.pdf")
+        with open(pdf_path, "wb") as f:
+            f.write(make_paper("arXiv:2410.00001", sections=2, words_per_section=100))
+        results["docling"] = _twice(lambda: _convert_pdf(pdf_path))
+
+    try:
+        import kokoro  # noqa: F401
+    except ImportError:
+        results["tts"] = None
+    else:
+        from vibe.tts import get_engine
+        results["tts"] = _twice(lambda: list(get_engine().iter_audio("A short sentence to synthesize.")))
+
+    llm_server.stop()
+    print(RESULT_PREFIX + json.dumps(results), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure vibe import time and first-request latency.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement (median reported).")
+    parser.add_argument("--output", type=str, default=None, help="Write the results JSON here.")
+    parser.add_argument("--first-request", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.first_request:
+        first_request()
+        return
+
+    results = {"import_seconds": {}, "help_seconds": None, "first_request": None}
+    for module in MODULES:
+        results["import_seconds"][module] = time_import(module, args.repeat)
+        print(f"import {module:<18} {results['import_seconds'][module] * 1000:8.0f} ms")
+    results["help_seconds"] = time_help(args.repeat)
+    print(f"vibe.main --help          {results['help_seconds'] * 1000:8.0f} ms")
+
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--first-request"], env=_child_env(),
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    line = next(line for line in out.stdout.splitlines() if line.startswith(RESULT_PREFIX))
+    results["first_request"] = json.loads(line[len(RESULT_PREFIX):])
+    for engine, timing in results["first_request"].items():
+        if timing is None:
+            print(f"{engine:<8} not installed, skipped")
+        else:
+            print(f"{engine:<8} first call {timing['first_seconds']:7.2f}s, second call {timing['second_seconds']:7.2f}s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Local stand-ins used by the offline benchmarks: a fake arXiv listing/PDF
+server, an OpenAI-compatible stub LLM and a stub TTS engine.
+
+    python benchmarks/fakes.py --llm-port 8901 --arxiv-port 8902
+
+starts both servers in the foreground, e.g. to point a manually started
+vibe server at them (set VIBE_LLM_CONFIG to the printed config file and
+ARXIV_URL to the printed listing URL).
+"""
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_listing_parser import scale_fixture, FIXTURES_DIR  # noqa: E402
+
+WORDS = (
+    "model training data results method approach performance benchmark task network learning "
+    "evaluation baseline accuracy attention transformer language graph agent robust efficient"
+).split()
+
+
+def _words(count, seed):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def make_pdf(title, paragraphs, lines_per_page=48, width=90):
+    """
+    Builds a small text-only PDF (Helvetica, one content stream per page).
+    """
+    lines = [title, ""]
+    for paragraph in paragraphs:
+        words = paragraph.split()
+        line = ""
+        for word in words:
+            if len(line) + len(word) + 1 > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}".strip()
+        lines.extend([line, ""])
+    pages = [lines[i: i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+
+    def escape(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page_lines in pages:
+        stream = "BT /F1 11 Tf 14 TL 56 790 Td " + " ".join(f"({escape(line)}) Tj T*" for line in page_lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+def make_paper(article_id, sections=6, words_per_section=400):
+    """
+    Returns a deterministic fake paper for article_id as PDF bytes.
+    """
+    seed = zlib.crc32(article_id.encode("utf-8"))
+    paragraphs = []
+    for index, name in enumerate(["Abstract", "Introduction", "Method", "Experiments", "Results", "Conclusion"][:sections]):
+        paragraphs.append(f"{index + 1} {name}")
+        paragraphs.append(_words(words_per_section, seed + index))
+    paragraphs.append("References")
+    paragraphs.extend(f"[{i}] A. Author. {_words(8, seed + 100 + i)}. 2024." for i in range(1, 21))
+    return make_pdf(f"Paper {article_id}", paragraphs)
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeArxivServer:
+    """
+    Serves /list/cs/new built from the saved listing fixture scaled to
+    `entries` items, with PDF links pointing back at this server, and
+    /pdf/<id> as generated fake papers. `pdf_delay` simulates download time.
+    """
+
+    def __init__(self, entries=200, pdf_delay=0.0, port=0, fixture=None):
+        fixture = fixture or os.path.join(FIXTURES_DIR, "cs_new_sample.html")
+        with open(fixture, "r", encoding="utf-8") as f:
+            self._template = scale_fixture(f.read(), entries)
+        self.pdf_delay = pdf_delay
+        self.requests = {"listing": 0, "pdf": 0}
+        self._pdfs = {}
+        self._lock = threading.Lock()
+        self.httpd = _QuietServer(("127.0.0.1", port), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.listing_html = self._template.replace('href="/pdf/', f'href="{self.base_url}/pdf/')
+        self.listing_url = f"{self.base_url}/list/cs/new"
+
+    def _pdf(self, article_id):
+        with self._lock:
+            if article_id not in self._pdfs:
+                self._pdfs[article_id] = make_paper(article_id)
+            return self._pdfs[article_id]
+
+    def _handler(self):
+        server = self
+
+        class Handler(_Handler):
+            def do_GET(self):
+                if self.path.startswith("/list/"):
+                    server.requests["listing"] += 1
+                    body = server.listing_html.encode("utf-8")
+                    content_type = "text/html; charset=utf-8"
+                elif self.path.startswith("/pdf/"):
+                    server.requests["pdf"] += 1
+                    time.sleep(server.pdf_delay)
+                    body = server._pdf(self.path[len("/pdf/"):])
+                    content_type = "application/pdf"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="fake-arxiv", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StubLLMServer:
+    """
+    OpenAI-compatible /v1/chat/completions stub. Answers the relevance,
+    rerank and summary prompts of the pipeline deterministically: a
+    `relevant_ratio` share of articles is relevant, rankings follow a hash of
+    the id, and summaries are `summary_words` long. Each call takes
+    `latency` seconds plus completion tokens / `tokens_per_second`; streamed
+    requests ("stream": true) get the words as server-sent events at that rate.
+    """
+
+    def __init__(self, latency=0.2, tokens_per_second=200.0, relevant_ratio=0.2, summary_words=250, port=0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.relevant_ratio = relevant_ratio
+        self.summary_words = summary_words
+        self.calls = 0
+        self.httpd = _QuietServer(("127.0.0.1", port), self._handler())
+        self.api_base = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def answer(self, prompt):
+        ids = re.findall(r"^Article ID: (.+)$", prompt, re.MULTILINE)
+        if "determine if it is relevant" in prompt:
+            threshold = int(self.relevant_ratio * 1000)
+            return json.dumps({i: "yes" if zlib.crc32(i.encode("utf-8")) % 1000 < threshold else "no" for i in ids})
+        if '"ranking"' in prompt:
+            return json.dumps({"ranking": sorted(ids, key=lambda i: zlib.crc32(i.encode("utf-8")))})
+        words = _words(self.summary_words, zlib.crc32(prompt.encode("utf-8"))).split()
+        sentences = [" ".join(words[i: i + 15]) for i in range(0, len(words), 15)]
+        return "And now, " + ". ".join(s.capitalize() for s in sentences) + "."
+
+    def _handler(self):
+        server = self
+
+        class Handler(_Handler):
+            def do_POST(self):
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                prompt = "\n".join(m.get("content", "") for m in request.get("messages", []))
+                text = server.answer(prompt)
+                prompt_tokens, completion_tokens = len(prompt) // 4, len(text) // 4
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                         "total_tokens": prompt_tokens + completion_tokens}
+                server.calls += 1
+                if request.get("stream"):
+                    self._stream(request, text, usage)
+                    return
+                time.sleep(server.latency + completion_tokens / server.tokens_per_second)
+                body = json.dumps({
+                    "id": f"stub-{server.calls}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": text}}],
+                    "usage": usage,
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self, request, text, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                time.sleep(server.latency)
+
+                def send(delta, extra=None):
+                    event = {
+                        "id": f"stub-{server.calls}", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": request.get("model", "stub"),
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+                    }
+                    event.update(extra or {})
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                send({"role": "assistant", "content": ""})
+                for word in re.findall(r"\S+\s*", text):
+                    time.sleep(max(len(word) // 4, 1) / server.tokens_per_second)
+                    send({"content": word})
+                send({}, {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                if (request.get("stream_options") or {}).get("include_usage"):
+                    send({}, {"choices": [], "usage": usage})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def write_config(self, path):
+        """
+        Writes an llm_config.toml whose levels all point at this stub.
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            for level in ("low", "medium", "high"):
+                f.write(f'[llms.{level}]\nmodel = "openai/stub"\napi_base = "{self.api_base}"\napi_key = "stub"\n\n')
+        return path
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="stub-llm", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_stub_tts_engine(chars_per_second=150.0, realtime_factor=0.05):
+    """
+    Returns a TTSEngine whose synthesis produces a quiet tone instead of
+    running Kokoro: audio lasts len(text)/chars_per_second seconds and takes
+    realtime_factor of that to "synthesize". ffmpeg encoding is real.
+    """
+    from vibe.tts import TTSEngine, SAMPLE_RATE
+
+    class StubTTSEngine(TTSEngine):
+        @property
+        def model_id(self):
+            return "stub"
+
+        def load(self):
+            return None
+
+        def iter_audio(self, text):
+            with self._synth_lock:
+                for paragraph in [p for p in re.split(r"\n+", text) if p.strip()]:
+                    seconds = len(paragraph) / chars_per_second
+                    time.sleep(seconds * realtime_factor)
+                    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+                    yield (0.05 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+    # Kokoro is not available in TTS worker processes, so the stub always synthesizes in-process.
+    return StubTTSEngine(workers=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the fake arXiv server and stub LLM.")
+    parser.add_argument("--llm-port", type=int, default=8901)
+    parser.add_argument("--arxiv-port", type=int, default=8902)
+    parser.add_argument("--entries", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--llm-tps", type=float, default=200.0)
+    args = parser.parse_args()
+
+    llm = StubLLMServer(latency=args.llm_latency, tokens_per_second=args.llm_tps, port=args.llm_port).start()
+    arxiv = FakeArxivServer(entries=args.entries, port=args.arxiv_port).start()
+    config_path = llm.write_config(os.path.join(tempfile.gettempdir(), "vibe_stub_llm_config.toml"))
+    print(f"VIBE_LLM_CONFIG={config_path}")
+    print(f"ARXIV_URL={arxiv.listing_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,47 @@
+import os
+import sys
+import hashlib
+import subprocess
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 
+# Keep the tests (and the subprocesses they start) out of the real cache: the article
+# store and its new_only mark, listings, jobs. vibe.config reads this on import.
+_CACHE_DIR = tempfile.TemporaryDirectory(prefix="vibe-tests-")
+os.environ["VIBE_CACHE_DIR"] = _CACHE_DIR.name
+
 # Import modules from the vibe package
-from vibe.fetcher import fetch_arxiv_list
+from vibe.fetcher import fetch_arxiv_list, cached_arxiv_list
 from vibe.filter import batch_relevance_filter
 from vibe.rerank import rerank_articles
-from vibe.converter import fetch_and_convert_article
+from vibe.converter import fetch_and_convert_article, CONVERTER_VERSION
 from vibe.summarizer import generate_article_summary
 from vibe.orchestrator import process_articles
+from vibe.llm_cache import LLMCache
+from vibe.jobs import JobManager, QueueFullError
+from vibe.prefilter import prefilter_articles
+from vibe.listing_parser import parse_listing
+from vibe.downloader import PDFDownloader
+from vibe.article_store import ArticleStore
+from vibe.content import reduce_content
+from vibe.filter import make_batches
+from vibe.limits import AdaptiveLimiter
+from vibe.rerank import _rank_group
+from vibe.metrics import MetricsRegistry, run_report, span, record_llm_call, record_cache_lookup
+from vibe.filter import multi_profile_relevance_filter
+from vibe.orchestrator import build_profile_reports, SHARED_AUDIENCE
+from vibe.profiles import normalize_profiles
+from vibe.text_layer import assess_pages, pages_to_markdown
+from vibe.precompute import Precomputer
+from vibe.content import iter_sentences
+from vibe.llm import chat_llm_stream
+from vibe.orchestrator import iter_summary_sentences
+from vibe.tts import TTSEngine, split_shards, SAMPLE_RATE
+from vibe.config import TTS_PARAGRAPH_PAUSE
+from vibe.progress import ProgressChannel, ProgressHub
+from vibe.episode_cache import EpisodeCache, episode_key
+from vibe.worker_pool import IsolatedWorkerPool, WorkerError
 
 class TestVibeModules(unittest.TestCase):
 
@@ -29,47 +63,64 @@ class TestVibeModules(unittest.TestCase):
         """
         mock_get.return_value.status_code = 200
         mock_get.return_value.text = fake_html
+        mock_get.return_value.headers = {}
         articles = fetch_arxiv_list(force_refresh=True, arxiv_url="http://fakeurl")
         self.assertEqual(len(articles), 1)
         self.assertEqual(articles[0]["id"], "arXiv:1234.5678")
 
-    @patch("vibe.filter.requests.post")
-    def test_batch_relevance_filter(self, mock_post):
+    @patch("vibe.fetcher.requests.get")
+    def test_fetch_arxiv_list_conditional_refresh(self, mock_get):
+        fake_html = """
+        <dl>
+          <dt><a title="Abstract">arXiv:1234.5678</a></dt>
+          <dd><div class="list-title">Title: Test Article</div><p class="mathjax">Abstract.</p></dd>
+        </dl>
+        """
+        with tempfile.TemporaryDirectory() as tmpdir, patch("vibe.fetcher.LISTINGS_CACHE_DIR", tmpdir):
+            self.assertIsNone(cached_arxiv_list(arxiv_url="http://fakeurl/list/cs/new"))
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.text = fake_html
+            mock_get.return_value.headers = {"ETag": '"v1"'}
+            first = fetch_arxiv_list(arxiv_url="http://fakeurl/list/cs/new")
+
+            # Within LISTING_MAX_AGE the cached listing is served without a request.
+            self.assertEqual(fetch_arxiv_list(arxiv_url="http://fakeurl/list/cs/new"), first)
+            self.assertEqual(cached_arxiv_list(arxiv_url="http://fakeurl/list/cs/new"), first)
+            self.assertEqual(mock_get.call_count, 1)
+
+            mock_get.return_value.status_code = 304
+            second = fetch_arxiv_list(force_refresh=True, arxiv_url="http://fakeurl/list/cs/new")
+            self.assertEqual(second, first)
+            self.assertEqual(mock_get.call_args.kwargs["headers"]["If-None-Match"], '"v1"')
+
+    @patch("vibe.filter.chat_llm")
+    def test_batch_relevance_filter(self, mock_chat):
         # Simulate LLM response
-        fake_response = MagicMock()
-        fake_response.status_code = 200
-        fake_response.json.return_value = {"choices": [{"message": {"content": '{"arXiv:1234.5678": "yes"}'}}]}
-        mock_post.return_value = fake_response
+        mock_chat.return_value = '{"arXiv:1234.5678": "yes"}'
 
         articles = [{"id": "arXiv:1234.5678", "title": "Test", "abstract": "Test abstract"}]
         relevant_ids = batch_relevance_filter(articles, "dummy user")
         self.assertIn("arXiv:1234.5678", relevant_ids)
 
-    @patch("vibe.rerank.requests.post")
-    def test_rerank_articles(self, mock_post):
-        fake_response = MagicMock()
-        fake_response.status_code = 200
-        fake_response.json.return_value = {"choices": [{"message": {"content": '{"ranking": ["arXiv:1234.5678"]}'}}]}
-        mock_post.return_value = fake_response
+    @patch("vibe.rerank.chat_llm")
+    def test_rerank_articles(self, mock_chat):
+        mock_chat.return_value = '{"ranking": ["arXiv:1234.5678"]}'
 
         articles = [{"id": "arXiv:1234.5678", "title": "Test", "abstract": "Test abstract"}]
         ranked = rerank_articles(articles, "dummy user")
         self.assertEqual(ranked[0]["id"], "arXiv:1234.5678")
 
-    @patch("vibe.converter.requests.get")
-    def test_fetch_and_convert_article(self, mock_get):
+    @patch("vibe.converter.download_pdf")
+    def test_fetch_and_convert_article(self, mock_download):
         # This test will simulate a failure to download a PDF
         article = {"id": "arXiv:1234.5678", "pdf_url": "http://fakepdf", "title": "Test", "abstract": "Test abstract"}
-        mock_get.return_value.status_code = 404
+        mock_download.return_value = None
         content = fetch_and_convert_article(article)
         self.assertEqual(content, "")
 
-    @patch("vibe.summarizer.requests.post")
-    def test_generate_article_summary(self, mock_post):
-        fake_response = MagicMock()
-        fake_response.status_code = 200
-        fake_response.json.return_value = {"choices": [{"message": {"content": "Summary text"}}]}
-        mock_post.return_value = fake_response
+    @patch("vibe.summarizer.chat_llm")
+    def test_generate_article_summary(self, mock_chat):
+        mock_chat.return_value = "Summary text"
         summary = generate_article_summary({"id": "arXiv:1234.5678", "title": "Test"}, "content", "dummy user")
         self.assertEqual(summary, "Summary text")
 
@@ -96,8 +147,947 @@ class TestVibeModules(unittest.TestCase):
         mock_convert.return_value = "Converted content"
         mock_summary.return_value = "Final summary"
 
-        summary = process_articles("dummy user", max_articles=1)
+        # One-argument callbacks keep working; structured progress fields are dropped for them.
+        messages = []
+        summary = process_articles("dummy user", max_articles=1, trace_callback=messages.append)
         self.assertIn("Final summary", summary)
+        self.assertIn("Generated summary for article arXiv:1234.5678.", messages)
+
+    @patch("vibe.orchestrator.fetch_arxiv_list")
+    @patch("vibe.orchestrator.batch_relevance_filter")
+    @patch("vibe.orchestrator.rerank_articles")
+    @patch("vibe.orchestrator.fetch_and_convert_article")
+    @patch("vibe.orchestrator.generate_article_summary")
+    def test_process_articles_keeps_rerank_order(self, mock_summary, mock_convert, mock_rerank, mock_filter, mock_fetch):
+        articles = [
+            {"id": f"arXiv:1234.000{i}", "title": f"Article {i}", "abstract": "", "pdf_url": "http://fakepdf"}
+            for i in range(3)
+        ]
+        mock_fetch.return_value = articles
+        mock_filter.return_value = {a["id"] for a in articles}
+        mock_rerank.return_value = list(reversed(articles))
+        mock_convert.side_effect = lambda article: f"content of {article['title']}"
+        mock_summary.side_effect = lambda article, content, *args: f"summary of {article['title']}"
+
+        summary = process_articles("dummy user", max_articles=3)
+        positions = [summary.index(f"summary of Article {i}") for i in (2, 1, 0)]
+        self.assertEqual(positions, sorted(positions))
+
+class TestLLMCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "llm_cache.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_roundtrip_and_counters(self):
+        cache = LLMCache(self.path, max_bytes=0, max_age=0)
+        key = cache.make_key("model", "http://base", "medium", "prompt")
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "answer")
+        self.assertEqual(cache.get(key), "answer")
+        self.assertNotEqual(key, cache.make_key("model", "http://base", "high", "prompt"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+
+    def test_size_eviction_drops_least_recently_used(self):
+        cache = LLMCache(self.path, max_bytes=10, max_age=0)
+        cache.put("a", "12345")
+        cache.put("b", "12345")
+        cache.get("a")
+        cache.put("c", "12345")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "12345")
+        self.assertEqual(cache.get("c"), "12345")
+
+class TestListingParser(unittest.TestCase):
+
+    def test_extracts_metadata_and_pairs_entries_robustly(self):
+        html = """
+        <dl>
+          <h3>New submissions (showing 2 of 2 entries)</h3>
+          <dt><a title="Abstract">arXiv:2410.00001</a></dt>
+          <dt><a title="Abstract">arXiv:2410.00002</a> <a title="Download PDF" href="/pdf/2410.00002"></a></dt>
+          <dd>
+            <div class="list-title mathjax"><span class="descriptor">Title:</span> Second &amp; Last</div>
+            <div class="list-authors"><a href="#">Ada Lovelace</a>, <a href="#">Alan Turing</a></div>
+            <div class="list-subjects"><span class="descriptor">Subjects:</span>
+              <span class="primary-subject">Machine Learning (cs.LG)</span>; Sound (cs.SD)</div>
+            <p class="mathjax">An abstract.</p>
+          </dd>
+        </dl>
+        <dl>
+          <h3>Cross submissions (showing 1 of 1 entries)</h3>
+          <dt><a title="Abstract">arXiv:2410.00003</a></dt>
+          <dd><div class="list-title">Title: Crossed</div></dd>
+        </dl>
+        """
+        found, entries = parse_listing(html)
+        self.assertTrue(found)
+        self.assertEqual([e["id"] for e in entries], ["arXiv:2410.00001", "arXiv:2410.00002", "arXiv:2410.00003"])
+        self.assertEqual(entries[0]["title"], "No title")
+        second = entries[1]
+        self.assertEqual(second["title"], "Second & Last")
+        self.assertEqual(second["authors"], ["Ada Lovelace", "Alan Turing"])
+        self.assertEqual(second["primary_subject"], "Machine Learning (cs.LG)")
+        self.assertEqual(second["pdf_url"], "https://arxiv.org/pdf/2410.00002")
+        self.assertEqual(entries[2]["announce_type"], "cross")
+
+
+class TestPDFDownloader(unittest.TestCase):
+
+    def _response(self, status, chunks=()):
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.status_code = status
+        response.headers = {}
+        response.iter_content.return_value = iter(chunks)
+        return response
+
+    def test_streams_to_content_addressed_cache_and_retries(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            downloader = PDFDownloader(tmpdir, min_interval=0, retries=2)
+            downloader.session = MagicMock()
+            downloader.session.get.side_effect = [
+                self._response(503),
+                self._response(200, [b"%PDF-1.4 ", b"body"]),
+            ]
+            with patch("vibe.downloader.time.sleep"):
+                path = downloader.download("http://host/pdf/1")
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"%PDF-1.4 body")
+            self.assertEqual(os.path.basename(path), hashlib.sha256(b"%PDF-1.4 body").hexdigest() + ".pdf")
+            # A second request is served from the cache.
+            self.assertEqual(downloader.download("http://host/pdf/1"), path)
+            self.assertEqual(downloader.session.get.call_count, 2)
+
+    def test_eviction_drops_shared_files_with_all_their_urls_but_spares_recent_ones(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            downloader = PDFDownloader(tmpdir, max_bytes=10, min_interval=0)
+            downloader.session = MagicMock()
+            downloader.session.get.side_effect = lambda url, **kwargs: self._response(200, [url[-1].encode() * 10])
+            shared = downloader.download("http://host/x")
+            self.assertEqual(downloader.download("http://mirror/x"), shared)
+            # Over the limit, but just handed out: a conversion may be reading it.
+            other = downloader.download("http://host/y")
+            self.assertTrue(os.path.exists(shared))
+            os.utime(shared, (0, 0))
+            downloader.download("http://host/z")
+            self.assertFalse(os.path.exists(shared))
+            self.assertIsNone(downloader.cached_path("http://host/x"))
+            self.assertIsNone(downloader.cached_path("http://mirror/x"))
+            self.assertEqual(downloader.cached_path("http://host/y"), other)
+
+    def test_missing_pdf_is_not_retried(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            downloader = PDFDownloader(tmpdir, min_interval=0, retries=3)
+            downloader.session = MagicMock()
+            downloader.session.get.return_value = self._response(404)
+            self.assertIsNone(downloader.download("http://host/pdf/missing"))
+            self.assertEqual(downloader.session.get.call_count, 1)
+
+
+class TestArticleStore(unittest.TestCase):
+
+    def test_compressed_roundtrip_newest_id_and_legacy_import(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, "arXiv_2409.00099.txt"), "w", encoding="utf-8") as f:
+                f.write("legacy text")
+            store = ArticleStore(tmpdir)
+            self.assertEqual(store.get("arXiv:2409.00099"), "legacy text")
+            self.assertFalse(os.path.exists(os.path.join(tmpdir, "arXiv_2409.00099.txt")))
+
+            store.put("arXiv:2410.00002", "x" * 10000, converter_version="test")
+            store.put("arXiv:2410.00010", "newest")
+            self.assertEqual(store.get("arXiv:2410.00002"), "x" * 10000)
+            self.assertLess(store.stats()["stored_bytes"], store.stats()["bytes"])
+            self.assertEqual(store.newest_id(), "arXiv:2410.00010")
+
+    def test_tier_column_is_added_to_existing_stores(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            import sqlite3
+            conn = sqlite3.connect(os.path.join(tmpdir, "index.sqlite3"))
+            conn.execute(
+                "CREATE TABLE articles (id TEXT PRIMARY KEY, blob TEXT NOT NULL, codec TEXT NOT NULL,"
+                " size INTEGER NOT NULL, stored_size INTEGER NOT NULL, converter_version TEXT,"
+                " converted_at REAL NOT NULL, accessed_at REAL NOT NULL, sort_month INTEGER, sort_number INTEGER)"
+            )
+            conn.close()
+            store = ArticleStore(tmpdir)
+            store.put("arXiv:2410.00001", "text", tier="text")
+            self.assertEqual(store.metadata("arXiv:2410.00001")["tier"], "text")
+            self.assertEqual(store.stats()["tiers"], {"text": 1})
+
+    def test_lru_eviction(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = ArticleStore(tmpdir, max_bytes=1)
+            store.put("arXiv:2410.00001", "first")
+            store.put("arXiv:2410.00002", "second")
+            self.assertIsNone(store.get("arXiv:2410.00001"))
+            self.assertEqual(store.get("arXiv:2410.00002"), "second")
+
+    def test_other_converter_versions_are_a_miss(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = ArticleStore(tmpdir)
+            store.put("arXiv:2410.00001", "old conversion", converter_version="docling-1.0")
+            self.assertIsNone(store.get("arXiv:2410.00001", converter_versions=("docling-2.0",)))
+            self.assertEqual(store.get("arXiv:2410.00001"), "old conversion")
+            store.put("arXiv:2410.00001", "new conversion", converter_version="docling-2.0")
+            self.assertEqual(store.get("arXiv:2410.00001", converter_versions=("docling-2.0",)), "new conversion")
+
+
+class TestTextLayer(unittest.TestCase):
+
+    PAGE = "\n".join(
+        ["1 Introduction"]
+        + ["Language models are evaluated on several bench- ", "marks covering reasoning and code."] * 20
+        + ["3"]
+    )
+
+    def test_quality_heuristic_escalates_scanned_and_garbled_pages(self):
+        self.assertEqual(assess_pages([self.PAGE] * 3, 500), (True, ""))
+        self.assertFalse(assess_pages(["", " 1 "], 500)[0])
+        self.assertFalse(assess_pages(["(cid:12)(cid:7) " * 100], 500)[0])
+        self.assertFalse(assess_pages([" ".join("spaced letters everywhere " * 40)], 500)[0])
+
+    def test_markdown_has_headings_and_joined_paragraphs(self):
+        markdown = pages_to_markdown([self.PAGE])
+        self.assertTrue(markdown.startswith("## 1 Introduction\n\n"))
+        self.assertIn("several benchmarks covering", markdown)
+        self.assertNotIn("\n3", markdown)
+
+    @patch("vibe.converter._get_convert_pool")
+    @patch("vibe.converter.extract_pages")
+    @patch("vibe.converter.get_article_store")
+    @patch("vibe.converter.download_pdf")
+    def test_docling_runs_only_when_the_text_layer_is_rejected(self, mock_download, mock_store, mock_extract, mock_pool):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = ArticleStore(tmpdir)
+            mock_store.return_value = store
+            mock_download.return_value = os.path.join(tmpdir, "paper.pdf")
+            mock_pool.return_value.run.return_value = "## Docling output"
+            mock_extract.side_effect = [[self.PAGE] * 3, ["", ""]]
+
+            good = fetch_and_convert_article({"id": "arXiv:2410.00001", "pdf_url": "http://host/pdf/1"})
+            scanned = fetch_and_convert_article({"id": "arXiv:2410.00002", "pdf_url": "http://host/pdf/2"})
+            self.assertIn("## 1 Introduction", good)
+            self.assertEqual(scanned, "## Docling output")
+            self.assertEqual(mock_pool.return_value.run.call_count, 1)
+            self.assertEqual(store.metadata("arXiv:2410.00001")["tier"], "text")
+            self.assertEqual(store.metadata("arXiv:2410.00002")["tier"], "docling")
+
+    @patch("vibe.converter._get_convert_pool")
+    @patch("vibe.converter.extract_pages")
+    @patch("vibe.converter.get_article_store")
+    @patch("vibe.converter.download_pdf")
+    def test_failed_conversions_are_not_retried(self, mock_download, mock_store, mock_extract, mock_pool):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = ArticleStore(tmpdir)
+            mock_store.return_value = store
+            mock_download.return_value = os.path.join(tmpdir, "paper.pdf")
+            mock_extract.return_value = ["", ""]
+            mock_pool.return_value.run.side_effect = WorkerError("no result after 300s", "timeout")
+            article = {"id": "arXiv:2410.00003", "pdf_url": "http://host/pdf/3"}
+
+            self.assertEqual(fetch_and_convert_article(article), "")
+            self.assertEqual(fetch_and_convert_article(article), "")
+            self.assertEqual(mock_pool.return_value.run.call_count, 1)
+            self.assertEqual(mock_download.call_count, 1)
+            self.assertEqual(store.failure(article["id"], max_age=60)["reason"], "timeout")
+            self.assertIsNone(store.failure(article["id"], max_age=60, converter_version="docling-next"))
+            store.put(article["id"], "text")
+            self.assertIsNone(store.failure(article["id"], max_age=60))
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def test_hung_and_crashed_tasks_lose_only_their_worker(self):
+        import time
+
+        pool = IsolatedWorkerPool(1, timeout=1)
+        try:
+            started = time.time()
+            with self.assertRaises(WorkerError) as hung:
+                pool.run(time.sleep, 30)
+            self.assertEqual(hung.exception.reason, "timeout")
+            self.assertLess(time.time() - started, 10)
+            with self.assertRaises(WorkerError) as crashed:
+                pool.run(os._exit, 3)
+            self.assertEqual(crashed.exception.reason, "crashed")
+            with self.assertRaises(WorkerError) as failed:
+                pool.run(int, "not a number")
+            self.assertEqual((failed.exception.reason, failed.exception.error_type), ("error", "ValueError"))
+            self.assertEqual(pool.run(abs, -2), 2)
+        finally:
+            pool.shutdown()
+
+    def test_warm_up_skips_busy_slots(self):
+        import time
+        import threading
+
+        pool = IsolatedWorkerPool(2)
+        try:
+            busy = threading.Thread(target=pool.run, args=(time.sleep, 2))
+            busy.start()
+            time.sleep(0.5)
+            pool.warm_up(abs, -1)
+            busy.join()
+            self.assertEqual((pool._spawned, len(pool._idle)), (2, 2))
+        finally:
+            pool.shutdown()
+
+    def test_workers_are_recycled_after_max_tasks_and_above_max_rss(self):
+        pool = IsolatedWorkerPool(1, max_tasks=2)
+        try:
+            pids = [pool.run(os.getpid) for _ in range(3)]
+            self.assertEqual(pids[0], pids[1])
+            self.assertNotEqual(pids[1], pids[2])
+        finally:
+            pool.shutdown()
+        if not os.path.exists("/proc/self/statm"):
+            return
+        pool = IsolatedWorkerPool(1, max_rss=1024 * 1024)
+        try:
+            import time
+
+            with self.assertRaises(WorkerError) as over:
+                pool.run(time.sleep, 5)
+            self.assertEqual(over.exception.reason, "memory")
+        finally:
+            pool.shutdown()
+
+
+class TestPrefilter(unittest.TestCase):
+
+    def test_keeps_most_similar_articles_in_listing_order(self):
+        articles = [
+            {"id": "a", "title": "Graph neural networks for molecules", "abstract": "Message passing on molecular graphs."},
+            {"id": "b", "title": "Speech synthesis with diffusion", "abstract": "A diffusion model for text to speech."},
+            {"id": "c", "title": "Compiler optimizations for GPUs", "abstract": "Loop tiling and kernel fusion."},
+            {"id": "d", "title": "Neural text to speech on CPUs", "abstract": "Fast speech synthesis for edge devices."},
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            index_path = os.path.join(tmpdir, "index.npz")
+            kept = prefilter_articles(articles, "speech synthesis, text to speech", 2, index_path=index_path)
+            self.assertEqual([a["id"] for a in kept], ["b", "d"])
+            self.assertTrue(os.path.exists(index_path))
+            self.assertEqual(prefilter_articles(articles, "anything", 0, index_path=index_path), articles)
+
+    def test_concurrent_callers_share_one_index(self):
+        import concurrent.futures
+        from vibe.prefilter import get_embedding_index
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            index_path = os.path.join(tmpdir, "index.npz")
+
+            def run(worker):
+                articles = [{"id": f"{worker}-{i}", "title": f"Paper {worker} {i}", "abstract": "Speech synthesis."}
+                            for i in range(20)]
+                return prefilter_articles(articles, "speech synthesis", 5, index_path=index_path)
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
+                results = list(executor.map(run, range(6)))
+            self.assertEqual([len(kept) for kept in results], [5] * 6)
+            self.assertIs(get_embedding_index(index_path), get_embedding_index(index_path))
+            self.assertEqual(os.listdir(tmpdir), ["index.npz"])
+
+
+class TestSummaryReduction(unittest.TestCase):
+
+    CONTENT = (
+        "## Abstract\n\nWe study things.\n\n"
+        "## 1 Introduction\n\nIntro text.\n\n| a | b |\n|---|---|\n\n<!-- image -->\n\n"
+        "## Acknowledgements\n\nThanks to everyone.\n\n"
+        "## 2 Method\n\nMethod text.\n\n"
+        "## References\n\n[1] Someone. A paper.\n\n"
+        "## A Proofs\n\nLong proof."
+    )
+
+    def test_reduce_content_drops_back_matter_tables_and_placeholders(self):
+        reduced = reduce_content(self.CONTENT)
+        self.assertIn("Intro text.", reduced)
+        self.assertIn("Method text.", reduced)
+        for dropped in ("Thanks", "| a |", "<!--", "A paper", "Long proof"):
+            self.assertNotIn(dropped, reduced)
+
+    @patch("vibe.summarizer.llm_setting", return_value=5)
+    @patch("vibe.summarizer.chat_llm")
+    def test_long_articles_are_summarized_in_parts_then_merged(self, mock_chat, mock_setting):
+        mock_chat.side_effect = lambda prompt, **kwargs: "merged" if "Notes on the article" in prompt else "notes"
+        summary = generate_article_summary({"id": "arXiv:1234.5678", "title": "Test"}, self.CONTENT, "dummy user")
+        self.assertEqual(summary, "merged")
+        prompts = [c.args[0] for c in mock_chat.call_args_list]
+        self.assertGreater(len(prompts), 2)
+        self.assertTrue(all("References" not in p for p in prompts))
+
+
+class TestRelevanceFilter(unittest.TestCase):
+
+    ARTICLES = [
+        {"id": f"arXiv:2410.0000{i}", "title": f"Title {i}", "abstract": "word " * (40 * i)} for i in range(1, 7)
+    ]
+
+    def test_batches_are_sized_by_tokens(self):
+        batches = make_batches(self.ARTICLES, token_budget=200, max_batch=50)
+        self.assertEqual([a for b in batches for a in b], self.ARTICLES)
+        self.assertGreater(len(batches), 1)
+        self.assertEqual(len(make_batches(self.ARTICLES, token_budget=10 ** 6, max_batch=4)[0]), 4)
+
+    @patch("vibe.filter.chat_llm")
+    def test_unanswered_and_rate_limited_batches_are_retried(self, mock_chat):
+        class RateLimited(Exception):
+            status_code = 429
+
+        calls = []
+
+        def fake_chat(prompt, **kwargs):
+            calls.append(prompt)
+            if len(calls) == 1:
+                raise RateLimited("slow down")
+            ids = [line.split(": ", 1)[1] for line in prompt.splitlines() if line.startswith("Article ID: ")]
+            # Answer only the first article of each batch, without the arXiv: prefix.
+            return "{" + f'"{ids[0][len("arXiv:"):]}": "yes"' + "}"
+
+        mock_chat.side_effect = fake_chat
+        limiter = AdaptiveLimiter(2, base_backoff=0.01)
+        relevant = batch_relevance_filter(self.ARTICLES, "dummy user", use_cache=False, limiter=limiter)
+        self.assertEqual(relevant, {a["id"] for a in self.ARTICLES})
+        # The rate-limited batch is retried as is before being split.
+        self.assertEqual(calls[0], calls[1])
+
+    @patch("vibe.filter.ERROR_BACKOFF_SECONDS", 0.01)
+    @patch("vibe.filter.chat_llm")
+    def test_failed_batches_are_retried_whole_not_split(self, mock_chat):
+        mock_chat.side_effect = RuntimeError("service unavailable")
+        relevant = batch_relevance_filter(self.ARTICLES, "dummy user", use_cache=False, retries=2,
+                                          batch_size=len(self.ARTICLES), token_budget=10 ** 6)
+        self.assertEqual(relevant, set())
+        self.assertEqual(mock_chat.call_count, 3)
+
+
+class TestTournamentRerank(unittest.TestCase):
+
+    ARTICLES = [{"id": f"a{i:02d}", "title": f"Title {i}", "abstract": "Abstract"} for i in range(45)]
+
+    @staticmethod
+    def rank_by_id_descending(prompt, **kwargs):
+        ids = [line.split(": ", 1)[1] for line in prompt.splitlines() if line.startswith("Article ID: ")]
+        return '{"ranking": ' + str(sorted(ids, reverse=True)).replace("'", '"') + "}"
+
+    @patch("vibe.rerank.chat_llm")
+    def test_large_sets_are_ranked_in_groups_and_keep_every_article(self, mock_chat):
+        mock_chat.side_effect = self.rank_by_id_descending
+        ranked = rerank_articles(self.ARTICLES, "dummy user", top_n=3, group_size=10)
+        self.assertEqual([a["id"] for a in ranked[:3]], ["a44", "a43", "a42"])
+        self.assertEqual(sorted(a["id"] for a in ranked), [a["id"] for a in self.ARTICLES])
+        self.assertTrue(all(c.args[0].count("Article ID: ") <= 10 for c in mock_chat.call_args_list))
+
+    @patch("vibe.rerank.chat_llm")
+    def test_small_sets_use_one_prompt_and_partial_rankings_are_completed(self, mock_chat):
+        mock_chat.return_value = '{"ranking": ["a02"]}'
+        ranked = _rank_group(self.ARTICLES[:4], "dummy user")
+        self.assertEqual([a["id"] for a in ranked], ["a02", "a00", "a01", "a03"])
+        self.assertEqual(rerank_articles(self.ARTICLES[:4], "dummy user", group_size=10), ranked)
+        self.assertEqual(mock_chat.call_count, 2)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_run_report_collects_spans_tokens_and_cache_hits(self):
+        with run_report() as report:
+            with span("fetch"):
+                pass
+            with self.assertRaises(ValueError):
+                with span("convert", article="a"):
+                    raise ValueError("boom")
+            record_llm_call("medium", 0.5, prompt_tokens=100, completion_tokens=20)
+            record_llm_call("medium", 0.0, cached=True)
+            record_cache_lookup("llm", True)
+            record_cache_lookup("llm", False)
+        data = report.to_dict()
+        self.assertEqual(data["stages"]["fetch"]["count"], 1)
+        self.assertEqual(data["stages"]["convert"]["errors"], 1)
+        self.assertEqual((data["llm"]["calls"], data["llm"]["cached_calls"]), (1, 1))
+        self.assertEqual((data["llm"]["prompt_tokens"], data["llm"]["completion_tokens"]), (100, 20))
+        self.assertEqual(data["caches"]["llm"]["hit_rate"], 0.5)
+
+    def test_prometheus_rendering(self):
+        registry = MetricsRegistry()
+        registry.inc("vibe_things_total", 2, help="Things.", kind='a"b')
+        registry.observe("vibe_wait_seconds", 0.3, help="Waits.", buckets=(0.1, 1), stage="tts")
+        registry.register_collector(lambda: [("vibe_queue", "Queue.", {"status": "queued"}, 4)])
+        text = registry.render()
+        self.assertIn('vibe_things_total{kind="a\\"b"} 2', text)
+        self.assertIn('vibe_wait_seconds_bucket{stage="tts",le="0.1"} 0', text)
+        self.assertIn('vibe_wait_seconds_bucket{stage="tts",le="+Inf"} 1', text)
+        self.assertIn("# TYPE vibe_queue gauge", text)
+        self.assertIn('vibe_queue{status="queued"} 4', text)
+
+
+class TestLazyStartup(unittest.TestCase):
+
+    def test_importing_the_cli_does_not_load_heavy_engines(self):
+        code = (
+            "import sys, vibe.main; "
+            "print(sorted(m for m in ('docling', 'kokoro', 'torch', 'litellm') if m in sys.modules))"
+        )
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        out = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip().splitlines()[-1], "[]")
+
+    def test_importing_the_server_starts_nothing(self):
+        code = (
+            "import os, threading, vibe.server as s; "
+            "print(s.job_manager, s.precomputer, sorted(t.name for t in threading.enumerate()), "
+            "os.path.exists(s.JOBS_DB_PATH))"
+        )
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            env = dict(os.environ, VIBE_CACHE_DIR=tmpdir, VIBE_WARMUP="1", VIBE_PRECOMPUTE="1")
+            out = subprocess.run([sys.executable, "-c", code], cwd=root, env=env, capture_output=True, text=True,
+                                 check=True)
+        self.assertEqual(out.stdout.strip().splitlines()[-1], "None None ['MainThread'] False")
+
+
+class TestProfiles(unittest.TestCase):
+
+    ARTICLES = [{"id": f"arXiv:2410.0000{i}", "title": f"Title {i}", "abstract": "Abstract"} for i in range(1, 5)]
+
+    def test_profiles_are_validated_and_defaults_filled(self):
+        profiles = normalize_profiles([{"name": "alice", "user_info": "Compilers"}], {"max_articles": 3})
+        self.assertEqual(profiles, [{"name": "alice", "user_info": "Compilers", "max_articles": 3, "personalized": True}])
+        for entries in ([], [{"name": "a/b", "user_info": "x"}], [{"name": "a", "user_info": ""}],
+                        [{"name": "a", "user_info": "x"}, {"name": "a", "user_info": "y"}]):
+            with self.assertRaises(ValueError):
+                normalize_profiles(entries)
+
+    @patch("vibe.filter.chat_llm")
+    def test_multi_profile_filter_groups_readers_per_prompt(self, mock_chat):
+        mock_chat.side_effect = [
+            '{"2410.00001": ["P1"], "arXiv:2410.00002": "P1, P2", "2410.00003": [], "2410.00004": ["P9"]}',
+            '{"2410.00001": {"P1": "yes"}, "2410.00002": [], "2410.00003": [], "2410.00004": []}',
+        ]
+        profiles = normalize_profiles([{"name": n, "user_info": f"info {n}"} for n in ("a", "b", "c")])
+        relevant = multi_profile_relevance_filter(self.ARTICLES, profiles, use_cache=False, profiles_per_prompt=2,
+                                                  limiter=AdaptiveLimiter(1))
+        self.assertEqual(relevant, {
+            "a": {"arXiv:2410.00001", "arXiv:2410.00002"}, "b": {"arXiv:2410.00002"}, "c": {"arXiv:2410.00001"},
+        })
+        self.assertEqual(mock_chat.call_count, 2)
+
+    @patch("vibe.orchestrator.generate_article_summary")
+    @patch("vibe.orchestrator.fetch_and_convert_article")
+    @patch("vibe.orchestrator.rerank_articles")
+    @patch("vibe.orchestrator.multi_profile_relevance_filter")
+    @patch("vibe.orchestrator.fetch_arxiv_list")
+    def test_profile_reports_share_conversions_and_summaries(self, mock_fetch, mock_filter, mock_rerank,
+                                                             mock_convert, mock_summary):
+        mock_fetch.return_value = self.ARTICLES
+        ids = [a["id"] for a in self.ARTICLES]
+        mock_filter.return_value = {"a": set(ids[:2]), "b": set(ids[1:3]), "c": set(ids[1:3]), "d": set(ids[1:3])}
+        mock_rerank.side_effect = lambda articles, user_info, **kwargs: articles
+        mock_convert.side_effect = lambda article: f"content {article['id']}"
+        mock_summary.side_effect = lambda article, content, user_info, *args: f"{article['id']} for {user_info}"
+
+        profiles = normalize_profiles([
+            {"name": "a", "user_info": "info a", "personalized": False},
+            {"name": "b", "user_info": "info b", "max_articles": 1, "personalized": False},
+            {"name": "c", "user_info": "info c"},
+            {"name": "d", "user_info": "Info  C."},
+        ])
+        reports = build_profile_reports(profiles, prefilter_top_k=0)
+        self.assertEqual(reports["a"]["segments"][:-1], [f"{i} for {SHARED_AUDIENCE}" for i in ids[:2]])
+        self.assertEqual(reports["b"]["segments"][:-1], [f"{ids[1]} for {SHARED_AUDIENCE}"])
+        self.assertEqual(reports["c"]["segments"][:-1], [f"{i} for info c" for i in ids[1:3]])
+        self.assertEqual(reports["d"]["segments"], reports["c"]["segments"])
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.assertEqual(sorted(c.args[0]["id"] for c in mock_convert.call_args_list), ids[:3])
+        # Two shared summaries plus two personalized ones.
+        self.assertEqual(mock_summary.call_count, 4)
+
+
+class TestPrecompute(unittest.TestCase):
+
+    ARTICLES = [
+        {"id": "arXiv:2410.00001", "title": "Speech synthesis with diffusion", "abstract": "Text to speech."},
+        {"id": "arXiv:2410.00002", "title": "Compiler optimizations for GPUs", "abstract": "Kernel fusion."},
+        {"id": "arXiv:2410.00003", "title": "Neural text to speech on CPUs", "abstract": "Fast speech synthesis."},
+    ]
+
+    @patch("vibe.precompute.fetch_and_convert_article")
+    @patch("vibe.precompute.get_article_store")
+    @patch("vibe.precompute.fetch_arxiv_list")
+    def test_converts_new_listing_once_and_skips_stored_articles(self, mock_fetch, mock_store, mock_convert):
+        mock_fetch.return_value = self.ARTICLES
+        # The second article was stored by an older converter and is converted again.
+        versions = {"arXiv:2410.00001": CONVERTER_VERSION, "arXiv:2410.00002": "docling-old"}
+        mock_store.return_value.metadata.side_effect = (
+            lambda article_id: {"converter_version": versions[article_id]} if article_id in versions else None
+        )
+        mock_convert.return_value = "content"
+        busy = iter([True, False, False])
+        precomputer = Precomputer(workers=1, is_busy=lambda: next(busy, False))
+
+        with patch("vibe.precompute.BUSY_POLL_SECONDS", 0.01):
+            status = precomputer.run_once()
+        self.assertEqual((status["total"], status["already_stored"], status["converted"]), (3, 1, 2))
+        self.assertEqual(status["done"], 3)
+        # An unchanged listing is not processed again.
+        precomputer.run_once()
+        self.assertEqual(mock_convert.call_count, 2)
+
+    @patch("vibe.precompute.fetch_and_convert_article")
+    @patch("vibe.precompute.get_article_store")
+    @patch("vibe.precompute.fetch_arxiv_list")
+    def test_profiles_scope_keeps_articles_close_to_a_profile(self, mock_fetch, mock_store, mock_convert):
+        mock_fetch.return_value = self.ARTICLES
+        mock_store.return_value.metadata.return_value = None
+        mock_convert.return_value = "content"
+        profiles = [{"name": "a", "user_info": "speech synthesis, text to speech"}]
+        with tempfile.TemporaryDirectory() as tmpdir, \
+                patch("vibe.prefilter.EMBEDDING_INDEX_FILE", os.path.join(tmpdir, "index.npz")):
+            Precomputer(scope="profiles", profiles=profiles, top_k=2).run_once()
+        self.assertEqual(sorted(c.args[0]["id"] for c in mock_convert.call_args_list),
+                         ["arXiv:2410.00001", "arXiv:2410.00003"])
+
+    @patch("vibe.orchestrator.generate_article_summary")
+    @patch("vibe.orchestrator.fetch_and_convert_article")
+    @patch("vibe.orchestrator.rerank_articles")
+    @patch("vibe.orchestrator.batch_relevance_filter")
+    @patch("vibe.orchestrator.fetch_arxiv_list")
+    @patch("vibe.precompute.fetch_and_convert_article")
+    @patch("vibe.precompute.fetch_arxiv_list")
+    def test_precompute_does_not_hide_articles_from_new_only(self, mock_pre_fetch, mock_pre_convert, mock_fetch,
+                                                             mock_filter, mock_rerank, mock_convert, mock_summary):
+        from vibe.orchestrator import build_report_segments
+
+        mock_pre_fetch.return_value = mock_fetch.return_value = self.ARTICLES
+        mock_filter.side_effect = lambda articles, *args, **kwargs: {a["id"] for a in articles}
+        mock_rerank.side_effect = lambda articles, *args, **kwargs: articles
+        mock_convert.return_value = "content"
+        mock_summary.side_effect = lambda article, *args: f"Summary of {article['id']}"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = ArticleStore(tmpdir)
+            mock_pre_convert.side_effect = lambda article: store.put(article["id"], "content") or "content"
+            with patch("vibe.precompute.get_article_store", return_value=store), \
+                    patch("vibe.orchestrator.get_article_store", return_value=store):
+                Precomputer(workers=1).run_once()
+                self.assertEqual(store.newest_id(), "arXiv:2410.00003")
+                first = build_report_segments("dummy user", max_articles=2, new_only=True, prefilter_top_k=0)
+                second = build_report_segments("dummy user", max_articles=2, new_only=True, prefilter_top_k=0)
+        self.assertEqual(first[:-1], ["Summary of arXiv:2410.00001", "Summary of arXiv:2410.00002"])
+        self.assertEqual(second[:-1], ["Summary of arXiv:2410.00003"])
+
+
+class TestStreaming(unittest.TestCase):
+
+    def test_sentences_are_cut_at_boundaries_but_not_abbreviations(self):
+        text = "And now, Article: Foo. The authors, e.g. Smith et al. propose a method. It works!\n\nThe end"
+        pieces = [text[i: i + 3] for i in range(0, len(text), 3)]
+        self.assertEqual(list(iter_sentences(pieces)), [
+            "And now, Article: Foo. The authors, e.g. Smith et al. propose a method.", "It works!", "The end",
+        ])
+        self.assertEqual(list(iter_sentences(pieces, paragraph_breaks=True))[2:], ["\n\n", "The end"])
+
+    @patch("vibe.llm.get_llm_cache")
+    @patch("vibe.llm._litellm")
+    def test_chat_llm_stream_yields_deltas_and_caches_the_text(self, mock_litellm, mock_get_cache):
+        chunks = [{"choices": [{"delta": {"content": c}}]} for c in (" Hello", " world.", None, " Bye.")]
+        mock_litellm.return_value.completion.return_value = iter(chunks)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mock_get_cache.return_value = LLMCache(os.path.join(tmpdir, "cache.sqlite3"), max_bytes=0, max_age=0)
+            self.assertEqual(list(chat_llm_stream("prompt", use_cache=True)), ["Hello", " world.", " Bye."])
+            self.assertEqual(list(chat_llm_stream("prompt", use_cache=True)), ["Hello world. Bye."])
+        self.assertTrue(mock_litellm.return_value.completion.call_args.kwargs["stream"])
+
+    @patch("vibe.orchestrator.stream_article_summary")
+    @patch("vibe.orchestrator.fetch_and_convert_article")
+    def test_summary_sentences_follow_article_order(self, mock_convert, mock_stream):
+        import time
+
+        def stream(article, content, *args):
+            # The first article is the slowest to write.
+            time.sleep(0.2 if article["id"] == "a" else 0.0)
+            yield f"This is the first sentence of the summary of article {article['id']}.\n\n"
+            yield f"This is the second sentence of the summary of article {article['id']}."
+
+        mock_convert.side_effect = lambda article: "" if article["id"] == "b" else "content"
+        mock_stream.side_effect = stream
+        articles = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+        sentences = list(iter_summary_sentences(articles, "dummy user"))
+        # Paragraphs and articles are separated by breaks, spoken as pauses.
+        self.assertEqual([s[-2] if s.strip() else "|" for s in sentences], ["a", "|", "a", "|", "c", "|", "c", "|"])
+
+    @patch("vibe.orchestrator.get_article_store")
+    @patch("vibe.orchestrator.select_articles")
+    @patch("vibe.orchestrator.stream_article_summary")
+    @patch("vibe.orchestrator.fetch_and_convert_article")
+    def test_stream_marks_only_spoken_articles_as_served(self, mock_convert, mock_stream, mock_select, mock_store):
+        from vibe.orchestrator import stream_report_sentences
+
+        mock_select.return_value = [{"id": "2410.00001"}, {"id": "2410.00002"}]
+        mock_convert.side_effect = lambda article: "content" if article["id"] == "2410.00001" else ""
+        mock_stream.return_value = iter(["A summary sentence that is long enough to be spoken."])
+        list(stream_report_sentences("dummy user"))
+        mock_store.return_value.record_served.assert_called_once_with(["2410.00001"])
+
+
+class TestShardedTTS(unittest.TestCase):
+
+    TEXT = "First paragraph. It has two sentences.\nSecond paragraph is a bit longer. It also has more sentences. Three."
+
+    @staticmethod
+    def fake_pcm(text):
+        return text.encode("utf-8")
+
+    def test_paragraphs_are_split_into_sentence_shards(self):
+        self.assertEqual(split_shards(self.TEXT, max_chars=40), [
+            ("First paragraph. It has two sentences.", True),
+            ("Second paragraph is a bit longer.", True),
+            ("It also has more sentences. Three.", False),
+        ])
+
+    def test_sharded_synthesis_matches_serial_order_and_pauses(self):
+        import time
+        import concurrent.futures
+
+        def synthesize_shard(text, voice, speed):
+            # Later shards finish first.
+            time.sleep(0.05 if text.startswith("First") else 0.0)
+            return self.fake_pcm(text)
+
+        serial = TTSEngine(workers=1)
+        with patch.object(TTSEngine, "iter_audio", lambda engine, text: [text]), \
+                patch("vibe.tts._to_pcm", self.fake_pcm), patch("vibe.tts.TTS_SHARD_CHARS", 40):
+            expected = b"".join(serial.start_pcm(self.TEXT))
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=3)
+        with patch("vibe.tts._get_tts_pool", return_value=pool), \
+                patch("vibe.tts._synthesize_shard", side_effect=synthesize_shard), patch("vibe.tts.TTS_SHARD_CHARS", 40):
+            sharded = b"".join(TTSEngine(workers=3).start_pcm(self.TEXT))
+        pool.shutdown()
+        self.assertEqual(sharded, expected)
+        pause = int(TTS_PARAGRAPH_PAUSE * SAMPLE_RATE) * 4
+        self.assertEqual(expected.count(b"\x00" * pause), 1)
+
+    def test_broken_worker_pool_is_restarted_once(self):
+        import concurrent.futures
+        from concurrent.futures.process import BrokenProcessPool
+
+        broken = MagicMock()
+
+        def broken_submit(*args):
+            future = concurrent.futures.Future()
+            future.set_exception(BrokenProcessPool("a worker died"))
+            return future
+
+        broken.submit.side_effect = broken_submit
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        with patch("vibe.tts._get_tts_pool", side_effect=[broken, pool]), \
+                patch("vibe.tts._synthesize_shard", side_effect=lambda text, voice, speed: self.fake_pcm(text)), \
+                patch("vibe.tts.TTS_SHARD_CHARS", 40):
+            audio = b"".join(TTSEngine(workers=2).start_pcm(self.TEXT))
+        pool.shutdown()
+        self.assertTrue(audio.startswith(b"First paragraph.") and audio.endswith(b"Three."))
+        broken.shutdown.assert_called_once()
+
+    def test_stream_holds_the_tts_slot_only_while_synthesizing(self):
+        import time
+        import threading
+        from vibe.limits import stage_usage
+
+        spoken = threading.Event()
+        active = []
+
+        def start_pcm(engine, text):
+            active.append(stage_usage()["tts"]["active"])
+            yield text.encode("utf-8")
+            spoken.set()
+
+        def sentences():
+            yield "One."
+            # Later sentences may take long to write (e.g. waiting on the LLM).
+            spoken.wait(5)
+            time.sleep(0.2)
+            active.append(stage_usage()["tts"]["active"])
+            yield "Two."
+
+        popen = subprocess.Popen
+        with patch("vibe.tts.subprocess.Popen", lambda cmd, **kwargs: popen(["cat"], **kwargs)), \
+                patch.object(TTSEngine, "start_pcm", start_pcm):
+            audio = b"".join(TTSEngine(workers=1).stream_mp3(sentences()))
+        self.assertEqual(audio, b"One.Two.")
+        self.assertEqual(active, [1, 0, 1])
+
+    def test_segments_are_joined_with_a_pause(self):
+        def synthesize(engine, text, output_mp3, pcm=None):
+            with open(output_mp3, "wb") as f:
+                f.write(b"".join(pcm) if pcm is not None else text.encode("utf-8"))
+
+        with tempfile.TemporaryDirectory() as tmpdir, patch.object(TTSEngine, "synthesize", synthesize), \
+                patch("vibe.tts.concat_mp3") as mock_concat:
+            TTSEngine(workers=1).synthesize_segments(["One.", "Two.", "One."], "out.mp3", cache_dir=tmpdir)
+        paths = mock_concat.call_args.args[0]
+        self.assertEqual(len(paths), 5)
+        self.assertEqual((paths[0], paths[1]), (paths[4], paths[3]))
+        self.assertNotEqual(paths[0], paths[1])
+
+
+class TestProgress(unittest.TestCase):
+
+    def test_events_are_coalesced_between_deliveries(self):
+        import time
+
+        payloads = []
+        channel = ProgressChannel("job1", emit=payloads.append, min_interval=0.2)
+        channel.publish("Fetching...", stage="fetch")
+        for i in range(1, 6):
+            channel.publish(f"Article {i}", stage="fetch", article=str(i))
+        self.assertEqual([len(p["events"]) for p in payloads], [1])
+        time.sleep(0.4)
+        self.assertEqual([len(p["events"]) for p in payloads], [1, 5])
+        # A new stage is delivered at once.
+        channel.publish("Ranking...", stage="rerank")
+        self.assertEqual(payloads[-1]["events"][0]["stage"], "rerank")
+        self.assertEqual([e["seq"] for p in payloads for e in p["events"]], list(range(1, 8)))
+
+    def test_percent_follows_stages_and_never_goes_back(self):
+        channel = ProgressChannel("job1")
+        channel.publish("Summarized", stage="summarize", done=1, total=2)
+        channel.publish("Converted", stage="convert", article="a")
+        events, _ = channel.replay()
+        self.assertEqual([e["percent"] for e in events], [62.5, 62.5])
+        self.assertEqual(events[1]["article"], "a")
+        self.assertNotIn("article", events[0])
+
+    def test_replay_resumes_after_seq_and_reports_truncation(self):
+        channel = ProgressChannel("job1", history=3)
+        for i in range(5):
+            channel.publish(f"Step {i}", stage="fetch")
+        events, truncated = channel.replay(after=3)
+        self.assertEqual(([e["seq"] for e in events], truncated), ([4, 5], False))
+        events, truncated = channel.replay(after=0)
+        self.assertEqual(([e["seq"] for e in events], truncated), ([3, 4, 5], True))
+
+    def test_hub_emits_per_job_and_drops_finished_channels(self):
+        sent = []
+        hub = ProgressHub(emit=lambda job_id, payload: sent.append(job_id), min_interval=0, ttl=0)
+        hub.channel("a").publish("Done.", stage="done")
+        hub.channel("b").publish("Fetching...", stage="fetch")
+        self.assertEqual(sent, ["a", "b"])
+        self.assertIsNone(hub.get("a"))
+        self.assertIsNotNone(hub.get("b"))
+
+    def test_stream_closed_early_finishes_its_channel(self):
+        from vibe.server import _stream_audio
+
+        channel = ProgressChannel("stream1")
+        engine = MagicMock()
+        engine.stream_mp3.return_value = iter([b"one", b"two"])
+        with patch("vibe.tts.get_engine", return_value=engine):
+            stream = _stream_audio(channel, iter(["A sentence."]))
+            self.assertEqual(next(stream), b"one")
+            stream.close()
+        self.assertTrue(channel.finished)
+        events, _ = channel.replay()
+        self.assertEqual(events[-1]["stage"], "error")
+
+
+class TestEpisodeCache(unittest.TestCase):
+
+    def test_key_ignores_prompt_formatting_but_not_listing_or_voice(self):
+        articles = [{"id": "2401.00001"}, {"id": "2401.00002"}]
+        key = episode_key("Graph neural networks.", articles, 5, "medium", "af_bella")
+        self.assertEqual(key, episode_key("  graph   Neural networks", articles[::-1], 5, "medium", "af_bella"))
+        self.assertNotEqual(key, episode_key("Graph neural networks", articles[:1], 5, "medium", "af_bella"))
+        self.assertNotEqual(key, episode_key("Graph neural networks", articles, 5, "medium", "am_adam"))
+        self.assertNotEqual(key, episode_key("Graph neural networks", articles, 3, "medium", "af_bella"))
+
+    def test_identical_requests_share_one_computation(self):
+        import threading
+        import time
+
+        calls = []
+
+        def produce(path):
+            calls.append(path)
+            time.sleep(0.2)
+            with open(path, "wb") as f:
+                f.write(b"mp3")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = EpisodeCache(tmpdir, max_bytes=0)
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(cache.get_or_create("k", produce)))
+                       for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(set(results), {cache.path("k")})
+            self.assertEqual(cache.lookup("k"), cache.path("k"))
+            self.assertEqual(os.listdir(tmpdir), ["k.mp3"])
+
+    def test_failed_build_is_not_stored_and_is_retried(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = EpisodeCache(tmpdir, max_bytes=0)
+
+            def fail(path):
+                open(path, "wb").close()
+                raise RuntimeError("No summaries generated.")
+
+            with self.assertRaises(RuntimeError):
+                cache.get_or_create("k", fail)
+            self.assertEqual(os.listdir(tmpdir), [])
+            cache.get_or_create("k", lambda path: open(path, "wb").close())
+            self.assertIsNotNone(cache.lookup("k"))
+
+    def test_least_recently_used_episodes_are_evicted_beyond_the_budget(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = EpisodeCache(tmpdir, max_bytes=250)
+
+            def produce(path):
+                with open(path, "wb") as f:
+                    f.write(b"x" * 100)
+
+            for key in ("a", "b"):
+                cache.get_or_create(key, produce)
+            os.utime(cache.path("a"), (1, 1))
+            os.utime(cache.path("b"), (2, 2))
+            cache.lookup("a")
+            cache.get_or_create("c", produce)
+            self.assertEqual(sorted(os.listdir(tmpdir)), ["a.mp3", "c.mp3"])
+
+
+class TestJobManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "jobs.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_job_runs_and_reports_result(self):
+        manager = JobManager(lambda job_id, params: params["user_info"] + ".mp3", self.db_path,
+                             workers=1, queue_limit=4, result_ttl=60, cleanup_interval=0)
+        job_id = manager.submit({"user_info": "ai"})
+        job = manager.wait(job_id, timeout=5)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["result_path"], "ai.mp3")
+
+    def test_queue_limit_applies_backpressure(self):
+        import threading
+        release = threading.Event()
+        manager = JobManager(lambda job_id, params: release.wait(5) and "", self.db_path,
+                             workers=1, queue_limit=1, result_ttl=60, cleanup_interval=0)
+        job_id = manager.submit({"user_info": "ai"})
+        with self.assertRaises(QueueFullError):
+            manager.submit({"user_info": "ml"})
+        release.set()
+        self.assertEqual(manager.wait(job_id, timeout=5)["status"], "done")
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,306 @@
+import os
+import re
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+
+from .config import ARTICLES_CACHE_DIR, ARTICLE_STORE_MAX_BYTES
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; zlib is always available.
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+_NEW_STYLE_ID = re.compile(r"(\d{2})(\d{2})\.(\d{4,5})")
+
+
+def article_sort_key(article_id):
+    """
+    Returns (yymm, number) for new-style arXiv ids such as "arXiv:2410.12345",
+    or None for ids that cannot be ordered.
+    """
+    match = _NEW_STYLE_ID.search(article_id)
+    if not match:
+        return None
+    return int(match.group(1) + match.group(2)), int(match.group(3))
+
+
+def _compress(text):
+    data = text.encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def _decompress(codec, blob):
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+    if codec == "zlib":
+        return zlib.decompress(blob).decode("utf-8")
+    return blob.decode("utf-8")
+
+
+class ArticleStore:
+    """
+    Compressed store of converted article text. Blobs live in directory as
+    one file per article; an SQLite index records size, conversion time,
+    converter version, extraction tier and last access, supports LRU eviction down to
+    max_bytes, and answers "newest cached id" with an indexed query.
+    Articles that could not be converted are remembered in a separate table
+    (see record_failure) so that they are not retried on every run, and the
+    newest article that went into a report is tracked apart from what is
+    stored (see record_served), since precompute stores articles ahead of time.
+    Loose .txt files from older versions are imported on first open.
+    """
+
+    def __init__(self, directory, max_bytes=0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            " id TEXT PRIMARY KEY,"
+            " blob TEXT NOT NULL,"
+            " codec TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " stored_size INTEGER NOT NULL,"
+            " converter_version TEXT,"
+            " converted_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " sort_month INTEGER,"
+            " sort_number INTEGER)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(articles)")}
+        if "tier" not in columns:
+            # Added after the first release; older rows have no tier.
+            self._conn.execute("ALTER TABLE articles ADD COLUMN tier TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_order ON articles (sort_month, sort_number)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_accessed ON articles (accessed_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS failures ("
+            " id TEXT PRIMARY KEY,"
+            " reason TEXT NOT NULL,"
+            " converter_version TEXT,"
+            " attempts INTEGER NOT NULL,"
+            " failed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS served ("
+            " name TEXT PRIMARY KEY,"
+            " article_id TEXT NOT NULL,"
+            " sort_month INTEGER NOT NULL,"
+            " sort_number INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._import_legacy()
+
+    @staticmethod
+    def _blob_name(article_id):
+        return re.sub(r"[^A-Za-z0-9._-]", "_", article_id) + ".blob"
+
+    def _import_legacy(self):
+        legacy = [f for f in os.listdir(self.directory) if f.endswith(".txt")]
+        if not legacy:
+            return
+        logger.info("Importing %d legacy article files into the article store.", len(legacy))
+        for name in legacy:
+            path = os.path.join(self.directory, name)
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            # Legacy files were named after the id with ":" replaced by "_".
+            article_id = name[:-4].replace("_", ":", 1) if name.lower().startswith("arxiv_") else name[:-4]
+            self.put(article_id, text, converter_version="legacy", converted_at=os.path.getmtime(path))
+            os.unlink(path)
+
+    def get(self, article_id, converter_versions=None):
+        """
+        Returns the stored text for article_id, or None. If converter_versions
+        is given, text stored by any other converter version counts as a miss,
+        so that it is converted again (and replaced by put).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT blob, codec, converter_version FROM articles WHERE id = ?", (article_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if converter_versions is not None and row[2] not in converter_versions:
+                logger.info("Stored conversion of '%s' is from converter '%s'; converting again.", article_id, row[2])
+                return None
+            self._conn.execute("UPDATE articles SET accessed_at = ? WHERE id = ?", (time.time(), article_id))
+            self._conn.commit()
+        try:
+            with open(os.path.join(self.directory, row[0]), "rb") as f:
+                return _decompress(row[1], f.read())
+        except FileNotFoundError:
+            logger.warning("Article store blob for '%s' is missing; dropping index entry.", article_id)
+            with self._lock:
+                self._conn.execute("DELETE FROM articles WHERE id = ?", (article_id,))
+                self._conn.commit()
+            return None
+
+    def put(self, article_id, text, converter_version=None, converted_at=None, tier=None):
+        """
+        Compresses and stores text for article_id, then evicts least recently
+        used articles if the store exceeds max_bytes. tier names the
+        extraction path that produced the text ("text" or "docling").
+        """
+        codec, blob = _compress(text)
+        name = self._blob_name(article_id)
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, path)
+        now = time.time()
+        sort_key = article_sort_key(article_id) or (None, None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles (id, blob, codec, size, stored_size, converter_version,"
+                " converted_at, accessed_at, sort_month, sort_number, tier)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (article_id, name, codec, len(text.encode("utf-8")), len(blob), converter_version,
+                 converted_at or now, now, sort_key[0], sort_key[1], tier),
+            )
+            self._conn.execute("DELETE FROM failures WHERE id = ?", (article_id,))
+            self._evict(keep=article_id)
+            self._conn.commit()
+
+    def _evict(self, keep=None):
+        if not self.max_bytes:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM articles").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for article_id, name, stored_size in self._conn.execute(
+            "SELECT id, blob, stored_size FROM articles ORDER BY accessed_at ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            if article_id == keep:
+                continue
+            self._conn.execute("DELETE FROM articles WHERE id = ?", (article_id,))
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                os.unlink(path)
+            total -= stored_size
+            logger.debug("Evicted article '%s' from the article store.", article_id)
+
+    def metadata(self, article_id):
+        """
+        Returns the index entry for article_id (sizes, converter version,
+        extraction tier, timestamps) as a dict, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, stored_size, codec, converter_version, tier, converted_at, accessed_at"
+                " FROM articles WHERE id = ?", (article_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("size", "stored_size", "codec", "converter_version", "tier", "converted_at", "accessed_at")
+        return dict(zip(keys, row))
+
+    def record_failure(self, article_id, reason, converter_version=None):
+        """
+        Remembers that converting article_id failed (reason, e.g. "timeout"),
+        counting repeated failures.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO failures (id, reason, converter_version, attempts, failed_at) VALUES (?, ?, ?, 1, ?)"
+                " ON CONFLICT(id) DO UPDATE SET reason = excluded.reason,"
+                " converter_version = excluded.converter_version, attempts = attempts + 1,"
+                " failed_at = excluded.failed_at",
+                (article_id, reason, converter_version, time.time()),
+            )
+            self._conn.commit()
+
+    def failure(self, article_id, max_age, converter_version=None):
+        """
+        Returns the recorded failure of article_id (reason, converter version,
+        attempts, failed_at) as a dict, or None if there is none, it is older
+        than max_age seconds, or it was recorded with another converter_version.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT reason, converter_version, attempts, failed_at FROM failures WHERE id = ?", (article_id,)
+            ).fetchone()
+        if row is None or time.time() - row[3] > max_age:
+            return None
+        if converter_version is not None and row[1] != converter_version:
+            return None
+        return dict(zip(("reason", "converter_version", "attempts", "failed_at"), row))
+
+    def newest_id(self):
+        """
+        Returns the id of the most recent (by arXiv numbering) stored article, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM articles WHERE sort_month IS NOT NULL"
+                " ORDER BY sort_month DESC, sort_number DESC LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_served(self, article_ids, name="reports"):
+        """
+        Advances the high-water mark `name` to the newest of article_ids (by
+        arXiv numbering); the mark never moves backwards.
+        """
+        keyed = [(key, article_id) for article_id in article_ids
+                 if (key := article_sort_key(article_id)) is not None]
+        if not keyed:
+            return
+        (month, number), article_id = max(keyed)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO served (name, article_id, sort_month, sort_number, updated_at) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET article_id = excluded.article_id,"
+                " sort_month = excluded.sort_month, sort_number = excluded.sort_number,"
+                " updated_at = excluded.updated_at"
+                " WHERE (excluded.sort_month, excluded.sort_number) > (served.sort_month, served.sort_number)",
+                (name, article_id, month, number, time.time()),
+            )
+            self._conn.commit()
+
+    def last_served_id(self, name="reports"):
+        """
+        Returns the id recorded by record_served for name, or None.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT article_id FROM served WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def stats(self):
+        with self._lock:
+            count, size, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM articles"
+            ).fetchone()
+            tiers = dict(self._conn.execute(
+                "SELECT COALESCE(tier, 'unknown'), COUNT(*) FROM articles GROUP BY tier"
+            ).fetchall())
+            failures = self._conn.execute("SELECT COUNT(*) FROM failures").fetchone()[0]
+        return {"articles": count, "bytes": size, "stored_bytes": stored, "tiers": tiers, "failures": failures}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_article_store():
+    """
+    Returns the process-wide ArticleStore, creating it on first use.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ArticleStore(ARTICLES_CACHE_DIR, max_bytes=ARTICLE_STORE_MAX_BYTES)
+        return _store
@@ -7,12 +7,20 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-CACHE_DIR = os.path.join(BASE_DIR, "cache")
+CACHE_DIR = os.environ.get("VIBE_CACHE_DIR", os.path.join(BASE_DIR, "cache"))
 if not os.path.exists(CACHE_DIR):
     os.makedirs(CACHE_DIR)
     logger.debug("Created cache directory: %s", CACHE_DIR)
 
-ARXIV_CACHE_FILE = os.path.join(CACHE_DIR, "arxiv_list.json")
+LISTINGS_CACHE_DIR = os.path.join(CACHE_DIR, "listings")
+if not os.path.exists(LISTINGS_CACHE_DIR):
+    os.makedirs(LISTINGS_CACHE_DIR)
+    logger.debug("Created listings cache directory: %s", LISTINGS_CACHE_DIR)
+LISTING_MAX_AGE = int(os.environ.get("LISTING_MAX_AGE", "3600"))
+LISTING_RETENTION_DAYS = int(os.environ.get("LISTING_RETENTION_DAYS", "7"))
+LISTING_ANNOUNCE_TYPES = [
+    t.strip() for t in os.environ.get("LISTING_ANNOUNCE_TYPES", "new").split(",") if t.strip()
+]
 ARTICLES_CACHE_DIR = os.path.join(CACHE_DIR, "articles")
 if not os.path.exists(ARTICLES_CACHE_DIR):
     os.makedirs(ARTICLES_CACHE_DIR)
@@ -21,3 +29,96 @@ if not os.path.exists(ARTICLES_CACHE_DIR):
 DEFAULT_ARXIV_URL = os.environ.get("ARXIV_URL", "https://arxiv.org/list/cs/new")
 DEFAULT_LLM_URL = os.environ.get("LLM_URL", "https://api.mistral.ai/v1/chat/completions")
 DEFAULT_MODEL_NAME = os.environ.get("MODEL_NAME", "mistral-small-latest")
+
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm_cache.sqlite3"))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+LLM_CACHE_MAX_AGE = int(os.environ.get("LLM_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+DOWNLOAD_WORKERS = int(os.environ.get("DOWNLOAD_WORKERS", "4"))
+CONVERT_WORKERS = int(os.environ.get("CONVERT_WORKERS", "2"))
+# Isolated Docling workers: seconds per document, resident memory ceiling (MiB, 0: none)
+# and documents converted before a worker is replaced (0: never).
+CONVERT_TIMEOUT = float(os.environ.get("CONVERT_TIMEOUT", "300"))
+CONVERT_MAX_RSS_MB = int(os.environ.get("CONVERT_MAX_RSS_MB", "4096"))
+CONVERT_MAX_DOCS = int(os.environ.get("CONVERT_MAX_DOCS", "50"))
+# Seconds an article whose conversion failed is skipped before it is tried again.
+CONVERT_FAILURE_TTL = int(os.environ.get("CONVERT_FAILURE_TTL", str(7 * 24 * 3600)))
+# "auto" tries the PDF text layer first and falls back to Docling; "text" or "docling" force one tier.
+EXTRACTION_MODE = os.environ.get("EXTRACTION_MODE", "auto").lower()
+TEXT_LAYER_MIN_CHARS_PER_PAGE = int(os.environ.get("TEXT_LAYER_MIN_CHARS_PER_PAGE", "500"))
+SUMMARY_WORKERS = int(os.environ.get("SUMMARY_WORKERS", "4"))
+
+AUDIO_CACHE_DIR = os.path.join(CACHE_DIR, "audio")
+if not os.path.exists(AUDIO_CACHE_DIR):
+    os.makedirs(AUDIO_CACHE_DIR)
+    logger.debug("Created audio cache directory: %s", AUDIO_CACHE_DIR)
+AUDIO_CACHE_MAX_BYTES = int(os.environ.get("AUDIO_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Finished report MP3s, reused for equivalent requests against the same listing.
+EPISODE_CACHE_ENABLED = os.environ.get("EPISODE_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+EPISODE_CACHE_DIR = os.path.join(CACHE_DIR, "episodes")
+EPISODE_CACHE_MAX_BYTES = int(os.environ.get("EPISODE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+DEBUG = os.environ.get("VIBE_DEBUG", "0").lower() in ("1", "true", "yes")
+WARMUP = os.environ.get("VIBE_WARMUP", "0").lower() in ("1", "true", "yes")
+# Port and request threads of the gunicorn worker that serves the app (see main.serve).
+SERVER_PORT = int(os.environ.get("SERVER_PORT", "5000"))
+SERVER_THREADS = int(os.environ.get("SERVER_THREADS", "64"))
+
+JOBS_DIR = os.path.join(CACHE_DIR, "jobs")
+if not os.path.exists(JOBS_DIR):
+    os.makedirs(JOBS_DIR)
+    logger.debug("Created jobs directory: %s", JOBS_DIR)
+JOBS_DB_PATH = os.environ.get("JOBS_DB_PATH", os.path.join(CACHE_DIR, "jobs.sqlite3"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_QUEUE_LIMIT = int(os.environ.get("JOB_QUEUE_LIMIT", "16"))
+JOB_RESULT_TTL = int(os.environ.get("JOB_RESULT_TTL", "3600"))
+JOB_CLEANUP_INTERVAL = int(os.environ.get("JOB_CLEANUP_INTERVAL", "300"))
+
+# Progress events: minimum seconds between deliveries to a job's room, and events kept for replay.
+PROGRESS_MIN_INTERVAL = float(os.environ.get("PROGRESS_MIN_INTERVAL", "0.5"))
+PROGRESS_HISTORY = int(os.environ.get("PROGRESS_HISTORY", "500"))
+
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "8"))
+DOCLING_CONCURRENCY = int(os.environ.get("DOCLING_CONCURRENCY", str(CONVERT_WORKERS)))
+TTS_CONCURRENCY = int(os.environ.get("TTS_CONCURRENCY", "1"))
+
+# Sharded speech synthesis: worker processes, torch threads per worker (0: cores / workers),
+# longest shard in characters, and the pause inserted between paragraphs.
+TTS_WORKERS = int(os.environ.get("TTS_WORKERS", "1"))
+TTS_TORCH_THREADS = int(os.environ.get("TTS_TORCH_THREADS", "0"))
+TTS_SHARD_CHARS = int(os.environ.get("TTS_SHARD_CHARS", "600"))
+TTS_PARAGRAPH_PAUSE = float(os.environ.get("TTS_PARAGRAPH_PAUSE", "0.3"))
+
+FILTER_BATCH_TOKENS = int(os.environ.get("FILTER_BATCH_TOKENS", "8000"))
+FILTER_MAX_BATCH = int(os.environ.get("FILTER_MAX_BATCH", "50"))
+FILTER_CONCURRENCY = int(os.environ.get("FILTER_CONCURRENCY", "4"))
+FILTER_RETRIES = int(os.environ.get("FILTER_RETRIES", "3"))
+FILTER_PROFILES_PER_PROMPT = int(os.environ.get("FILTER_PROFILES_PER_PROMPT", "8"))
+RERANK_GROUP_SIZE = int(os.environ.get("RERANK_GROUP_SIZE", "20"))
+RERANK_WORKERS = int(os.environ.get("RERANK_WORKERS", "4"))
+
+PREFILTER_TOP_K = int(os.environ.get("PREFILTER_TOP_K", "0"))
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "hashing")
+EMBEDDING_INDEX_FILE = os.path.join(LISTINGS_CACHE_DIR, "embeddings.npz")
+
+PDF_CACHE_DIR = os.path.join(CACHE_DIR, "pdfs")
+if not os.path.exists(PDF_CACHE_DIR):
+    os.makedirs(PDF_CACHE_DIR)
+    logger.debug("Created PDF cache directory: %s", PDF_CACHE_DIR)
+PDF_CACHE_MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+DOWNLOAD_PER_HOST = int(os.environ.get("DOWNLOAD_PER_HOST", "2"))
+DOWNLOAD_MIN_INTERVAL = float(os.environ.get("DOWNLOAD_MIN_INTERVAL", "0.5"))
+DOWNLOAD_RETRIES = int(os.environ.get("DOWNLOAD_RETRIES", "3"))
+DOWNLOAD_TIMEOUT = float(os.environ.get("DOWNLOAD_TIMEOUT", "60"))
+
+ARTICLE_STORE_MAX_BYTES = int(os.environ.get("ARTICLE_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Background conversion of the daily listing ahead of requests.
+PRECOMPUTE = os.environ.get("VIBE_PRECOMPUTE", "0").lower() in ("1", "true", "yes")
+PRECOMPUTE_SCOPE = os.environ.get("PRECOMPUTE_SCOPE", "all").lower()
+PRECOMPUTE_PROFILES = os.environ.get("PRECOMPUTE_PROFILES", os.path.join(BASE_DIR, "profiles.toml"))
+PRECOMPUTE_TOP_K = int(os.environ.get("PRECOMPUTE_TOP_K", "50"))
+PRECOMPUTE_WORKERS = int(os.environ.get("PRECOMPUTE_WORKERS", "1"))
+PRECOMPUTE_INTERVAL = int(os.environ.get("PRECOMPUTE_INTERVAL", "1800"))
@@ -0,0 +1,180 @@
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sections that add little to a spoken summary. Anything after references or
+# an appendix heading is treated as back matter and dropped as well.
+_DROP_HEADINGS = re.compile(
+    r"^(\d+(\.\d+)*\.?\s*)?("
+    r"acknowledge?ments?|funding|author contributions?|conflicts? of interest|competing interests|"
+    r"ethics statement|broader impacts?|reproducibility statement|data availability|"
+    r"(neurips )?(paper )?checklist|limitations and broader impacts"
+    r")\b",
+    re.IGNORECASE,
+)
+_BACK_MATTER_HEADINGS = re.compile(
+    r"^(\d+(\.\d+)*\.?\s*)?(references|bibliography|appendix|appendices|supplementary( material)?)\b",
+    re.IGNORECASE,
+)
+_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+_PLACEHOLDER = re.compile(r"<!--.*?-->")
+
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate (about four characters per token for English prose).
+    """
+    return len(text) // 4
+
+
+def split_sections(markdown):
+    """
+    Splits Markdown into (heading, body) pairs. Text before the first heading
+    gets an empty heading.
+    """
+    sections = []
+    heading = ""
+    lines = []
+    for line in markdown.splitlines():
+        match = _HEADING.match(line)
+        if match:
+            if heading or any(l.strip() for l in lines):
+                sections.append((heading, "\n".join(lines).strip()))
+            heading = match.group(2).strip()
+            lines = []
+        else:
+            lines.append(line)
+    if heading or any(l.strip() for l in lines):
+        sections.append((heading, "\n".join(lines).strip()))
+    return sections
+
+
+def _clean_body(body):
+    kept = []
+    for line in body.splitlines():
+        stripped = line.strip()
+        # Tables and image/formula placeholders do not survive narration.
+        if stripped.startswith("|") or stripped.startswith("!["):
+            continue
+        line = _PLACEHOLDER.sub("", line)
+        kept.append(line.rstrip())
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+
+
+def reduce_content(markdown):
+    """
+    Drops low-value sections (references, appendices, acknowledgements,
+    checklists, ...) and strips tables and placeholders from the rest.
+    Returns the reduced Markdown.
+    """
+    kept = []
+    dropped = []
+    for heading, body in split_sections(markdown):
+        if _BACK_MATTER_HEADINGS.match(heading):
+            dropped.append(heading)
+            break
+        if _DROP_HEADINGS.match(heading):
+            dropped.append(heading)
+            continue
+        body = _clean_body(body)
+        if not body and not heading:
+            continue
+        kept.append(f"## {heading}\n\n{body}" if heading else body)
+    reduced = "\n\n".join(kept)
+    logger.debug(
+        "Reduced article from ~%d to ~%d tokens (dropped: %s).",
+        estimate_tokens(markdown), estimate_tokens(reduced), ", ".join(dropped) or "nothing",
+    )
+    return reduced
+
+
+def chunk_content(markdown, token_budget):
+    """
+    Groups consecutive sections into chunks of at most token_budget tokens.
+    Sections larger than the budget are split at paragraph boundaries, and
+    single oversized paragraphs are cut by length.
+    """
+    max_chars = max(token_budget * 4, 1)
+    pieces = []
+    for heading, body in split_sections(markdown):
+        text = f"## {heading}\n\n{body}" if heading else body
+        if len(text) <= max_chars:
+            pieces.append(text)
+            continue
+        for paragraph in re.split(r"\n\s*\n", text):
+            while len(paragraph) > max_chars:
+                pieces.append(paragraph[:max_chars])
+                paragraph = paragraph[max_chars:]
+            if paragraph.strip():
+                pieces.append(paragraph)
+
+    chunks = []
+    current = []
+    current_len = 0
+    for piece in pieces:
+        if current and current_len + len(piece) + 2 > max_chars:
+            chunks.append("\n\n".join(current))
+            current = []
+            current_len = 0
+        current.append(piece)
+        current_len += len(piece) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+# Terminal punctuation, optionally followed by closing quotes or brackets, then whitespace; or a blank line.
+_SENTENCE_END = re.compile(r"[.!?][\"'”’)\]]*\s+|\n\s*\n")
+_ABBREVIATIONS = frozenset(["eg", "ie", "al", "fig", "figs", "eq", "eqs", "vs", "dr", "mr", "mrs", "ms", "prof",
+                            "sec", "cf", "approx", "no", "resp"])
+
+
+def _ends_in_abbreviation(text):
+    match = re.search(r"([A-Za-z.]+)$", text)
+    if not match:
+        return False
+    word = match.group(1)
+    # Initials such as "A. Smith" do not end a sentence either.
+    return word.lower().replace(".", "") in _ABBREVIATIONS or (len(word) == 1 and word.isupper())
+
+
+def _sentence_boundary(text, min_chars):
+    for match in _SENTENCE_END.finditer(text):
+        if "\n\n" in match.group().replace(" ", ""):
+            return match.end()
+        if match.start() + 1 < min_chars:
+            continue
+        if match.group()[0] == "." and _ends_in_abbreviation(text[:match.start()]):
+            continue
+        return match.end()
+    return None
+
+
+# Marks a paragraph (or article) boundary in a stream of sentences; TTSEngine.stream_mp3 speaks it as a pause.
+PARAGRAPH_BREAK = "\n\n"
+
+
+def iter_sentences(pieces, min_chars=40, paragraph_breaks=False):
+    """
+    Re-chunks streamed text pieces into complete sentences, yielding each as
+    soon as it ends. Paragraph breaks always end a chunk; sentences shorter
+    than min_chars are joined with the next one, and common abbreviations
+    ("e.g.", "et al.", "Fig.") do not end a sentence. With paragraph_breaks,
+    PARAGRAPH_BREAK is yielded after a sentence that ends a paragraph.
+    """
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        while True:
+            cut = _sentence_boundary(buffer, min_chars)
+            if cut is None:
+                break
+            chunk, buffer = buffer[:cut], buffer[cut:]
+            sentence = chunk.strip()
+            if sentence:
+                yield sentence
+                if paragraph_breaks and re.search(r"\n\s*\n", chunk[len(chunk.rstrip()):]):
+                    yield PARAGRAPH_BREAK
+    if buffer.strip():
+        yield buffer.strip()
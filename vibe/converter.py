@@ -1,67 +1,203 @@
-import os
 import json
-import tempfile
-import requests
 import logging
 import subprocess
-from docling.document_converter import DocumentConverter, PdfFormatOption
-from docling.datamodel.pipeline_options import PdfPipelineOptions
-from docling.datamodel.base_models import InputFormat
+import threading
+from importlib import metadata
 
-from .config import ARTICLES_CACHE_DIR
+from .config import (
+    CONVERT_WORKERS, CONVERT_TIMEOUT, CONVERT_MAX_RSS_MB, CONVERT_MAX_DOCS, CONVERT_FAILURE_TTL,
+    EXTRACTION_MODE, TEXT_LAYER_MIN_CHARS_PER_PAGE,
+)
+from .article_store import get_article_store
+from .limits import stage_slot
+from .metrics import REGISTRY, span, record_cache_lookup
+from .text_layer import extract_pages, assess_pages, pages_to_markdown
+from .downloader import download_pdf
+from .worker_pool import IsolatedWorkerPool, WorkerError
 
 logger = logging.getLogger(__name__)
 
-pipeline_options = PdfPipelineOptions()
-pipeline_options.ocr_options.use_gpu = False
-pipeline_options.generate_picture_images = False
-pdf_options = PdfFormatOption(pipeline_options=pipeline_options)
-doc_converter = DocumentConverter(format_options={InputFormat.PDF: pdf_options})
-doc_converter = DocumentConverter()
+try:
+    CONVERTER_VERSION = "docling-" + metadata.version("docling")
+except metadata.PackageNotFoundError:
+    CONVERTER_VERSION = "docling-unknown"
+try:
+    TEXT_LAYER_VERSION = "pypdfium2-" + metadata.version("pypdfium2")
+except metadata.PackageNotFoundError:
+    TEXT_LAYER_VERSION = "pypdfium2-unknown"
+
+_doc_converter = None
+_doc_converter_lock = threading.Lock()
+
+
+def get_doc_converter():
+    """
+    Returns this process's Docling DocumentConverter, importing Docling and
+    building the converter on first use.
+    """
+    global _doc_converter
+    with _doc_converter_lock:
+        if _doc_converter is None:
+            from docling.document_converter import DocumentConverter, PdfFormatOption
+            from docling.datamodel.pipeline_options import PdfPipelineOptions
+            from docling.datamodel.base_models import InputFormat
+
+            logger.info("Loading Docling document converter.")
+            pipeline_options = PdfPipelineOptions()
+            pipeline_options.ocr_options.use_gpu = False
+            pipeline_options.generate_picture_images = False
+            # Tables are stripped before summarization (content.reduce_content), so skip TableFormer.
+            pipeline_options.do_table_structure = False
+            pdf_options = PdfFormatOption(pipeline_options=pipeline_options)
+            _doc_converter = DocumentConverter(format_options={InputFormat.PDF: pdf_options})
+        return _doc_converter
+
+
+_convert_pool = None
+_convert_pool_lock = threading.Lock()
+
+
+def _get_convert_pool():
+    """
+    Returns the shared pool of isolated Docling worker processes, creating it
+    on first use. The pool is bounded by CONVERT_WORKERS across all callers;
+    a document gets CONVERT_TIMEOUT seconds and CONVERT_MAX_RSS_MB of memory,
+    and each worker is replaced after CONVERT_MAX_DOCS documents.
+    """
+    global _convert_pool
+    with _convert_pool_lock:
+        if _convert_pool is None:
+            logger.info("Starting Docling conversion pool with %d workers.", CONVERT_WORKERS)
+            _convert_pool = IsolatedWorkerPool(
+                CONVERT_WORKERS,
+                timeout=CONVERT_TIMEOUT or None,
+                max_rss=CONVERT_MAX_RSS_MB * 1024 * 1024 or None,
+                max_tasks=CONVERT_MAX_DOCS or None,
+                name="docling",
+            )
+        return _convert_pool
+
+
+def _convert_pdf(pdf_path):
+    """
+    Runs inside a conversion worker process: converts the PDF at pdf_path
+    with Docling and returns the Markdown text.
+    """
+    conv_result = get_doc_converter().convert(source=pdf_path)
+    return conv_result.document.export_to_markdown()
+
+
+def _load_converter():
+    get_doc_converter()
+    return True
+
+
+def warm_up():
+    """
+    Starts the conversion pool and loads Docling in its workers so that the
+    first conversion does not pay for model loading. Blocks until done.
+    """
+    _get_convert_pool().warm_up(_load_converter)
+
+
+def _extract_text_layer(article_id, pdf_path, force=False):
+    """
+    Fast tier: returns Markdown built from the PDF's text layer, or None when
+    the text layer is missing or, unless force is set, too poor to use.
+    """
+    try:
+        with span("extract", article=article_id):
+            pages = extract_pages(pdf_path)
+    except ImportError:
+        logger.warning("pypdfium2 is not installed; using Docling for every article.")
+        return None
+    except Exception as e:
+        logger.warning("Text layer extraction failed for article '%s': %s", article_id, e)
+        return None
+    ok, reason = assess_pages(pages, TEXT_LAYER_MIN_CHARS_PER_PAGE)
+    if not ok and not force:
+        logger.info("Text layer of article '%s' rejected (%s); escalating to Docling.", article_id, reason)
+        return None
+    return pages_to_markdown(pages) or None
+
+
+def current_converter_versions():
+    """
+    Returns the converter versions whose stored output is still served:
+    either tier's current version, or only Docling's when EXTRACTION_MODE
+    is "docling".
+    """
+    if EXTRACTION_MODE == "docling":
+        return (CONVERTER_VERSION,)
+    return (TEXT_LAYER_VERSION, CONVERTER_VERSION)
+
 
 def fetch_and_convert_article(article):
     """
-    Checks for a cached conversion of the article.
-    If absent, downloads the PDF, converts it using Docling,
-    caches the Markdown text, and returns it.
+    Checks for a cached conversion of the article by a current converter
+    version (see current_converter_versions).
+    If absent, fetches the PDF through the shared downloader (which keeps its
+    own PDF cache) and extracts its text in tiers: the PDF text layer first
+    (fast, in this thread), then Docling in an isolated worker process
+    when the text layer looks scanned or garbled (see EXTRACTION_MODE).
+    Caches the Markdown text with the tier used and returns it.
+    Documents Docling fails on (errors, timeouts, memory ceiling, crashes)
+    are recorded in the article store and skipped for CONVERT_FAILURE_TTL.
+    Safe to call concurrently from several threads.
     """
-    safe_id = article["id"].replace(":", "_")
-    cache_file = os.path.join(ARTICLES_CACHE_DIR, f"{safe_id}.txt")
+    store = get_article_store()
     logger.debug("Checking for cached conversion of article '%s'.", article["id"])
-    if os.path.exists(cache_file):
+    cached = store.get(article["id"], converter_versions=current_converter_versions())
+    record_cache_lookup("article", cached is not None)
+    if cached is not None:
         logger.info("Found cached conversion for article '%s'.", article["id"])
-        with open(cache_file, "r", encoding="utf-8") as f:
-            return f.read()
+        return cached
+    # Only Docling failures are recorded; with EXTRACTION_MODE "text" Docling is not used.
+    failure = None
+    if EXTRACTION_MODE != "text":
+        failure = store.failure(article["id"], CONVERT_FAILURE_TTL, converter_version=CONVERTER_VERSION)
+    if failure is not None:
+        logger.info("Skipping article '%s': conversion failed %d times, last with %s.",
+                    article["id"], failure["attempts"], failure["reason"])
+        REGISTRY.inc("vibe_conversions_skipped_total", help="Articles skipped after an earlier failed conversion.")
+        return ""
 
     if not article["pdf_url"]:
         logger.error("No PDF URL for article '%s'. Skipping conversion.", article["id"])
         return ""
-    logger.info("Downloading PDF for article '%s' from %s", article["id"], article["pdf_url"])
-    response = requests.get(article["pdf_url"])
-    if response.status_code != 200:
+    logger.info("Fetching PDF for article '%s' from %s", article["id"], article["pdf_url"])
+    with span("download", article=article["id"]):
+        pdf_path = download_pdf(article["pdf_url"])
+    if not pdf_path:
         logger.error("Failed to download PDF for article '%s'.", article["id"])
         return ""
 
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp_pdf:
-        tmp_pdf.write(response.content)
-        tmp_pdf_path = tmp_pdf.name
-    logger.debug("PDF saved temporarily at %s", tmp_pdf_path)
+    if EXTRACTION_MODE != "docling":
+        converted_text = _extract_text_layer(article["id"], pdf_path, force=EXTRACTION_MODE == "text")
+        if converted_text:
+            REGISTRY.inc("vibe_extractions_total", help="Article extractions, by tier.", tier="text")
+            store.put(article["id"], converted_text, converter_version=TEXT_LAYER_VERSION, tier="text")
+            logger.info("Extracted text layer of article '%s'. Cached output.", article["id"])
+            return converted_text
+        if EXTRACTION_MODE == "text":
+            logger.error("No text layer for article '%s' and Docling is disabled.", article["id"])
+            return ""
 
     try:
         logger.info("Converting PDF for article '%s' using Docling.", article["id"])
-        conv_result = doc_converter.convert(source=tmp_pdf_path)
-        converted_text = conv_result.document.export_to_markdown()
-        with open(cache_file, "w", encoding="utf-8") as f:
-            f.write(converted_text)
+        with stage_slot("docling"), span("convert", article=article["id"]):
+            converted_text = _get_convert_pool().run(_convert_pdf, pdf_path)
+        REGISTRY.inc("vibe_extractions_total", help="Article extractions, by tier.", tier="docling")
+        store.put(article["id"], converted_text, converter_version=CONVERTER_VERSION, tier="docling")
         logger.info("Conversion successful for article '%s'. Cached output.", article["id"])
         return converted_text
-    except SystemExit as se:
-        logger.exception("Docling conversion exited with error code %s for article '%s'. Skipping conversion.", se.code, article["id"])
+    except WorkerError as e:
+        logger.error("Docling conversion of article '%s' failed (%s): %s", article["id"], e.reason, e)
+        REGISTRY.inc("vibe_conversion_failures_total", help="Failed Docling conversions, by reason.", reason=e.reason)
+        # A missing Docling install is not the document's fault.
+        if e.error_type not in ("ImportError", "ModuleNotFoundError"):
+            store.record_failure(article["id"], e.reason, converter_version=CONVERTER_VERSION)
         return ""
     except Exception as e:
         logger.exception("Conversion failed for article '%s': %s", article["id"], e)
         return ""
-    finally:
-        if os.path.exists(tmp_pdf_path):
-            os.unlink(tmp_pdf_path)
-            logger.debug("Temporary PDF file %s removed.", tmp_pdf_path)
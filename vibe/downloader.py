@@ -0,0 +1,233 @@
+import os
+import time
+import random
+import hashlib
+import sqlite3
+import logging
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import record_cache_lookup
+from .config import (
+    PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES, DOWNLOAD_WORKERS, DOWNLOAD_PER_HOST,
+    DOWNLOAD_MIN_INTERVAL, DOWNLOAD_RETRIES, DOWNLOAD_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Cached PDFs handed out (downloaded or looked up) this recently are never evicted,
+# since a conversion may still be reading them.
+EVICTION_GRACE_SECONDS = 600
+USER_AGENT = "vibe/1.0 (+https://github.com/regismesquita/arxiv_audio_summary)"
+
+
+class _HostLimiter:
+    """
+    Politeness limits for one host: at most `concurrency` requests in flight
+    and at least `min_interval` seconds between request starts.
+    """
+
+    def __init__(self, concurrency, min_interval):
+        self.semaphore = threading.BoundedSemaphore(concurrency)
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def __enter__(self):
+        self.semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+        return self
+
+    def __exit__(self, *exc):
+        self.semaphore.release()
+
+
+class PDFDownloader:
+    """
+    Downloads PDFs through a shared, connection-pooled session, streaming each
+    response to disk in chunks with retries and exponential backoff. Files are
+    stored content-addressed (by SHA-256) in cache_dir, and an SQLite index
+    maps URLs to digests so repeated requests never hit the network.
+    """
+
+    def __init__(self, cache_dir, max_bytes=0, per_host=2, min_interval=0.5,
+                 retries=3, timeout=60, pool_size=10, chunk_size=64 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.per_host = per_host
+        self.min_interval = min_interval
+        self.retries = retries
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pdfs ("
+            " url TEXT PRIMARY KEY,"
+            " digest TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _host_limiter(self, url):
+        host = urlparse(url).netloc
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = _HostLimiter(self.per_host, self.min_interval)
+            return self._hosts[host]
+
+    def _path_for(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.pdf")
+
+    def cached_path(self, url):
+        """
+        Returns the cached file for url, or None if it has not been downloaded.
+        """
+        with self._db_lock:
+            row = self._conn.execute("SELECT digest FROM pdfs WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        path = self._path_for(row[0])
+        if not os.path.exists(path):
+            return None
+        os.utime(path, None)
+        return path
+
+    def _fetch_once(self, url, partial_path):
+        """
+        Streams url into partial_path. Returns (status_code, digest, size, retry_after).
+        """
+        with self._host_limiter(url):
+            with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                if response.status_code != 200:
+                    return response.status_code, None, 0, response.headers.get("Retry-After")
+                sha = hashlib.sha256()
+                size = 0
+                with open(partial_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            sha.update(chunk)
+                            size += len(chunk)
+                return 200, sha.hexdigest(), size, None
+
+    def download(self, url):
+        """
+        Returns a local path for the PDF at url, downloading it if needed, or
+        None if it could not be fetched.
+        """
+        path = self.cached_path(url)
+        record_cache_lookup("pdf", path is not None)
+        if path:
+            logger.info("Using cached PDF for %s", url)
+            return path
+
+        partial_path = os.path.join(self.cache_dir, f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.{threading.get_ident()}.part")
+        try:
+            for attempt in range(self.retries + 1):
+                retry_after = None
+                try:
+                    status, digest, size, retry_after = self._fetch_once(url, partial_path)
+                except requests.RequestException as e:
+                    status, digest = None, None
+                    logger.warning("Download of %s failed (attempt %d): %s", url, attempt + 1, e)
+                if status == 200:
+                    path = self._path_for(digest)
+                    os.replace(partial_path, path)
+                    with self._db_lock:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO pdfs (url, digest, size, fetched_at) VALUES (?, ?, ?, ?)",
+                            (url, digest, size, time.time()),
+                        )
+                        self._conn.commit()
+                    logger.info("Downloaded %s (%d bytes).", url, size)
+                    self._prune()
+                    return path
+                if status is not None and status not in RETRY_STATUSES:
+                    logger.error("Download of %s failed with status %d.", url, status)
+                    return None
+                if attempt < self.retries:
+                    delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+                    delay += random.uniform(0, 0.5)
+                    logger.info("Retrying download of %s in %.1fs (status %s).", url, delay, status)
+                    time.sleep(delay)
+            logger.error("Giving up on %s after %d attempts.", url, self.retries + 1)
+            return None
+        finally:
+            if os.path.exists(partial_path):
+                os.unlink(partial_path)
+
+    def _prune(self):
+        """
+        Evicts the least recently used files, with every URL that maps to
+        them, until the cache fits in max_bytes. Files handed out within
+        EVICTION_GRACE_SECONDS (their mtime) are kept.
+        """
+        if not self.max_bytes:
+            return
+        cutoff = time.time() - EVICTION_GRACE_SECONDS
+        with self._db_lock:
+            # Several URLs may share one content-addressed file; count and evict it once.
+            rows = self._conn.execute("SELECT digest, MAX(size) FROM pdfs GROUP BY digest").fetchall()
+            entries = []
+            for digest, size in rows:
+                path = self._path_for(digest)
+                mtime = os.path.getmtime(path) if os.path.exists(path) else 0
+                entries.append((mtime, size, digest, path))
+            total = sum(size for _, size, _, _ in entries)
+            for mtime, size, digest, path in sorted(entries):
+                if total <= self.max_bytes or mtime > cutoff:
+                    break
+                self._conn.execute("DELETE FROM pdfs WHERE digest = ?", (digest,))
+                if os.path.exists(path):
+                    os.unlink(path)
+                total -= size
+                logger.debug("Evicted cached PDF %s", path)
+            self._conn.commit()
+
+
+_downloader = None
+_downloader_lock = threading.Lock()
+
+
+def get_downloader():
+    """
+    Returns the process-wide PDFDownloader, creating it on first use.
+    """
+    global _downloader
+    with _downloader_lock:
+        if _downloader is None:
+            _downloader = PDFDownloader(
+                PDF_CACHE_DIR,
+                max_bytes=PDF_CACHE_MAX_BYTES,
+                per_host=DOWNLOAD_PER_HOST,
+                min_interval=DOWNLOAD_MIN_INTERVAL,
+                retries=DOWNLOAD_RETRIES,
+                timeout=DOWNLOAD_TIMEOUT,
+                pool_size=max(DOWNLOAD_WORKERS, DOWNLOAD_PER_HOST) * 2,
+            )
+        return _downloader
+
+
+def download_pdf(url):
+    """
+    Returns a local path to the PDF at url using the shared downloader, or None on failure.
+    """
+    return get_downloader().download(url)
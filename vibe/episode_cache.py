@@ -0,0 +1,161 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+
+from .metrics import REGISTRY, record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_user_info(user_info):
+    """
+    Returns user_info with case, runs of whitespace and trailing punctuation
+    folded away, so that trivially different prompts share an episode.
+    """
+    return " ".join(user_info.casefold().split()).strip(" .,;!")
+
+
+def episode_key(user_info, articles, max_articles, llm_level, voice, **options):
+    """
+    Returns the cache key of a finished episode: the normalized prompt, the
+    listing (its UTC date and the ids it announces, since arXiv's announcement
+    does not follow UTC midnight), max_articles, llm_level, the voice (model,
+    voice name and speed) and any other options that change the result.
+    """
+    listing = hashlib.sha256("\n".join(sorted(a["id"] for a in articles)).encode("utf-8")).hexdigest()
+    raw = json.dumps([
+        normalize_user_info(user_info),
+        datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+        listing,
+        max_articles,
+        llm_level,
+        voice,
+        sorted(options.items()),
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def link_or_copy(source, destination):
+    """
+    Hard-links source to destination (replacing it), copying across file systems.
+    """
+    tmp_path = f"{destination}.tmp"
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class EpisodeCache:
+    """
+    Finished report MP3s, one file per episode_key in directory, evicted least
+    recently used first once they take more than max_bytes.
+
+    get_or_create runs at most one computation per key at a time: callers
+    asking for a key that is being built wait for that build and share its
+    result (or its error) instead of starting their own.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def lookup(self, key):
+        """
+        Returns the path of the stored episode for key, or None.
+        """
+        path = self.path(key)
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            record_cache_lookup("episode", False)
+            return None
+        record_cache_lookup("episode", True)
+        return path
+
+    def get_or_create(self, key, produce):
+        """
+        Returns the path of the episode for key, calling produce(output_mp3)
+        to build it when it is not stored yet.
+        """
+        while True:
+            path = self.lookup(key)
+            if path:
+                return path
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+            if leader:
+                break
+            REGISTRY.inc("vibe_episode_coalesced_total", help="Requests that waited for an identical episode being built.")
+            logger.info("Waiting for identical episode %s being built by another request.", key[:12])
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            # The episode may have been evicted in the meantime; look again.
+
+        path = self.path(key)
+        partial = f"{path[:-4]}.{os.getpid()}.{threading.get_ident()}.partial.mp3"
+        try:
+            produce(partial)
+            os.replace(partial, path)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            if os.path.exists(partial):
+                os.unlink(partial)
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        self.prune(keep=(path,))
+        return path
+
+    def prune(self, keep=()):
+        from .tts import prune_audio_cache
+
+        prune_audio_cache(self.directory, self.max_bytes, keep=keep)
+
+    def stats(self):
+        sizes = [entry.stat().st_size for entry in os.scandir(self.directory)
+                 if entry.name.endswith(".mp3") and not entry.name.endswith(".partial.mp3")]
+        return {"entries": len(sizes), "bytes": sum(sizes)}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_episode_cache():
+    """
+    Returns the process-wide EpisodeCache, creating it on first use.
+    Returns None when the cache is disabled via EPISODE_CACHE_ENABLED.
+    """
+    global _cache
+    from .config import EPISODE_CACHE_ENABLED, EPISODE_CACHE_DIR, EPISODE_CACHE_MAX_BYTES
+
+    if not EPISODE_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EpisodeCache(EPISODE_CACHE_DIR, EPISODE_CACHE_MAX_BYTES)
+    return _cache
@@ -1,71 +1,163 @@
 import os
+import re
 import json
+import time
 import requests
-from bs4 import BeautifulSoup
+from datetime import datetime, timezone, timedelta
 import logging
-from .config import ARXIV_CACHE_FILE
+from .config import LISTINGS_CACHE_DIR, LISTING_MAX_AGE, LISTING_RETENTION_DAYS, LISTING_ANNOUNCE_TYPES
+from .listing_parser import parse_listing
 
 logger = logging.getLogger(__name__)
 
+
+def _listing_category(arxiv_url):
+    """
+    Derives a file-name-safe cache key from the listing URL,
+    e.g. https://arxiv.org/list/cs/new -> "cs_new".
+    """
+    path = arxiv_url.split("://", 1)[-1].split("/", 1)[-1]
+    if path.startswith("list/"):
+        path = path[len("list/"):]
+    return re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "listing"
+
+
+def _listing_path(category, date):
+    return os.path.join(LISTINGS_CACHE_DIR, f"{category}_{date}.json")
+
+
+def _load_listing(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _latest_listing(category, before_date):
+    """
+    Returns the most recent cached listing for category dated before before_date, if any.
+    """
+    prefix = f"{category}_"
+    dates = sorted(
+        name[len(prefix):-len(".json")]
+        for name in os.listdir(LISTINGS_CACHE_DIR)
+        if name.startswith(prefix) and name.endswith(".json") and name[len(prefix):-len(".json")] < before_date
+    )
+    return _load_listing(_listing_path(category, dates[-1])) if dates else None
+
+
+def _save_listing(category, date, entry):
+    path = _listing_path(category, date)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
+
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=LISTING_RETENTION_DAYS)).strftime("%Y-%m-%d")
+    prefix = f"{category}_"
+    for name in os.listdir(LISTINGS_CACHE_DIR):
+        if name.startswith(prefix) and name.endswith(".json") and name[len(prefix):-len(".json")] < cutoff:
+            os.unlink(os.path.join(LISTINGS_CACHE_DIR, name))
+            logger.debug("Removed expired listing cache %s", name)
+
+
+def _parse_listing(html, known=None):
+    """
+    Parses the arXiv listing page. Entries whose id is already in known (a
+    dict of id -> article) are reused instead of being parsed again. Only
+    announce types listed in LISTING_ANNOUNCE_TYPES are kept.
+    """
+    known = known or {}
+    found_list, entries = parse_listing(html, known_ids=known)
+    if not found_list:
+        logger.error("No article list found on arXiv page.")
+        raise Exception("No article list found on arXiv page.")
+
+    articles = []
+    reused = 0
+    for entry in entries:
+        if entry.get("known"):
+            article = dict(known[entry["id"]], announce_type=entry["announce_type"])
+            reused += 1
+        else:
+            article = entry
+            logger.debug("Parsed article: %s", article["id"])
+        if article["announce_type"] in LISTING_ANNOUNCE_TYPES:
+            articles.append(article)
+    logger.debug("Parsed %d listing entries (%d reused), kept %d.", len(entries), reused, len(articles))
+    return articles
+
+
+def cached_arxiv_list(arxiv_url=None):
+    """
+    Returns today's listing if a cached copy is younger than LISTING_MAX_AGE
+    seconds, else None. Never makes a request.
+    """
+    if arxiv_url is None:
+        from .config import DEFAULT_ARXIV_URL
+        arxiv_url = DEFAULT_ARXIV_URL
+
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    cached = _load_listing(_listing_path(_listing_category(arxiv_url), today))
+    if cached and time.time() - cached["fetched_at"] < LISTING_MAX_AGE:
+        return cached["articles"]
+    return None
+
+
 def fetch_arxiv_list(force_refresh=False, arxiv_url=None):
     """
-    Fetches the latest CS articles from arXiv. If a cache exists, reads from it
-    unless force_refresh is True. Otherwise, parses the arXiv page, extracts
-    article metadata, and caches it.
+    Fetches the latest CS articles from arXiv. Listings are cached per
+    category and (UTC) date. A cached listing younger than LISTING_MAX_AGE
+    seconds is returned without any request unless force_refresh is True;
+    otherwise the page is re-requested conditionally (ETag/Last-Modified), a
+    304 keeps the cached listing, and on a changed page only newly announced
+    ids are parsed and merged with the already known articles.
     """
     if arxiv_url is None:
         from .config import DEFAULT_ARXIV_URL
         arxiv_url = DEFAULT_ARXIV_URL
 
-    logger.debug("Checking for cached arXIV list at %s", ARXIV_CACHE_FILE)
-    if not force_refresh and os.path.exists(ARXIV_CACHE_FILE):
-        logger.info("Cache found for arXiv list. Loading from cache.")
-        with open(ARXIV_CACHE_FILE, "r", encoding="utf-8") as f:
-            articles = json.load(f)
-        logger.debug("Loaded %d articles from cache.", len(articles))
-        return articles
+    category = _listing_category(arxiv_url)
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    cached = _load_listing(_listing_path(category, today))
+    logger.debug("Checking for cached arXiv listing %s for %s", category, today)
+    if cached and not force_refresh and time.time() - cached["fetched_at"] < LISTING_MAX_AGE:
+        logger.info("Fresh cache found for arXiv listing %s. Loading from cache.", category)
+        logger.debug("Loaded %d articles from cache.", len(cached["articles"]))
+        return cached["articles"]
+
+    # Validators from today's listing, or the last one we saw, make the request conditional.
+    base = cached or _latest_listing(category, today)
+    headers = {}
+    if base and base.get("etag"):
+        headers["If-None-Match"] = base["etag"]
+    if base and base.get("last_modified"):
+        headers["If-Modified-Since"] = base["last_modified"]
 
     logger.info("Fetching arXiv page from %s", arxiv_url)
-    response = requests.get(arxiv_url)
+    response = requests.get(arxiv_url, headers=headers, timeout=60)
+    if response.status_code == 304 and base:
+        logger.info("arXiv listing %s not modified since last fetch.", category)
+        base["fetched_at"] = time.time()
+        base["date"] = today
+        _save_listing(category, today, base)
+        return base["articles"]
     if response.status_code != 200:
         logger.error("Failed to fetch arXiv page. Status code: %d", response.status_code)
         raise Exception("Failed to fetch arXiv page.")
 
     logger.debug("Parsing arXiv HTML content.")
-    soup = BeautifulSoup(response.text, "html.parser")
-    articles = []
-    dl = soup.find("dl")
-    if not dl:
-        logger.error("No article list found on arXiv page.")
-        raise Exception("No article list found on arXiv page.")
+    known = {article["id"]: article for article in base["articles"]} if base else {}
+    articles = _parse_listing(response.text, known=known)
 
-    dts = dl.find_all("dt")
-    dds = dl.find_all("dd")
-    logger.debug("Found %d dt tags and %d dd tags.", len(dts), len(dds))
-    for dt, dd in zip(dts, dds):
-        id_link = dt.find("a", title="Abstract")
-        if not id_link:
-            logger.debug("Skipping an article with no abstract link.")
-            continue
-        article_id = id_link.text.strip()
-        pdf_link = dt.find("a", title="Download PDF")
-        pdf_url = "https://arxiv.org" + pdf_link["href"] if pdf_link else None
-
-        title_div = dd.find("div", class_="list-title")
-        title = title_div.text.replace("Title:", "").strip() if title_div else "No title"
-
-        abstract_div = dd.find("p", class_="mathjax")
-        abstract = abstract_div.text.strip() if abstract_div else "No abstract"
-
-        articles.append({
-            "id": article_id,
-            "title": title,
-            "abstract": abstract,
-            "pdf_url": pdf_url,
-        })
-        logger.debug("Parsed article: %s", article_id)
-
-    with open(ARXIV_CACHE_FILE, "w", encoding="utf-8") as f:
-        json.dump(articles, f)
-    logger.info("Cached %d articles to %s", len(articles), ARXIV_CACHE_FILE)
-    return articles
\ No newline at end of file
+    _save_listing(category, today, {
+        "url": arxiv_url,
+        "date": today,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "fetched_at": time.time(),
+        "articles": articles,
+    })
+    logger.info("Cached %d articles for listing %s (%s)", len(articles), category, today)
+    return articles
@@ -1,57 +1,291 @@
 import json
 import re
+import time
 import logging
 import concurrent.futures
 
-from .llm import chat_llm
+from .llm import chat_llm, is_rate_limit_error, retry_after
+from .limits import AdaptiveLimiter
+from .content import estimate_tokens
+from .config import (
+    FILTER_BATCH_TOKENS, FILTER_MAX_BATCH, FILTER_CONCURRENCY, FILTER_RETRIES, FILTER_PROFILES_PER_PROMPT,
+)
 
 logger = logging.getLogger(__name__)
 
-def batch_relevance_filter(articles, user_info, batch_size=50, llm_level="medium"):
+# Attempts allowed for a batch that keeps getting rate limited, on top of FILTER_RETRIES.
+RATE_LIMIT_RETRIES = 8
+# Seconds before the first retry of a batch whose LLM call failed; doubled on each further retry.
+ERROR_BACKOFF_SECONDS = 2.0
+# Rough per-article overhead of the "Article ID/Title/Abstract" framing.
+ARTICLE_OVERHEAD_TOKENS = 20
+
+# Shared by every run in the process so that concurrent jobs back off together.
+_limiter = AdaptiveLimiter(FILTER_CONCURRENCY)
+
+
+def _article_tokens(article):
+    return estimate_tokens(article["title"]) + estimate_tokens(article["abstract"]) + ARTICLE_OVERHEAD_TOKENS
+
+
+def make_batches(articles, token_budget, max_batch):
+    """
+    Groups articles, in order, into batches whose estimated prompt size stays
+    within token_budget and which hold at most max_batch articles. An article
+    larger than the budget gets a batch of its own.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for article in articles:
+        tokens = _article_tokens(article)
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_batch):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(article)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _normalize_id(article_id):
+    return re.sub(r"^arxiv:\s*", "", str(article_id).strip(), flags=re.IGNORECASE).lower()
+
+
+def _build_prompt(batch, user_info):
+    prompt_lines = [f"User info: {user_info}\n"]
+    prompt_lines.append(
+        "For each of the following articles, determine if it is relevant to the user. "
+        "Respond in JSON format with keys as the article IDs and values as 'yes' or 'no'. "
+        "Do not add extra text; the response must start with '{'."
+    )
+    for article in batch:
+        prompt_lines.append(
+            f"Article ID: {article['id']}\nTitle: {article['title']}\nAbstract: {article['abstract']}\n"
+        )
+    return "\n".join(prompt_lines)
+
+
+def _parse_verdicts(response_text, batch):
+    """
+    Returns {article_id: bool} for the articles of batch answered in
+    response_text. Ids are matched with or without the "arXiv:" prefix.
+    """
+    match = re.search(r"\{.*\}", response_text, re.DOTALL)
+    if not match:
+        logger.warning("No valid JSON object found in LLM response for relevance filter.")
+        return {}
+    logger.debug("Batch response: %s", match.group(0)[:200])
+    try:
+        result = json.loads(match.group(0))
+    except ValueError as e:
+        logger.warning("Could not parse relevance filter response: %s", e)
+        return {}
+    if not isinstance(result, dict):
+        return {}
+
+    ids = {_normalize_id(article["id"]): article["id"] for article in batch}
+    verdicts = {}
+    for key, verdict in result.items():
+        article_id = ids.get(_normalize_id(key))
+        if article_id and isinstance(verdict, str) and verdict.lower().strip() in ("yes", "no"):
+            verdicts[article_id] = verdict.lower().strip() == "yes"
+    return verdicts
+
+
+def _evaluate_in_batches(articles, build_prompt, parse, token_budget, batch_size, llm_level, use_cache,
+                         limiter, retries):
+    """
+    Runs build_prompt(batch) for token-sized batches of articles under the
+    adaptive limiter and collects parse(response_text, batch), a dict of
+    article id -> verdict. Articles missing from a parsed response are split
+    into smaller batches and retried; a batch whose LLM call failed is retried
+    whole, with backoff. Returns (verdicts, unresolved articles).
+    """
+
+    def process_batch(batch, attempt, delay=0.0):
+        """
+        Returns (verdicts, failure) for one batch; failure is None, "rate_limited" or "error".
+        """
+        if delay:
+            time.sleep(delay)
+        prompt = build_prompt(batch)
+        with limiter.slot():
+            try:
+                # Retries bypass the cache so a malformed cached answer is not replayed.
+                response_text = chat_llm(prompt, level=llm_level, use_cache=use_cache and attempt == 0,
+                                         raise_errors=True)
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    limiter.record_rate_limit(retry_after(e))
+                    return {}, "rate_limited"
+                logger.warning("Relevance check of %d articles failed: %s", len(batch), e)
+                return {}, "error"
+        limiter.record_success()
+        return parse(response_text, batch), None
+
+    verdicts = {}
+    unresolved = []
+    batches = make_batches(articles, token_budget, batch_size)
+    logger.debug("Relevance check uses %d batches.", len(batches))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(limiter.max_limit, 1)) as executor:
+        pending = {executor.submit(process_batch, batch, 0): (batch, 0, 0) for batch in batches}
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                batch, attempt, throttled = pending.pop(future)
+                result, failure = future.result()
+                verdicts.update(result)
+                missing = [article for article in batch if article["id"] not in result]
+                if not missing:
+                    continue
+
+                delay = 0.0
+                if failure == "rate_limited":
+                    retry_batches = [(missing, attempt, throttled + 1)] if throttled < RATE_LIMIT_RETRIES else []
+                elif failure == "error":
+                    # Splitting would only multiply calls while the LLM is failing.
+                    retry_batches = [(missing, attempt + 1, throttled)] if attempt < retries else []
+                    delay = ERROR_BACKOFF_SECONDS * 2 ** attempt
+                elif len(missing) > 1:
+                    middle = len(missing) // 2
+                    retry_batches = [(missing[:middle], attempt, throttled), (missing[middle:], attempt, throttled)]
+                elif attempt < retries:
+                    retry_batches = [(missing, attempt + 1, throttled)]
+                else:
+                    retry_batches = []
+
+                if not retry_batches:
+                    unresolved.extend(missing)
+                    continue
+                logger.debug("Retrying %d unanswered articles in %d batches.", len(missing), len(retry_batches))
+                for retry_batch, retry_attempt, retry_throttled in retry_batches:
+                    pending[executor.submit(process_batch, retry_batch, retry_attempt, delay)] = (
+                        retry_batch, retry_attempt, retry_throttled
+                    )
+
+    if unresolved:
+        logger.error("No relevance verdict for %d articles after retries: %s",
+                     len(unresolved), ", ".join(a["id"] for a in unresolved))
+    return verdicts, unresolved
+
+
+def batch_relevance_filter(articles, user_info, batch_size=None, llm_level="medium", use_cache=True,
+                           token_budget=None, limiter=None, retries=None):
     """
     Sends articles to the LLM in batches to check their relevance.
     Expects a JSON response mapping article IDs to "yes" or "no".
-    This version parallelizes the batched requests using chat_llm.
+    Batches are sized by estimated tokens (token_budget, at most batch_size
+    articles) and run concurrently under an adaptive limiter that backs off
+    on rate limits. Articles missing from a response are split into smaller
+    batches and retried, so every article gets a verdict unless the LLM
+    keeps failing; those are logged and treated as not relevant.
     """
-    relevant_article_ids = set()
     logger.info("Starting batched relevance check for %d articles.", len(articles))
+    verdicts, _ = _evaluate_in_batches(
+        articles,
+        lambda batch: _build_prompt(batch, user_info),
+        _parse_verdicts,
+        token_budget=max((token_budget or FILTER_BATCH_TOKENS) - estimate_tokens(user_info), 1),
+        batch_size=batch_size or FILTER_MAX_BATCH,
+        llm_level=llm_level,
+        use_cache=use_cache,
+        limiter=limiter or _limiter,
+        retries=FILTER_RETRIES if retries is None else retries,
+    )
+    relevant_article_ids = {article_id for article_id, relevant in verdicts.items() if relevant}
+    logger.info("Batched relevance check complete. %d articles marked as relevant.", len(relevant_article_ids))
+    return relevant_article_ids
+
 
-    def process_batch(batch):
-        local_relevant_ids = set()
-        prompt_lines = [f"User info: {user_info}\n"]
+def _build_profiles_prompt(batch, labeled_profiles):
+    prompt_lines = ["Readers:"]
+    for label, profile in labeled_profiles:
+        prompt_lines.append(f"{label}: {profile['user_info']}")
+    prompt_lines.append(
+        "\nFor each of the following articles, decide which of the readers above it is relevant to. "
+        "Respond in JSON format with keys as the article IDs and values as lists of reader labels "
+        "(an empty list if it is relevant to none). Do not add extra text; the response must start with '{'."
+    )
+    for article in batch:
         prompt_lines.append(
-            "For each of the following articles, determine if it is relevant to the user. "
-            "Respond in JSON format with keys as the article IDs and values as 'yes' or 'no'. "
-            "Do not add extra text; the response must start with '{'."
+            f"Article ID: {article['id']}\nTitle: {article['title']}\nAbstract: {article['abstract']}\n"
         )
-        for article in batch:
-            prompt_lines.append(
-                f"Article ID: {article['id']}\nTitle: {article['title']}\nAbstract: {article['abstract']}\n"
-            )
-        prompt = "\n".join(prompt_lines)
-
-        try:
-            response_text = chat_llm(prompt, level=llm_level)
-            match = re.search(r"\{.*\}", response_text, re.DOTALL)
-            if not match:
-                logger.error("No valid JSON object found in LLM response for relevance filter.")
-                return local_relevant_ids
-            json_str = match.group(0)
-            logger.debug("Batch response: %s", json_str[:200])
-            result = json.loads(json_str)
-            for article_id, verdict in result.items():
-                if isinstance(verdict, str) and verdict.lower().strip() == "yes":
-                    local_relevant_ids.add(article_id)
-        except Exception as e:
-            logger.exception("Error during batched relevance check: %s", e)
-
-        return local_relevant_ids
-
-    batches = [articles[i: i + batch_size] for i in range(0, len(articles), batch_size)]
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = [executor.submit(process_batch, batch) for batch in batches]
-        for future in concurrent.futures.as_completed(futures):
-            relevant_article_ids.update(future.result())
+    return "\n".join(prompt_lines)
 
-    logger.info("Batched relevance check complete. %d articles marked as relevant.", len(relevant_article_ids))
-    return relevant_article_ids
\ No newline at end of file
+
+def _parse_profile_verdicts(response_text, batch, labels):
+    """
+    Returns {article_id: set of profile names} from a multi-reader response.
+    Values may be lists of labels, comma-separated strings, or label -> yes/no maps.
+    """
+    match = re.search(r"\{.*\}", response_text, re.DOTALL)
+    if not match:
+        logger.warning("No valid JSON object found in LLM response for multi-profile filter.")
+        return {}
+    try:
+        result = json.loads(match.group(0))
+    except ValueError as e:
+        logger.warning("Could not parse multi-profile filter response: %s", e)
+        return {}
+    if not isinstance(result, dict):
+        return {}
+
+    ids = {_normalize_id(article["id"]): article["id"] for article in batch}
+    labels = {label.upper(): name for label, name in labels.items()}
+    verdicts = {}
+    for key, value in result.items():
+        article_id = ids.get(_normalize_id(key))
+        if not article_id:
+            continue
+        if isinstance(value, str):
+            value = [v for v in re.split(r"[,\s]+", value) if v]
+        elif isinstance(value, dict):
+            value = [k for k, v in value.items() if isinstance(v, str) and v.lower().strip() == "yes"]
+        elif not isinstance(value, list):
+            continue
+        verdicts[article_id] = {labels[v.strip().upper()] for v in value
+                                if isinstance(v, str) and v.strip().upper() in labels}
+    return verdicts
+
+
+def multi_profile_relevance_filter(articles, profiles, llm_level="medium", use_cache=True,
+                                   profiles_per_prompt=None, token_budget=None, batch_size=None,
+                                   limiter=None, retries=None):
+    """
+    Checks the relevance of articles for several profiles (dicts with "name"
+    and "user_info") at once: each batch prompt lists up to
+    profiles_per_prompt readers and asks which of them every article is
+    relevant to. Returns {profile name: set of relevant article ids}.
+    """
+    profiles_per_prompt = profiles_per_prompt or FILTER_PROFILES_PER_PROMPT
+    token_budget = token_budget or FILTER_BATCH_TOKENS
+    relevant = {profile["name"]: set() for profile in profiles}
+    logger.info("Starting multi-profile relevance check for %d articles and %d profiles.",
+                len(articles), len(profiles))
+
+    for start in range(0, len(profiles), profiles_per_prompt):
+        group = profiles[start: start + profiles_per_prompt]
+        labeled = [(f"P{i}", profile) for i, profile in enumerate(group, start=1)]
+        labels = {label: profile["name"] for label, profile in labeled}
+        readers_tokens = sum(estimate_tokens(profile["user_info"]) for profile in group)
+        verdicts, _ = _evaluate_in_batches(
+            articles,
+            lambda batch: _build_profiles_prompt(batch, labeled),
+            lambda text, batch: _parse_profile_verdicts(text, batch, labels),
+            token_budget=max(token_budget - readers_tokens, 1),
+            batch_size=batch_size or FILTER_MAX_BATCH,
+            llm_level=llm_level,
+            use_cache=use_cache,
+            limiter=limiter or _limiter,
+            retries=FILTER_RETRIES if retries is None else retries,
+        )
+        for article_id, names in verdicts.items():
+            for name in names:
+                relevant[name].add(article_id)
+
+    for name, ids in relevant.items():
+        logger.info("Profile '%s': %d relevant articles.", name, len(ids))
+    return relevant
@@ -0,0 +1,200 @@
+import os
+import json
+import shutil
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+import concurrent.futures
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """
+    Raised by JobManager.submit when the number of pending jobs has reached the queue limit.
+    """
+
+
+class JobManager:
+    """
+    Runs pipeline jobs on a bounded in-process worker pool and records their
+    state in a local SQLite database. runner(job_id, params) does the work and
+    returns the path of the produced file. Jobs left queued or running by a
+    previous process are requeued on start-up, and finished results older than
+    result_ttl seconds are deleted by a background sweeper.
+    """
+
+    def __init__(self, runner, db_path, workers, queue_limit, result_ttl, cleanup_interval=300):
+        self.runner = runner
+        self.queue_limit = queue_limit
+        self.result_ttl = result_ttl
+        self._lock = threading.Lock()
+        self._events = {}
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " params TEXT NOT NULL,"
+            " result_path TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+        self._conn.commit()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vibe-job")
+        self._requeue_interrupted()
+        if cleanup_interval:
+            sweeper = threading.Thread(
+                target=self._sweep_forever, args=(cleanup_interval,), name="vibe-job-sweeper", daemon=True
+            )
+            sweeper.start()
+
+    def _requeue_interrupted(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, params FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        for job_id, params in rows:
+            logger.info("Requeueing interrupted job %s.", job_id)
+            self._set_status(job_id, QUEUED)
+            self._enqueue(job_id, json.loads(params))
+
+    def _set_status(self, job_id, status, result_path=None, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result_path = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, result_path, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def _enqueue(self, job_id, params):
+        with self._lock:
+            self._events[job_id] = threading.Event()
+        self._executor.submit(self._run, job_id, params)
+
+    def _run(self, job_id, params):
+        self._set_status(job_id, RUNNING)
+        logger.info("Job %s started.", job_id)
+        try:
+            result_path = self.runner(job_id, params)
+            self._set_status(job_id, DONE, result_path=result_path)
+            logger.info("Job %s finished: %s", job_id, result_path)
+        except Exception as e:
+            logger.exception("Job %s failed: %s", job_id, e)
+            self._set_status(job_id, FAILED, error=str(e))
+        finally:
+            with self._lock:
+                event = self._events.pop(job_id, None)
+            if event:
+                event.set()
+
+    def pending(self):
+        """
+        Returns the number of queued and running jobs.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()[0]
+
+    def depth(self):
+        """
+        Returns job counts keyed by status.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def submit(self, params):
+        """
+        Records a new job and queues it. Raises QueueFullError when queue_limit
+        jobs are already pending.
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            pending = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()[0]
+            if pending >= self.queue_limit:
+                raise QueueFullError(f"{pending} jobs already pending.")
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, params, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(params), now, now),
+            )
+            self._conn.commit()
+        self._enqueue(job_id, params)
+        logger.info("Queued job %s (%d pending).", job_id, pending + 1)
+        return job_id
+
+    def get(self, job_id):
+        """
+        Returns the job record as a dict, or None if the job is unknown.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, params, result_path, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "status": row[1],
+            "params": json.loads(row[2]),
+            "result_path": row[3],
+            "error": row[4],
+            "created_at": row[5],
+            "updated_at": row[6],
+        }
+
+    def wait(self, job_id, timeout=None):
+        """
+        Blocks until the job finishes (or timeout elapses) and returns its record.
+        """
+        with self._lock:
+            event = self._events.get(job_id)
+        if event:
+            event.wait(timeout)
+        return self.get(job_id)
+
+    def cleanup_expired(self):
+        """
+        Deletes finished jobs, and their result files or directories, older than result_ttl.
+        """
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, result_path FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, cutoff),
+            ).fetchall()
+            for job_id, result_path in rows:
+                if result_path and os.path.isdir(result_path):
+                    shutil.rmtree(result_path, ignore_errors=True)
+                elif result_path and os.path.exists(result_path):
+                    os.unlink(result_path)
+                self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._conn.commit()
+        if rows:
+            logger.info("Cleaned up %d expired jobs.", len(rows))
+        return len(rows)
+
+    def _sweep_forever(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.cleanup_expired()
+            except Exception as e:
+                logger.exception("Job cleanup failed: %s", e)
@@ -0,0 +1,113 @@
+import logging
+import time
+import threading
+from contextlib import contextmanager
+
+from .config import LLM_CONCURRENCY, DOCLING_CONCURRENCY, TTS_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+STAGE_LIMITS = {
+    "llm": LLM_CONCURRENCY,
+    "docling": DOCLING_CONCURRENCY,
+    "tts": TTS_CONCURRENCY,
+}
+
+_semaphores = {stage: threading.BoundedSemaphore(limit) for stage, limit in STAGE_LIMITS.items()}
+_active = {stage: 0 for stage in STAGE_LIMITS}
+_waiting = {stage: 0 for stage in STAGE_LIMITS}
+_counts_lock = threading.Lock()
+
+
+@contextmanager
+def stage_slot(stage):
+    """
+    Holds one of the process-wide concurrency slots for stage ("llm",
+    "docling" or "tts") for the duration of the block, waiting if all slots
+    are taken. Limits are shared by every job running in the process.
+    """
+    semaphore = _semaphores[stage]
+    with _counts_lock:
+        _waiting[stage] += 1
+    semaphore.acquire()
+    with _counts_lock:
+        _waiting[stage] -= 1
+        _active[stage] += 1
+    try:
+        yield
+    finally:
+        with _counts_lock:
+            _active[stage] -= 1
+        semaphore.release()
+
+
+def stage_usage():
+    """
+    Returns {stage: {"limit", "active", "waiting"}} for every limited stage.
+    """
+    with _counts_lock:
+        return {
+            stage: {"limit": STAGE_LIMITS[stage], "active": _active[stage], "waiting": _waiting[stage]}
+            for stage in STAGE_LIMITS
+        }
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to provider rate limits (AIMD): the limit
+    grows by one after `limit` consecutive successes and is halved on a
+    rate-limit response, which also pauses new calls for an exponentially
+    growing backoff (or the server's Retry-After).
+    """
+
+    def __init__(self, max_limit, min_limit=1, base_backoff=1.0, max_backoff=60.0):
+        self.max_limit = max(max_limit, min_limit)
+        self.min_limit = min_limit
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.limit = self.max_limit
+        self._in_flight = 0
+        self._successes = 0
+        self._strikes = 0
+        self._resume_at = 0.0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            while True:
+                delay = self._resume_at - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                elif self._in_flight >= self.limit:
+                    self._cond.wait()
+                else:
+                    break
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def record_success(self):
+        with self._cond:
+            self._strikes = 0
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+    def record_rate_limit(self, retry_after=None):
+        with self._cond:
+            self._successes = 0
+            self.limit = max(self.min_limit, self.limit // 2)
+            delay = min(self.max_backoff, self.base_backoff * 2 ** self._strikes)
+            if retry_after:
+                delay = max(delay, retry_after)
+            self._strikes += 1
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+            logger.warning("Rate limited; concurrency now %d, pausing %.1fs.", self.limit, delay)
+            self._cond.notify_all()
@@ -0,0 +1,243 @@
+import re
+import html as html_lib
+import logging
+
+logger = logging.getLogger(__name__)
+
+ARXIV_BASE_URL = "https://arxiv.org"
+
+_SECTION_TYPES = (
+    ("cross", "cross"),
+    ("replace", "replace"),
+    ("new", "new"),
+)
+
+_TAG_RE = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)([^>]*)>|<!--.*?-->", re.DOTALL)
+_ATTR_RE = re.compile(r"""([a-zA-Z_:][-a-zA-Z0-9_:.]*)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+_RAW_TEXT_END_RE = {tag: re.compile(rf"</{tag}", re.IGNORECASE) for tag in ("script", "style")}
+
+# dd children we extract, keyed by (tag, class).
+_DD_FIELDS = {
+    ("div", "list-title"): "title",
+    ("div", "list-authors"): "authors",
+    ("div", "list-subjects"): "subjects",
+    ("p", "mathjax"): "abstract",
+}
+
+
+def _clean(parts):
+    return " ".join("".join(parts).split())
+
+
+def _parse_attrs(raw):
+    return {
+        m.group(1).lower(): html_lib.unescape(next(v for v in m.group(2, 3, 4) if v is not None))
+        for m in _ATTR_RE.finditer(raw)
+    }
+
+
+def _strip_descriptor(text, descriptor):
+    text = text.strip()
+    if text.startswith(descriptor):
+        text = text[len(descriptor):]
+    return text.strip()
+
+
+class _ListingParser:
+    """
+    Single-pass extractor for arXiv /list pages. A regex tokenizer walks the
+    tags once and attributes are only decoded for the few tags we inspect.
+    Each <dt> opens an entry and the next <dd> completes it, so a missing tag
+    only affects its own entry instead of shifting every following pair.
+    """
+
+    def __init__(self, known_ids=()):
+        self.known_ids = known_ids
+        self.entries = []
+        self.found_list = False
+        self._section = "new"
+        self._h3 = None
+        self._entry = None
+        self._in_dt = False
+        self._in_dd = False
+        self._link = None
+        self._link_text = []
+        self._field = None
+        self._field_tag = None
+        self._field_depth = 0
+        self._field_text = []
+        self._authors = []
+        self._author_text = None
+
+    def _finish_entry(self):
+        entry = self._entry
+        self._entry = None
+        if not entry or not entry.get("id"):
+            if entry is not None:
+                logger.debug("Skipping an article with no abstract link.")
+            return
+        if entry.get("known"):
+            self.entries.append({"id": entry["id"], "known": True, "announce_type": self._section})
+            return
+        entry.setdefault("pdf_url", None)
+        entry.setdefault("title", "No title")
+        entry.setdefault("abstract", "No abstract")
+        entry.setdefault("authors", [])
+        entry.setdefault("subjects", [])
+        entry["primary_subject"] = entry["subjects"][0] if entry["subjects"] else None
+        entry["announce_type"] = self._section
+        self.entries.append(entry)
+
+    def feed(self, html):
+        position = 0
+        length = len(html)
+        while position < length:
+            match = _TAG_RE.search(html, position)
+            end = match.start() if match else length
+            if end > position:
+                self.handle_data(html[position:end])
+            if not match:
+                break
+            position = match.end()
+            closing, tag, raw_attrs = match.groups()
+            if tag is None:
+                continue
+            tag = tag.lower()
+            if closing:
+                self.handle_endtag(tag)
+                continue
+            self.handle_starttag(tag, raw_attrs)
+            if tag in _RAW_TEXT_END_RE:
+                close = _RAW_TEXT_END_RE[tag].search(html, position)
+                position = close.start() if close else length
+
+    def handle_starttag(self, tag, raw_attrs):
+        if tag == "h3":
+            self._h3 = []
+            return
+        if tag == "dl":
+            self.found_list = True
+            return
+        if tag == "dt":
+            self._finish_entry()
+            self._entry = {}
+            self._in_dt = True
+            self._in_dd = False
+            return
+        if tag == "dd":
+            self._in_dt = False
+            self._in_dd = self._entry is not None
+            return
+
+        if self._in_dt and tag == "a":
+            attrs = _parse_attrs(raw_attrs)
+            title = attrs.get("title")
+            if title == "Abstract":
+                self._link = "id"
+                self._link_text = []
+            elif title == "Download PDF" and attrs.get("href"):
+                href = attrs["href"]
+                self._entry["pdf_url"] = href if href.startswith("http") else ARXIV_BASE_URL + href
+            return
+
+        if not self._in_dd or self._entry.get("known"):
+            return
+        if self._field is not None:
+            if tag == self._field_tag:
+                self._field_depth += 1
+            if self._field == "authors" and tag == "a":
+                self._author_text = []
+            return
+        if tag not in ("div", "p"):
+            return
+        classes = (_parse_attrs(raw_attrs).get("class") or "").split()
+        for cls in classes:
+            field = _DD_FIELDS.get((tag, cls))
+            if field and field not in self._entry:
+                self._field = field
+                self._field_tag = tag
+                self._field_depth = 1
+                self._field_text = []
+                self._authors = []
+                return
+
+    def handle_endtag(self, tag):
+        if tag == "h3" and self._h3 is not None:
+            heading = _clean(self._h3).lower()
+            self._h3 = None
+            for marker, section in _SECTION_TYPES:
+                if marker in heading:
+                    self._section = section
+                    break
+            return
+        if tag == "a" and self._link == "id":
+            self._entry["id"] = _clean(self._link_text)
+            if self._entry["id"] in self.known_ids:
+                self._entry["known"] = True
+            self._link = None
+            return
+        if tag == "dt":
+            self._in_dt = False
+            return
+        if tag == "dd":
+            self._in_dd = False
+            self._finish_entry()
+            return
+        if tag == "dl":
+            self._finish_entry()
+            return
+        if self._field is None:
+            return
+        if self._field == "authors" and tag == "a" and self._author_text is not None:
+            self._authors.append(_clean(self._author_text))
+            self._author_text = None
+            return
+        if tag == self._field_tag:
+            self._field_depth -= 1
+            if self._field_depth == 0:
+                self._store_field()
+
+    def _store_field(self):
+        text = _clean(self._field_text)
+        field = self._field
+        self._field = None
+        if field == "title":
+            self._entry["title"] = _strip_descriptor(text, "Title:")
+        elif field == "abstract":
+            self._entry["abstract"] = text
+        elif field == "authors":
+            authors = self._authors or [a.strip() for a in _strip_descriptor(text, "Authors:").split(",")]
+            self._entry["authors"] = [a for a in authors if a]
+        elif field == "subjects":
+            subjects = _strip_descriptor(text, "Subjects:").split(";")
+            self._entry["subjects"] = [s.strip() for s in subjects if s.strip()]
+
+    def handle_data(self, data):
+        if self._h3 is None and self._link is None and self._field is None:
+            return
+        data = html_lib.unescape(data)
+        if self._h3 is not None:
+            self._h3.append(data)
+        if self._link == "id":
+            self._link_text.append(data)
+        if self._field is not None:
+            self._field_text.append(data)
+            if self._author_text is not None:
+                self._author_text.append(data)
+
+    def close(self):
+        self._finish_entry()
+
+
+def parse_listing(html, known_ids=()):
+    """
+    Parses an arXiv listing page in a single pass. Returns (found_list, entries)
+    where each entry has id, title, abstract, pdf_url, authors, subjects,
+    primary_subject and announce_type ("new", "cross" or "replace"). Entries
+    whose id is in known_ids are returned as {"id", "known": True,
+    "announce_type"} without extracting the rest of their metadata.
+    """
+    parser = _ListingParser(known_ids=known_ids)
+    parser.feed(html)
+    parser.close()
+    return parser.found_list, parser.entries
@@ -1,38 +1,214 @@
 import os
+import sys
+import time
 import logging
-import litellm
+import threading
 import tomli
 
+from .llm_cache import get_llm_cache
+from .limits import stage_slot
+from .metrics import REGISTRY, record_llm_call, record_cache_lookup
+from .content import estimate_tokens
+
 logger = logging.getLogger(__name__)
-CONFIG_PATH = os.path.join(os.path.dirname(__file__), "llm_config.toml")
+CONFIG_PATH = os.environ.get("VIBE_LLM_CONFIG", os.path.join(os.path.dirname(__file__), "llm_config.toml"))
 
-try:
-    with open(CONFIG_PATH, "rb") as f:
-        _CONFIG = tomli.load(f)
-except FileNotFoundError:
-    logger.warning("LLM config file llm_config.toml not found. Using default settings.")
-    exit(-1)
+_config = None
+_config_lock = threading.Lock()
 
 
-def chat_llm(prompt: str, level: str = "medium") -> str:
+def load_config() -> dict:
     """
-    Sends 'prompt' to the LLM defined by the 'level' block in llm_config.toml.
-    Returns the LLM's text output.
+    Returns the parsed llm_config.toml, reading it on first use.
+    """
+    global _config
+    with _config_lock:
+        if _config is None:
+            try:
+                with open(CONFIG_PATH, "rb") as f:
+                    _config = tomli.load(f)
+            except FileNotFoundError:
+                logger.warning("LLM config file %s not found. Using default settings.", CONFIG_PATH)
+                _config = {}
+            _config.setdefault("llms", {})
+        return _config
+
+
+def _litellm():
+    # litellm takes seconds to import; defer it to the first real LLM call.
+    import litellm
+
+    return litellm
+
+
+def warm_up():
+    """
+    Reads the LLM config and imports litellm ahead of the first call.
+    """
+    load_config()
+    _litellm()
+
+
+def llm_setting(level: str, key: str, default=None):
+    """
+    Returns 'key' from the 'level' block in llm_config.toml, or default.
+    """
+    return load_config()["llms"].get(level, {}).get(key, default)
+
+
+def _usage_tokens(response, key):
+    usage = response.get("usage")
+    value = usage.get(key) if isinstance(usage, dict) else getattr(usage, key, None)
+    return value or 0
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    """
+    True if exc is a provider rate-limit (HTTP 429) error.
+    """
+    litellm = sys.modules.get("litellm")
+    if litellm is not None and isinstance(exc, litellm.RateLimitError):
+        return True
+    return getattr(exc, "status_code", None) == 429
+
+
+def retry_after(exc: Exception):
+    """
+    Returns the Retry-After delay in seconds carried by exc, if any.
     """
-    llm_settings = _CONFIG["llms"].get(level, {})
+    response = getattr(exc, "response", None)
+    value = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _endpoint(level):
+    """
+    Returns (model, api_base, api_key) for the 'level' block in llm_config.toml.
+    """
+    llm_settings = load_config()["llms"].get(level, {})
     api_key = llm_settings.get("api_key", os.environ.get("MISTRAL_API_KEY"))
     api_base = llm_settings.get("api_base", "https://api.mistral.ai")
     model = llm_settings.get("model", "mistral/mistral-small-latest")
+    return model, api_base, api_key
+
+
+def chat_llm(prompt: str, level: str = "medium", use_cache: bool = True, raise_errors: bool = False) -> str:
+    """
+    Sends 'prompt' to the LLM defined by the 'level' block in llm_config.toml.
+    Returns the LLM's text output. Responses are served from and stored in the
+    persistent LLM cache unless use_cache is False. Errors are logged and ""
+    is returned, unless raise_errors is True.
+    """
+    model, api_base, api_key = _endpoint(level)
+
+    cache = get_llm_cache() if use_cache else None
+    if cache is not None:
+        cache_key = cache.make_key(model, api_base, level, prompt)
+        cached = cache.get(cache_key)
+        record_cache_lookup("llm", cached is not None)
+        if cached is not None:
+            logger.debug("LLM cache hit for level '%s' (%s).", level, cache_key[:12])
+            record_llm_call(level, 0.0, cached=True)
+            return cached
 
     try:
         # Using the litellm library to call the chat endpoint
-        response = litellm.completion(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            api_base=api_base,
-            api_key=api_key,
-        )
-        return response["choices"][0]["message"]["content"].strip()
+        completion = _litellm().completion
+        with stage_slot("llm"):
+            started = time.time()
+            response = completion(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                api_base=api_base,
+                api_key=api_key,
+            )
+            latency = time.time() - started
+        record_llm_call(level, latency, _usage_tokens(response, "prompt_tokens"), _usage_tokens(response, "completion_tokens"))
+        text = response["choices"][0]["message"]["content"].strip()
+        if cache is not None and text:
+            cache.put(cache_key, text)
+        return text
     except Exception as e:
+        if raise_errors:
+            raise
         logger.exception("Error calling LLM: %s", e)
         return ""
+
+
+def _delta_text(chunk):
+    choices = chunk.get("choices") if isinstance(chunk, dict) else getattr(chunk, "choices", None)
+    if not choices:
+        return ""
+    delta = choices[0].get("delta") if isinstance(choices[0], dict) else getattr(choices[0], "delta", None)
+    content = delta.get("content") if isinstance(delta, dict) else getattr(delta, "content", None)
+    return content or ""
+
+
+def chat_llm_stream(prompt: str, level: str = "medium", use_cache: bool = True):
+    """
+    Streaming variant of chat_llm: yields the response text in pieces as the
+    LLM produces them. A cached response is yielded in one piece; a streamed
+    response is cached once complete, under the same key chat_llm uses, so
+    both variants share cache entries. Errors are logged and end the stream.
+    """
+    model, api_base, api_key = _endpoint(level)
+
+    cache = get_llm_cache() if use_cache else None
+    if cache is not None:
+        cache_key = cache.make_key(model, api_base, level, prompt)
+        cached = cache.get(cache_key)
+        record_cache_lookup("llm", cached is not None)
+        if cached is not None:
+            logger.debug("LLM cache hit for level '%s' (%s).", level, cache_key[:12])
+            record_llm_call(level, 0.0, cached=True)
+            yield cached
+            return
+
+    pieces = []
+    try:
+        completion = _litellm().completion
+        with stage_slot("llm"):
+            started = time.time()
+            first_token_at = None
+            usage = None
+            response = completion(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                api_base=api_base,
+                api_key=api_key,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in response:
+                usage = getattr(chunk, "usage", None) or usage
+                text = _delta_text(chunk)
+                if not text:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.time()
+                    REGISTRY.observe("vibe_llm_first_token_seconds", first_token_at - started,
+                                     help="Time to the first streamed LLM token.", level=level)
+                # Leading whitespace is dropped, as chat_llm strips its result.
+                if not pieces:
+                    text = text.lstrip()
+                    if not text:
+                        continue
+                pieces.append(text)
+                yield text
+            latency = time.time() - started
+    except Exception as e:
+        logger.exception("Error streaming from LLM: %s", e)
+        return
+
+    text = "".join(pieces).strip()
+    wrapped = {"usage": usage} if usage is not None else {}
+    record_llm_call(
+        level, latency,
+        _usage_tokens(wrapped, "prompt_tokens") if usage else estimate_tokens(prompt),
+        _usage_tokens(wrapped, "completion_tokens") if usage else estimate_tokens(text),
+    )
+    if cache is not None and text:
+        cache.put(cache_key, text)
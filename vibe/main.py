@@ -1,57 +1,210 @@
+import os
+import sys
+import json
 import argparse
 import logging
-from vibe.orchestrator import process_articles
-from vibe.tts import text_to_speech
-from vibe.config import DEFAULT_ARXIV_URL
+from vibe.orchestrator import build_report_segments, build_profile_reports, stream_report_sentences
+from vibe.profiles import load_profiles
+from vibe.tts import segments_to_speech, get_engine
+from vibe.metrics import run_report
+from vibe.config import DEFAULT_ARXIV_URL, DEBUG, SERVER_PORT, SERVER_THREADS
 
 logging.basicConfig(
     level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+def generate(args):
+    """
+    Runs the pipeline once and writes the MP3. Returns an exit status.
+    """
+    user_info = args.prompt
+    if args.stream:
+        return generate_stream(args)
+    segments = build_report_segments(
+        user_info,
+        arxiv_url=args.arxiv_url,
+        max_articles=args.max_articles,
+        new_only=args.new_only,
+        llm_level=args.llm_level,
+        use_cache=not args.no_cache,
+        prefilter_top_k=args.prefilter_top_k
+    )
+    if not "".join(segments).strip():
+        logger.error("No summaries generated.")
+        return 1
+    try:
+        segments_to_speech(segments, args.output)
+        logger.info(f"Generated MP3 at: {args.output}")
+    except Exception as e:
+        logger.exception("TTS conversion failed: %s", e)
+        return 1
+    return 0
+
+def generate_stream(args):
+    """
+    Streams the report to args.output ("-" for stdout) while it is being
+    written and spoken, so playback can start before the run finishes.
+    """
+    sentences = stream_report_sentences(
+        args.prompt,
+        arxiv_url=args.arxiv_url,
+        max_articles=args.max_articles,
+        new_only=args.new_only,
+        llm_level=args.llm_level,
+        use_cache=not args.no_cache,
+        prefilter_top_k=args.prefilter_top_k
+    )
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for data in get_engine().stream_mp3(sentences):
+            out.write(data)
+            out.flush()
+    except Exception as e:
+        logger.exception("Streaming TTS failed: %s", e)
+        return 1
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    logger.info("Streamed MP3 to: %s", args.output)
+    return 0
+
+def generate_profiles(args):
+    """
+    Builds one report per profile in args.profiles and writes
+    <output_dir>/<name>.mp3 for each. Returns an exit status.
+    """
+    profiles = load_profiles(args.profiles)
+    reports = build_profile_reports(
+        profiles,
+        arxiv_url=args.arxiv_url,
+        new_only=args.new_only,
+        llm_level=args.llm_level,
+        use_cache=not args.no_cache,
+        prefilter_top_k=args.prefilter_top_k
+    )
+    os.makedirs(args.output_dir, exist_ok=True)
+    status = 0
+    for name, report in reports.items():
+        output = os.path.join(args.output_dir, f"{name}.mp3")
+        try:
+            segments_to_speech(report["segments"], output)
+            logger.info("Generated MP3 for profile '%s' at: %s", name, output)
+        except Exception as e:
+            logger.exception("TTS conversion failed for profile '%s': %s", name, e)
+            status = 1
+    return status
+
+def precompute(args):
+    """
+    Runs one precompute pass over the current listing. Returns an exit status.
+    """
+    from vibe.precompute import Precomputer, load_known_profiles
+
+    try:
+        # Background job: yield the CPU to anything interactive; Docling workers inherit this.
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+    profiles = load_profiles(args.profiles) if args.profiles else load_known_profiles()
+    precomputer = Precomputer(arxiv_url=args.arxiv_url, scope=args.precompute_scope, profiles=profiles)
+    status = precomputer.run_once(force=True)
+    logger.info("Precompute finished: %d converted, %d already stored, %d failed of %d articles in scope.",
+                status["converted"], status["already_stored"], status["failed"], status["total"])
+    # Individual unconvertible PDFs are expected; fail only if nothing could be converted.
+    return 1 if status["failed"] and not status["converted"] else 0
+
+def serve(args, port=None):
+    """
+    Runs the server on port (default SERVER_PORT). Unless VIBE_DEBUG is set,
+    this replaces the process with gunicorn (one gthread worker: jobs and
+    progress rooms live in-process); without gunicorn it falls back to the
+    Flask-SocketIO development server.
+    """
+    port = port or SERVER_PORT
+    if args.warmup:
+        os.environ["VIBE_WARMUP"] = "1"
+    if args.precompute:
+        os.environ["VIBE_PRECOMPUTE"] = "1"
+        if args.precompute_scope:
+            os.environ["PRECOMPUTE_SCOPE"] = args.precompute_scope
+        if args.profiles:
+            os.environ["PRECOMPUTE_PROFILES"] = os.path.abspath(args.profiles)
+    if not DEBUG:
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            logger.warning("gunicorn is not installed; falling back to the development server.")
+        else:
+            logger.info("Starting server under gunicorn with %d threads.", SERVER_THREADS)
+            sys.stdout.flush()
+            os.execvp(sys.executable, [
+                sys.executable, "-m", "gunicorn", "--workers", "1", "--threads", str(SERVER_THREADS),
+                "--bind", f"0.0.0.0:{port}", "vibe.server:create_app()",
+            ])
+
+    from vibe.server import app, socketio, start, start_warmup, start_precompute
+    logger.info("Starting Flask development server.")
+    start()
+    if args.warmup:
+        start_warmup()
+    if args.precompute:
+        start_precompute(args.precompute_scope, load_profiles(args.profiles) if args.profiles else None)
+    socketio.run(app, host="0.0.0.0", port=port, debug=DEBUG, allow_unsafe_werkzeug=True)
+
 def main():
     parser = argparse.ArgumentParser(description="vibe: Article Summarization & TTS Pipeline")
     parser.add_argument("--serve", action="store_true", help="Run as a Flask server.")
     parser.add_argument("--generate", action="store_true", help="Run the pipeline once and generate a summary MP3, then exit.")
     parser.add_argument("--prompt", type=str, default="", help="User info for LLM filtering & summaries.")
     parser.add_argument("--max-articles", type=int, default=5, help="Maximum articles to process in the pipeline.")
-    parser.add_argument("--new-only", action="store_true", help="Only process articles newer than cached.")
+    parser.add_argument("--new-only", action="store_true", help="Only process articles newer than those in earlier reports.")
     parser.add_argument("--arxiv-url", type=str, default=DEFAULT_ARXIV_URL, help="URL for fetching arXiv articles.")
     parser.add_argument("--output", type=str, default="final_output.mp3", help="Output path for the generated MP3 file.")
 
     # New: LLM Level
     parser.add_argument("--llm-level", type=str, default="medium", choices=["low","medium","high"],
                         help="Desired LLM quality level: low, medium, or high. Defaults to medium.")
+    parser.add_argument("--prefilter-top-k", type=int, default=None,
+                        help="Keep only the K articles closest to the prompt by embedding similarity before the LLM relevance pass.")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache for this run.")
+    parser.add_argument("--warmup", action="store_true",
+                        help="With --serve, load the LLM client, Docling and Kokoro in the background at startup.")
+    parser.add_argument("--stream", action="store_true",
+                        help="With --generate, stream summaries from the LLM into speech and write the MP3 as it is "
+                             "produced; use --output - to pipe it to a player.")
+    parser.add_argument("--profiles", type=str, default=None,
+                        help="With --generate, build one report per profile in this TOML file instead of using --prompt.")
+    parser.add_argument("--output-dir", type=str, default="digests",
+                        help="Directory for the per-profile MP3 files written with --profiles.")
+    parser.add_argument("--precompute", action="store_true",
+                        help="Download and convert the current listing ahead of requests, at low priority. "
+                             "Alone, runs one pass and exits; with --serve, runs in the background on every new listing.")
+    parser.add_argument("--precompute-scope", type=str, default=None, choices=["all", "profiles"],
+                        help="Precompute every listed article, or only those close to a profile "
+                             "(from --profiles or PRECOMPUTE_PROFILES). Defaults to PRECOMPUTE_SCOPE.")
+    parser.add_argument("--timing-report", type=str, default=None,
+                        help="Write a JSON report of per-stage timings, LLM tokens and cache hit rates to this path.")
 
     args = parser.parse_args()
 
     if args.serve:
-        from vibe.server import app
-        logger.info("Starting Flask server.")
-        app.run(host='0.0.0.0', port='14200', debug=True)
+        serve(args)
+    elif args.precompute:
+        exit(precompute(args))
     elif args.generate:
         logger.info("Running pipeline in CLI mode.")
-        user_info = args.prompt
-        final_summary = process_articles(
-            user_info,
-            arxiv_url=args.arxiv_url,
-            max_articles=args.max_articles,
-            new_only=args.new_only,
-            llm_level=args.llm_level
-        )
-        if not final_summary.strip():
-            logger.error("No summaries generated.")
-            exit(1)
-        try:
-            text_to_speech(final_summary, args.output)
-            logger.info(f"Generated MP3 at: {args.output}")
-        except Exception as e:
-            logger.exception("TTS conversion failed: %s", e)
-            exit(1)
+        with run_report() as report:
+            status = generate_profiles(args) if args.profiles else generate(args)
+        if args.timing_report:
+            with open(args.timing_report, "w", encoding="utf-8") as f:
+                json.dump(report.to_dict(), f, indent=2)
+            logger.info("Wrote timing report to %s", args.timing_report)
+        if status:
+            exit(status)
     else:
         logger.info("No mode specified; defaulting to Flask server.")
-        from vibe.server import app
-        app.run(host='0.0.0.0', port='14200', debug=True)
+        serve(args)
 
 if __name__ == "__main__":
     main()
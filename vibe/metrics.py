@@ -0,0 +1,249 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry rendered in the Prometheus text
+    format. Counters and histograms are updated by the pipeline; collectors
+    are callables evaluated at scrape time that return gauge samples as
+    (name, help, labels, value) tuples.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def inc(self, name, value=1, help="", **labels):
+        with self._lock:
+            self._help.setdefault(name, ("counter", help))
+            key = (name, _label_key(labels))
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, help="", buckets=DEFAULT_BUCKETS, **labels):
+        with self._lock:
+            self._help.setdefault(name, ("histogram", help))
+            key = (name, _label_key(labels))
+            if key not in self._histograms:
+                self._histograms[key] = _Histogram(buckets)
+            self._histograms[key].observe(value)
+
+    def register_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: (h.buckets, list(h.counts), h.sum, h.count) for key, h in self._histograms.items()
+            }
+            help_text = dict(self._help)
+            collectors = list(self._collectors)
+
+        gauges = {}
+        for collector in collectors:
+            try:
+                for name, help, labels, value in collector():
+                    help_text.setdefault(name, ("gauge", help))
+                    gauges[(name, _label_key(labels))] = value
+            except Exception as e:
+                logger.warning("Metrics collector %r failed: %s", collector, e)
+
+        lines = []
+        for name in sorted(help_text):
+            kind, help = help_text[name]
+            lines.append(f"# HELP {name} {help or name}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for (metric, key), (buckets, counts, total, count) in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, bucket_count in zip(buckets, counts):
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', str(bound))])} {bucket_count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {total}")
+                    lines.append(f"{name}_count{_format_labels(key)} {count}")
+            else:
+                samples = counters if kind == "counter" else gauges
+                for (metric, key), value in sorted(samples.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class RunReport:
+    """
+    Per-run timing report: every span, LLM call and cache lookup recorded in
+    the process while the report is active. Used by the CLI, which runs one
+    pipeline per process.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.finished_at = None
+        self.spans = []
+        self.llm_calls = []
+        self.cache_lookups = {}
+        self._lock = threading.Lock()
+
+    def to_dict(self):
+        with self._lock:
+            spans = list(self.spans)
+            llm_calls = list(self.llm_calls)
+            cache_lookups = {name: dict(counts) for name, counts in self.cache_lookups.items()}
+        finished_at = self.finished_at or time.time()
+
+        stages = {}
+        for item in spans:
+            stage = stages.setdefault(item["stage"], {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "errors": 0})
+            stage["count"] += 1
+            stage["total_seconds"] += item["seconds"]
+            stage["max_seconds"] = max(stage["max_seconds"], item["seconds"])
+            stage["errors"] += 0 if item["ok"] else 1
+        calls = [c for c in llm_calls if not c["cached"]]
+        for counts in cache_lookups.values():
+            lookups = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = counts["hits"] / lookups if lookups else None
+        return {
+            "started_at": self.started_at,
+            "wall_seconds": finished_at - self.started_at,
+            "stages": stages,
+            "llm": {
+                "calls": len(calls),
+                "cached_calls": len(llm_calls) - len(calls),
+                "prompt_tokens": sum(c["prompt_tokens"] for c in calls),
+                "completion_tokens": sum(c["completion_tokens"] for c in calls),
+                "latency_seconds": sum(c["seconds"] for c in calls),
+                "max_latency_seconds": max((c["seconds"] for c in calls), default=0.0),
+            },
+            "caches": cache_lookups,
+            "spans": spans,
+        }
+
+
+_active_reports = []
+_reports_lock = threading.Lock()
+
+
+def _each_report(action):
+    with _reports_lock:
+        reports = list(_active_reports)
+    for report in reports:
+        with report._lock:
+            action(report)
+
+
+@contextmanager
+def run_report():
+    """
+    Collects a RunReport for the duration of the block.
+    """
+    report = RunReport()
+    with _reports_lock:
+        _active_reports.append(report)
+    try:
+        yield report
+    finally:
+        report.finished_at = time.time()
+        with _reports_lock:
+            _active_reports.remove(report)
+
+
+@contextmanager
+def span(stage, **attrs):
+    """
+    Times the block as one occurrence of stage ("fetch", "relevance",
+    "rerank", "download", "convert", "summarize", "tts", ...).
+    """
+    started = time.time()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        seconds = time.time() - started
+        REGISTRY.observe("vibe_stage_duration_seconds", seconds, help="Duration of pipeline stages.", stage=stage)
+        if not ok:
+            REGISTRY.inc("vibe_stage_errors_total", help="Pipeline stages that raised.", stage=stage)
+        item = dict(attrs, stage=stage, start=started, seconds=seconds, ok=ok)
+        _each_report(lambda report: report.spans.append(item))
+
+
+def record_llm_call(level, seconds, prompt_tokens=0, completion_tokens=0, cached=False):
+    """
+    Records one chat_llm call: its latency and token usage, or a cache hit.
+    """
+    REGISTRY.inc("vibe_llm_requests_total", help="LLM requests, by level and cache use.",
+                 level=level, cached="true" if cached else "false")
+    if not cached:
+        REGISTRY.observe("vibe_llm_latency_seconds", seconds, help="Latency of LLM calls.", level=level)
+        REGISTRY.inc("vibe_llm_tokens_total", prompt_tokens, help="LLM tokens used.", level=level, type="prompt")
+        REGISTRY.inc("vibe_llm_tokens_total", completion_tokens, help="LLM tokens used.", level=level, type="completion")
+    call = {"level": level, "seconds": seconds, "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens, "cached": cached}
+    _each_report(lambda report: report.llm_calls.append(call))
+
+
+def record_cache_lookup(cache, hit):
+    """
+    Counts a hit or miss for one of the caches ("llm", "article", "pdf", "audio", "episode").
+    """
+    REGISTRY.inc("vibe_cache_requests_total", help="Cache lookups, by cache and result.",
+                 cache=cache, result="hit" if hit else "miss")
+
+    def add(report):
+        counts = report.cache_lookups.setdefault(cache, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+    _each_report(add)
@@ -1,117 +1,547 @@
-import os
+import queue
+import inspect
 import logging
+import threading
 import concurrent.futures
 from datetime import datetime
 
-from .config import ARTICLES_CACHE_DIR
+from .config import DOWNLOAD_WORKERS, SUMMARY_WORKERS, PREFILTER_TOP_K, RERANK_WORKERS
 from .fetcher import fetch_arxiv_list
-from .filter import batch_relevance_filter
+from .article_store import get_article_store, article_sort_key
+from .prefilter import prefilter_articles
+from .filter import batch_relevance_filter, multi_profile_relevance_filter
 from .rerank import rerank_articles
 from .converter import fetch_and_convert_article
-from .summarizer import generate_article_summary
+from .summarizer import generate_article_summary, stream_article_summary
+from .content import iter_sentences, PARAGRAPH_BREAK
+from .metrics import span
+from .episode_cache import normalize_user_info
 
 logger = logging.getLogger(__name__)
 
-def process_articles(
+# Audience used for summaries shared between profiles in batch mode.
+SHARED_AUDIENCE = "A general audience of computer science researchers."
+
+
+def _progress_callback(trace_callback):
+    """
+    Returns trace_callback as a callable taking (message, **fields), the
+    structured fields being stage, article, done and total. Callbacks that
+    do not accept some of them (e.g. print, or lambda message: ...) are
+    passed only the ones they accept.
+    """
+    if trace_callback is None:
+        return None
+    try:
+        parameters = inspect.signature(trace_callback).parameters.values()
+    except (TypeError, ValueError):
+        parameters = []
+    if any(p.kind == p.VAR_KEYWORD for p in parameters):
+        return trace_callback
+    accepted = {p.name for p in parameters if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)}
+
+    def callback(message, **fields):
+        trace_callback(message, **{key: value for key, value in fields.items() if key in accepted})
+    return callback
+
+
+def closing_remarks():
+    """
+    Returns the dated sign-off appended to every report.
+    """
+    return f"Thanks for listening to the report. Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')} by vibe."
+
+
+def select_articles(
     user_info,
     arxiv_url=None,
     max_articles=5,
     new_only=False,
     trace_callback=None,
-    llm_level="medium"
+    llm_level="medium",
+    use_cache=True,
+    prefilter_top_k=None
 ):
     """
-    Executes the full pipeline:
+    Runs the selection half of the pipeline:
       1. Fetch arXiv articles.
       2. Optionally filter out articles older than cached ones if new_only is True.
-      3. Batch-check relevance via LLM.
+      3. Batch-check relevance via LLM, after an optional embedding prefilter
+         keeps only the prefilter_top_k (default PREFILTER_TOP_K) closest articles.
       4. Rerank articles.
       5. Select top max_articles.
-      6. Convert PDFs to Markdown.
-      7. Generate narrative summaries.
-      8. Combine summaries into a final narrative.
+    Returns the selected articles in rerank order.
     """
+    trace_callback = _progress_callback(trace_callback)
+    articles = _fetch_candidates(arxiv_url, new_only, trace_callback)
+
+    if prefilter_top_k is None:
+        prefilter_top_k = PREFILTER_TOP_K
+    if prefilter_top_k and len(articles) > prefilter_top_k:
+        if trace_callback:
+            trace_callback(f"Prefiltering {len(articles)} articles by embedding similarity...", stage="prefilter")
+        with span("prefilter", candidates=len(articles)):
+            articles = prefilter_articles(articles, user_info, prefilter_top_k)
+        if trace_callback:
+            trace_callback(f"Embedding prefilter kept {len(articles)} candidate articles.", stage="prefilter")
+
     if trace_callback:
-        trace_callback("Starting pipeline: fetching arXiv articles...")
-    articles = fetch_arxiv_list(force_refresh=new_only, arxiv_url=arxiv_url)
+        trace_callback("Performing relevance filtering via LLM...", stage="relevance")
+    with span("relevance", candidates=len(articles)):
+        relevant_ids = batch_relevance_filter(articles, user_info, llm_level=llm_level, use_cache=use_cache)
+    relevant_articles = [article for article in articles if article["id"] in relevant_ids]
+    if trace_callback:
+        trace_callback(f"Identified {len(relevant_articles)} relevant articles out of {len(articles)}.",
+                       stage="relevance", done=len(articles), total=len(articles))
+
     if trace_callback:
-        trace_callback(f"Fetched {len(articles)} articles from arXiv.")
+        trace_callback("Reranking articles based on relevance...", stage="rerank")
+    with span("rerank", candidates=len(relevant_articles)):
+        reranked_articles = rerank_articles(
+            relevant_articles, user_info, llm_level=llm_level, use_cache=use_cache, top_n=max_articles
+        )
+    return reranked_articles[:max_articles]
+
+
+def _fetch_candidates(arxiv_url, new_only, trace_callback):
+    """
+    Fetches the listing and, if new_only, drops articles not newer than the
+    newest one that went into an earlier report (see _record_served). The
+    article store's own newest id is not used: precompute fills the store
+    ahead of any report.
+    """
+    if trace_callback:
+        trace_callback("Starting pipeline: fetching arXiv articles...", stage="fetch")
+    with span("fetch"):
+        articles = fetch_arxiv_list(force_refresh=new_only, arxiv_url=arxiv_url)
+    if trace_callback:
+        trace_callback(f"Fetched {len(articles)} articles from arXiv.", stage="fetch")
 
     if new_only:
         if trace_callback:
-            trace_callback("Filtering articles for new content based on cache...")
-        cached_articles = [f[:-4] for f in os.listdir(ARTICLES_CACHE_DIR) if f.endswith(".txt")]
-        if cached_articles:
-            def parse_id(id_str):
-                if id_str.lower().startswith("ar"):
-                    id_str = id_str[6:]
-                parts = id_str.split(".")
-                return (int(parts[0][:2]), int(parts[0][2:]), int(parts[1]))
-            most_recent = max(cached_articles, key=parse_id)
+            trace_callback("Filtering articles for new content based on cache...", stage="fetch")
+        most_recent = get_article_store().last_served_id()
+        if most_recent:
+            newest_key = article_sort_key(most_recent)
             articles = [
                 article for article in articles
-                if parse_id(article["id"]) > parse_id(most_recent)
+                if (article_sort_key(article["id"]) or (0, 0)) > newest_key
             ]
             if trace_callback:
-                trace_callback(f"After filtering by most recent article id {most_recent}, {len(articles)} articles remain.")
+                trace_callback(f"After filtering by most recent article id {most_recent}, {len(articles)} articles remain.",
+                               stage="fetch")
         else:
             if trace_callback:
-                trace_callback("No cached articles found; processing all fetched articles.")
+                trace_callback("No earlier reports found; processing all fetched articles.", stage="fetch")
+
+    return articles
+
+
+def _record_served(articles):
+    """
+    Moves the new_only high-water mark past the articles of a finished report.
+    """
+    get_article_store().record_served([article["id"] for article in articles])
+
+
+def iter_article_summaries(
+    articles,
+    user_info,
+    trace_callback=None,
+    llm_level="medium",
+    use_cache=True,
+    download_workers=None,
+    summary_workers=None
+):
+    """
+    Converts and summarizes articles concurrently, handing each article to the
+    summarizer as soon as its conversion finishes. Yields (article, summary)
+    pairs in the given order as soon as each summary and all those before it
+    are ready; articles that fail to convert or summarize are skipped.
+    """
+    trace_callback = _progress_callback(trace_callback)
+    convert_executor = concurrent.futures.ThreadPoolExecutor(max_workers=download_workers or DOWNLOAD_WORKERS)
+    summary_executor = concurrent.futures.ThreadPoolExecutor(max_workers=summary_workers or SUMMARY_WORKERS)
+
+    def summarize(article, content):
+        with span("summarize", article=article["id"]):
+            return generate_article_summary(article, content, user_info, llm_level, use_cache)
+
+    def convert(article):
+        content = fetch_and_convert_article(article)
+        if not content:
+            logger.warning("No content obtained for article '%s'.", article["id"])
+            if trace_callback:
+                trace_callback(f"Failed to convert article {article['id']}.", stage="convert", article=article["id"])
+            return None
+        if trace_callback:
+            trace_callback(f"Converted article {article['id']} to Markdown.", stage="convert", article=article["id"])
+        return summary_executor.submit(summarize, article, content)
+
+    try:
+        convert_futures = [convert_executor.submit(convert, article) for article in articles]
+        for index, (article, convert_future) in enumerate(zip(articles, convert_futures)):
+            try:
+                summary_future = convert_future.result()
+            except Exception as e:
+                logger.exception("Error converting article '%s': %s", article["id"], e)
+                if trace_callback:
+                    trace_callback(f"Failed to convert article {article['id']}.", stage="convert", article=article["id"])
+                continue
+            if summary_future is None:
+                continue
+            try:
+                summary = summary_future.result()
+            except Exception as e:
+                logger.exception("Error generating summary for article '%s': %s", article["id"], e)
+                if trace_callback:
+                    trace_callback(f"Error generating summary for article {article['id']}.", stage="summarize",
+                                   article=article["id"], done=index + 1, total=len(articles))
+                continue
+            if summary:
+                if trace_callback:
+                    trace_callback(f"Generated summary for article {article['id']}.", stage="summarize",
+                                   article=article["id"], done=index + 1, total=len(articles))
+                yield article, summary
+            else:
+                logger.warning("No summary generated for article '%s'.", article["id"])
+                if trace_callback:
+                    trace_callback(f"Summary generation failed for article {article['id']}.", stage="summarize",
+                                   article=article["id"], done=index + 1, total=len(articles))
+    finally:
+        # Abandoned iterations (e.g. a disconnected stream) should not wait on queued work.
+        convert_executor.shutdown(wait=False, cancel_futures=True)
+        summary_executor.shutdown(wait=False, cancel_futures=True)
+
+
+_END_OF_SUMMARY = object()
+
+
+def iter_summary_sentences(
+    articles,
+    user_info,
+    trace_callback=None,
+    llm_level="medium",
+    use_cache=True,
+    download_workers=None,
+    summary_workers=None,
+    served=None
+):
+    """
+    Streaming counterpart of iter_article_summaries: converts and summarizes
+    articles concurrently and yields the summaries sentence by sentence, in
+    the given order, while the LLM is still writing them. Sentences of the
+    first article are yielded as soon as they are complete; later articles
+    are summarized in the background and buffered until their turn.
+    PARAGRAPH_BREAK is yielded between paragraphs and after each article.
+    If served is a list, each article is appended to it once its summary
+    has been yielded in full; failed articles are not.
+    """
+    trace_callback = _progress_callback(trace_callback)
+    convert_executor = concurrent.futures.ThreadPoolExecutor(max_workers=download_workers or DOWNLOAD_WORKERS)
+    summary_executor = concurrent.futures.ThreadPoolExecutor(max_workers=summary_workers or SUMMARY_WORKERS)
+    queues = [queue.Queue() for _ in articles]
+    abandoned = threading.Event()
+
+    def summarize(index, article, content):
+        try:
+            with span("summarize", article=article["id"]):
+                pieces = stream_article_summary(article, content, user_info, llm_level, use_cache)
+                for sentence in iter_sentences(pieces, paragraph_breaks=True):
+                    if abandoned.is_set():
+                        return
+                    queues[index].put(sentence)
+        except Exception as e:
+            logger.exception("Error generating summary for article '%s': %s", article["id"], e)
+        finally:
+            queues[index].put(_END_OF_SUMMARY)
+
+    def convert(index, article):
+        try:
+            content = fetch_and_convert_article(article)
+        except Exception as e:
+            logger.exception("Error converting article '%s': %s", article["id"], e)
+            content = None
+        if not content:
+            logger.warning("No content obtained for article '%s'.", article["id"])
+            if trace_callback:
+                trace_callback(f"Failed to convert article {article['id']}.", stage="convert", article=article["id"])
+            queues[index].put(_END_OF_SUMMARY)
+            return
+        if trace_callback:
+            trace_callback(f"Converted article {article['id']} to Markdown.", stage="convert", article=article["id"])
+        try:
+            summary_executor.submit(summarize, index, article, content)
+        except RuntimeError:
+            # The consumer stopped and the executor is shut down.
+            queues[index].put(_END_OF_SUMMARY)
+
+    try:
+        for index, article in enumerate(articles):
+            convert_executor.submit(convert, index, article)
+        for index, (article, sentences) in enumerate(zip(articles, queues)):
+            spoken = 0
+            while True:
+                sentence = sentences.get()
+                if sentence is _END_OF_SUMMARY:
+                    break
+                if sentence != PARAGRAPH_BREAK:
+                    spoken += 1
+                yield sentence
+            if spoken:
+                yield PARAGRAPH_BREAK
+                if served is not None:
+                    served.append(article)
+                if trace_callback:
+                    trace_callback(f"Generated summary for article {article['id']}.", stage="summarize",
+                                   article=article["id"], done=index + 1, total=len(articles))
+            else:
+                logger.warning("No summary generated for article '%s'.", article["id"])
+                if trace_callback:
+                    trace_callback(f"Summary generation failed for article {article['id']}.", stage="summarize",
+                                   article=article["id"], done=index + 1, total=len(articles))
+    finally:
+        abandoned.set()
+        convert_executor.shutdown(wait=False, cancel_futures=True)
+        summary_executor.shutdown(wait=False, cancel_futures=True)
 
+
+def stream_report_sentences(
+    user_info,
+    arxiv_url=None,
+    max_articles=5,
+    new_only=False,
+    trace_callback=None,
+    llm_level="medium",
+    use_cache=True,
+    prefilter_top_k=None
+):
+    """
+    Runs the pipeline like build_report_segments but yields the report as
+    sentences while it is being written (see iter_summary_sentences), ending
+    with the closing remarks. Suited to feeding TTSEngine.stream_mp3.
+    """
+    trace_callback = _progress_callback(trace_callback)
+    candidates = select_articles(
+        user_info,
+        arxiv_url=arxiv_url,
+        max_articles=max_articles,
+        new_only=new_only,
+        trace_callback=trace_callback,
+        llm_level=llm_level,
+        use_cache=use_cache,
+        prefilter_top_k=prefilter_top_k
+    )
     if trace_callback:
-        trace_callback("Performing relevance filtering via LLM...")
-    relevant_ids = batch_relevance_filter(articles, user_info, llm_level=llm_level)
-    relevant_articles = [article for article in articles if article["id"] in relevant_ids]
+        trace_callback("Converting article PDFs and streaming narrative summaries...", stage="convert")
+    served = []
+    yield from iter_summary_sentences(
+        candidates, user_info, trace_callback=trace_callback, llm_level=llm_level, use_cache=use_cache, served=served
+    )
+    _record_served(served)
+    yield closing_remarks()
+    if trace_callback:
+        trace_callback("Final summary generated.", stage="summarize", done=1, total=1)
+
+
+def build_report_segments(
+    user_info,
+    arxiv_url=None,
+    max_articles=5,
+    new_only=False,
+    trace_callback=None,
+    llm_level="medium",
+    use_cache=True,
+    download_workers=None,
+    summary_workers=None,
+    prefilter_top_k=None
+):
+    """
+    Executes the full pipeline:
+      1-5. Select the top max_articles relevant articles (see select_articles).
+      6. Convert PDFs to Markdown in parallel.
+      7. Generate narrative summaries as each conversion finishes.
+      8. Return the summaries, in rerank order, followed by the closing remarks.
+    LLM responses are served from the response cache unless use_cache is False.
+    download_workers and summary_workers default to DOWNLOAD_WORKERS and
+    SUMMARY_WORKERS; Docling itself runs in the CONVERT_WORKERS process pool.
+    """
+    trace_callback = _progress_callback(trace_callback)
+    final_candidates = select_articles(
+        user_info,
+        arxiv_url=arxiv_url,
+        max_articles=max_articles,
+        new_only=new_only,
+        trace_callback=trace_callback,
+        llm_level=llm_level,
+        use_cache=use_cache,
+        prefilter_top_k=prefilter_top_k
+    )
+
     if trace_callback:
-        trace_callback(f"Identified {len(relevant_articles)} relevant articles out of {len(articles)}.")
+        trace_callback("Converting article PDFs and generating narrative summaries...", stage="convert")
+    summarized = list(iter_article_summaries(
+        final_candidates,
+        user_info,
+        trace_callback=trace_callback,
+        llm_level=llm_level,
+        use_cache=use_cache,
+        download_workers=download_workers,
+        summary_workers=summary_workers
+    ))
+    _record_served([article for article, _ in summarized])
+    segments = [summary for _, summary in summarized]
+    segments.append(closing_remarks())
+    if trace_callback:
+        trace_callback("Final summary generated.", stage="summarize", done=1, total=1)
+    logger.info("Generated %d report segments.", len(segments))
+    return segments
+
+
+def process_articles(user_info, **kwargs):
+    """
+    Runs build_report_segments and joins the segments into a single narrative.
+    """
+    final_summary = "\n\n".join(build_report_segments(user_info, **kwargs))
+    logger.info("Final summary generated with length %d characters.", len(final_summary))
+    return final_summary
+
+
+def build_profile_reports(
+    profiles,
+    arxiv_url=None,
+    new_only=False,
+    trace_callback=None,
+    llm_level="medium",
+    use_cache=True,
+    prefilter_top_k=None,
+    download_workers=None,
+    summary_workers=None
+):
+    """
+    Builds reports for several profiles (see profiles.normalize_profiles) in
+    one run, sharing the work that does not depend on the reader:
+      - the listing is fetched once;
+      - relevance is checked for several profiles per prompt;
+      - each profile is reranked separately (concurrently) and keeps its
+        own max_articles;
+      - every selected article is converted once; profiles that opt out of
+        "personalized" share one summary written for SHARED_AUDIENCE, and
+        personalized profiles with the same user_info (up to case, spacing
+        and trailing punctuation) share theirs.
+    Audio for shared summaries is reused through the per-segment audio cache.
+    Returns {profile name: {"articles": [...], "segments": [...]}}.
+    """
+    trace_callback = _progress_callback(trace_callback)
+    articles = _fetch_candidates(arxiv_url, new_only, trace_callback)
+
+    if prefilter_top_k is None:
+        prefilter_top_k = PREFILTER_TOP_K
+    allowed = {}
+    if prefilter_top_k and len(articles) > prefilter_top_k:
+        if trace_callback:
+            trace_callback(f"Prefiltering {len(articles)} articles for {len(profiles)} profiles...", stage="prefilter")
+        with span("prefilter", candidates=len(articles), profiles=len(profiles)):
+            for profile in profiles:
+                kept = prefilter_articles(articles, profile["user_info"], prefilter_top_k)
+                allowed[profile["name"]] = {article["id"] for article in kept}
+        # Only articles some profile kept need an LLM verdict.
+        union = set().union(*allowed.values())
+        articles = [article for article in articles if article["id"] in union]
 
     if trace_callback:
-        trace_callback("Reranking articles based on relevance...")
-    reranked_articles = rerank_articles(relevant_articles, user_info, llm_level=llm_level)
-    final_candidates = reranked_articles[:max_articles]
+        trace_callback(f"Performing relevance filtering for {len(profiles)} profiles via LLM...", stage="relevance")
+    with span("relevance", candidates=len(articles), profiles=len(profiles)):
+        relevant = multi_profile_relevance_filter(articles, profiles, llm_level=llm_level, use_cache=use_cache)
 
+    def select(profile):
+        ids = relevant[profile["name"]]
+        if profile["name"] in allowed:
+            ids = ids & allowed[profile["name"]]
+        candidates = [article for article in articles if article["id"] in ids]
+        with span("rerank", candidates=len(candidates), profile=profile["name"]):
+            ranked = rerank_articles(candidates, profile["user_info"], llm_level=llm_level,
+                                     use_cache=use_cache, top_n=profile["max_articles"])
+        return ranked[:profile["max_articles"]]
+
+    if trace_callback:
+        trace_callback("Reranking articles for each profile...", stage="rerank")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=RERANK_WORKERS) as executor:
+        selections = dict(zip((p["name"] for p in profiles), executor.map(select, profiles)))
+
+    readers = {}
+    for profile in profiles:
+        readers.setdefault(normalize_user_info(profile["user_info"]), profile["user_info"])
+
+    def audience(profile):
+        return readers[normalize_user_info(profile["user_info"])] if profile["personalized"] else SHARED_AUDIENCE
+
+    unique_articles = {}
+    audiences = {}
+    for profile in profiles:
+        for article in selections[profile["name"]]:
+            unique_articles.setdefault(article["id"], article)
+            audiences.setdefault(article["id"], [])
+            if audience(profile) not in audiences[article["id"]]:
+                audiences[article["id"]].append(audience(profile))
     if trace_callback:
-        trace_callback("Converting article PDFs to Markdown...")
-    articles_with_content = []
-    for article in final_candidates:
+        trace_callback(
+            f"Converting {len(unique_articles)} unique articles and writing "
+            f"{sum(len(a) for a in audiences.values())} summaries...",
+            stage="convert",
+        )
+
+    convert_executor = concurrent.futures.ThreadPoolExecutor(max_workers=download_workers or DOWNLOAD_WORKERS)
+    summary_executor = concurrent.futures.ThreadPoolExecutor(max_workers=summary_workers or SUMMARY_WORKERS)
+
+    def summarize(article, content, user_info):
+        with span("summarize", article=article["id"]):
+            return generate_article_summary(article, content, user_info, llm_level, use_cache)
+
+    def convert(article):
         content = fetch_and_convert_article(article)
-        if content:
-            articles_with_content.append((article, content))
-            if trace_callback:
-                trace_callback(f"Converted article {article['id']} to Markdown.")
-        else:
+        if not content:
             logger.warning("No content obtained for article '%s'.", article["id"])
             if trace_callback:
-                trace_callback(f"Failed to convert article {article['id']}.")
+                trace_callback(f"Failed to convert article {article['id']}.", stage="convert", article=article["id"])
+            return {}
+        return {
+            user_info: summary_executor.submit(summarize, article, content, user_info)
+            for user_info in audiences[article["id"]]
+        }
 
-    if trace_callback:
-        trace_callback("Generating narrative summaries for articles...")
-    summaries = []
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future_to_article = {
-            executor.submit(generate_article_summary, article, content, user_info, llm_level): article
-            for article, content in articles_with_content
+    summaries = {}
+    try:
+        convert_futures = {
+            article_id: convert_executor.submit(convert, article) for article_id, article in unique_articles.items()
         }
-        for future in concurrent.futures.as_completed(future_to_article):
-            article = future_to_article[future]
+        for article_id, convert_future in convert_futures.items():
             try:
-                summary = future.result()
-                if summary:
-                    summaries.append(summary)
-                    if trace_callback:
-                        trace_callback(f"Generated summary for article {article['id']}.")
-                else:
-                    logger.warning("No summary generated for article '%s'.", article["id"])
-                    if trace_callback:
-                        trace_callback(f"Summary generation failed for article {article['id']}.")
+                summary_futures = convert_future.result()
             except Exception as e:
-                logger.exception("Error generating summary for article '%s': %s", article["id"], e)
-                if trace_callback:
-                    trace_callback(f"Error generating summary for article {article['id']}.")
+                logger.exception("Error converting article '%s': %s", article_id, e)
+                continue
+            for user_info, summary_future in summary_futures.items():
+                try:
+                    summaries[(article_id, user_info)] = summary_future.result()
+                except Exception as e:
+                    logger.exception("Error generating summary for article '%s': %s", article_id, e)
+    finally:
+        convert_executor.shutdown(wait=False, cancel_futures=True)
+        summary_executor.shutdown(wait=False, cancel_futures=True)
 
-    final_summary = "\n\n".join(summaries)
-    final_summary += f"\n\nThanks for listening to the report. Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')} by vibe."
+    remarks = closing_remarks()
+    reports = {}
+    for profile in profiles:
+        selected = [
+            article for article in selections[profile["name"]]
+            if summaries.get((article["id"], audience(profile)))
+        ]
+        segments = [summaries[(article["id"], audience(profile))] for article in selected]
+        segments.append(remarks)
+        reports[profile["name"]] = {"articles": selected, "segments": segments}
+        _record_served(selected)
+        logger.info("Profile '%s': %d report segments.", profile["name"], len(segments))
     if trace_callback:
-        trace_callback("Final summary generated.")
-    logger.info("Final summary generated with length %d characters.", len(final_summary))
-    return final_summary
\ No newline at end of file
+        trace_callback(f"Built reports for {len(reports)} profiles.", stage="summarize", done=1, total=1)
+    return reports
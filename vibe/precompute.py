@@ -0,0 +1,173 @@
+import os
+import time
+import logging
+import threading
+import concurrent.futures
+
+from .config import PRECOMPUTE_SCOPE, PRECOMPUTE_PROFILES, PRECOMPUTE_TOP_K, PRECOMPUTE_WORKERS
+from .fetcher import fetch_arxiv_list
+from .article_store import get_article_store
+from .prefilter import prefilter_articles
+from .converter import fetch_and_convert_article, current_converter_versions
+from .metrics import REGISTRY, span
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ("all", "profiles")
+# Seconds between checks whether interactive work has drained.
+BUSY_POLL_SECONDS = 2.0
+# Log progress every this many articles.
+PROGRESS_EVERY = 10
+
+
+def load_known_profiles(path=None):
+    """
+    Returns the profiles in path (default PRECOMPUTE_PROFILES), or an empty
+    list when the file does not exist.
+    """
+    from .profiles import load_profiles
+
+    path = path or PRECOMPUTE_PROFILES
+    if not os.path.exists(path):
+        return []
+    return load_profiles(path)
+
+
+class Precomputer:
+    """
+    Downloads and converts the articles of the current arXiv listing ahead of
+    requests, so that interactive runs mostly hit the article store.
+
+    A pass refreshes the listing (a conditional request, cheap when nothing
+    changed) and does nothing unless the set of announced ids differs from
+    the last pass. Otherwise it selects the articles in scope ("all", or
+    "profiles": the top_k articles closest by embedding to any of profiles),
+    skips those already stored, and converts the rest on `workers` threads.
+    Before each article it waits while is_busy() reports interactive work,
+    so it only uses capacity that requests leave idle.
+    """
+
+    def __init__(self, arxiv_url=None, scope=None, profiles=None, workers=None, top_k=None, is_busy=None,
+                 progress_callback=None):
+        self.scope = scope or PRECOMPUTE_SCOPE
+        if self.scope not in SCOPES:
+            raise ValueError(f"Unknown precompute scope '{self.scope}'; expected one of {', '.join(SCOPES)}.")
+        self.arxiv_url = arxiv_url
+        self.profiles = profiles or []
+        self.workers = workers or PRECOMPUTE_WORKERS
+        self.top_k = top_k or PRECOMPUTE_TOP_K
+        self.is_busy = is_busy or (lambda: False)
+        self.progress_callback = progress_callback
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._listing_ids = None
+        self._status = {
+            "state": "idle", "scope": self.scope, "listing_articles": 0, "total": 0, "done": 0,
+            "converted": 0, "already_stored": 0, "failed": 0,
+            "started_at": None, "finished_at": None, "last_check": None, "error": None,
+        }
+
+    def status(self):
+        with self._lock:
+            return dict(self._status)
+
+    def _update(self, **changes):
+        with self._lock:
+            self._status.update(changes)
+
+    def _select(self, articles):
+        if self.scope == "all":
+            return articles
+        if not self.profiles:
+            logger.warning("Precompute scope is 'profiles' but no profiles are known; nothing to precompute.")
+            return []
+        wanted = set()
+        for profile in self.profiles:
+            wanted.update(a["id"] for a in prefilter_articles(articles, profile["user_info"], self.top_k))
+        return [article for article in articles if article["id"] in wanted]
+
+    def _convert(self, article):
+        while self.is_busy() and not self._stop.is_set():
+            self._update(state="paused")
+            self._stop.wait(BUSY_POLL_SECONDS)
+        if self._stop.is_set():
+            return
+        self._update(state="running")
+        with span("precompute", article=article["id"]):
+            content = fetch_and_convert_article(article)
+        result = "converted" if content else "failed"
+        REGISTRY.inc("vibe_precompute_articles_total", help="Articles handled by precompute, by result.", result=result)
+        with self._lock:
+            self._status["done"] += 1
+            self._status[result] += 1
+            status = dict(self._status)
+        if status["done"] % PROGRESS_EVERY == 0 or status["done"] == status["total"]:
+            logger.info("Precompute progress: %d/%d articles (%d converted, %d failed).",
+                        status["done"], status["total"], status["converted"], status["failed"])
+        if self.progress_callback:
+            self.progress_callback(status)
+
+    def run_once(self, force=False):
+        """
+        Runs one pass and returns the resulting status. With force, the pass
+        runs even if the listing has not changed since the last one.
+        """
+        self._update(state="checking", last_check=time.time(), error=None)
+        articles = fetch_arxiv_list(force_refresh=True, arxiv_url=self.arxiv_url)
+        listing_ids = frozenset(article["id"] for article in articles)
+        if listing_ids == self._listing_ids and not force:
+            logger.debug("No new arXiv announcement; nothing to precompute.")
+            self._update(state="idle")
+            return self.status()
+
+        selected = self._select(articles)
+        store = get_article_store()
+        versions = current_converter_versions()
+        pending = [article for article in selected
+                   if (store.metadata(article["id"]) or {}).get("converter_version") not in versions]
+        self._update(
+            state="running", listing_articles=len(articles), total=len(selected),
+            done=len(selected) - len(pending), converted=0, already_stored=len(selected) - len(pending), failed=0,
+            started_at=time.time(), finished_at=None,
+        )
+        logger.info("Precomputing %d articles (%d in scope '%s', %d already stored).",
+                    len(pending), len(selected), self.scope, len(selected) - len(pending))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="vibe-precompute") as executor:
+            for future in concurrent.futures.as_completed([executor.submit(self._convert, a) for a in pending]):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.exception("Precompute of an article failed: %s", e)
+                    with self._lock:
+                        self._status["done"] += 1
+                        self._status["failed"] += 1
+
+        if not self._stop.is_set():
+            self._listing_ids = listing_ids
+        self._update(state="stopped" if self._stop.is_set() else "idle", finished_at=time.time())
+        return self.status()
+
+    def start(self, interval):
+        """
+        Runs a pass every interval seconds on a background thread. Safe to call twice.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, args=(interval,), name="vibe-precompute", daemon=True)
+        self._thread.start()
+
+    def _loop(self, interval):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception("Precompute pass failed: %s", e)
+                self._update(state="error", error=str(e))
+            self._stop.wait(interval)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,185 @@
+import os
+import re
+import zlib
+import logging
+import threading
+import numpy as np
+
+from .config import EMBEDDING_MODEL, EMBEDDING_INDEX_FILE
+
+logger = logging.getLogger(__name__)
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was we were which with "
+    "our these their using use based via can also paper propose proposed show results new approach method".split()
+)
+
+
+class HashingEmbedder:
+    """
+    Dependency-free CPU embedder: hashes unigrams and bigrams of the text into
+    a fixed-size, L2-normalized, log-scaled term-frequency vector.
+    """
+
+    def __init__(self, dim=4096):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        tokens = [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in _STOPWORDS and len(t) > 1]
+        yield from tokens
+        for first, second in zip(tokens, tokens[1:]):
+            yield f"{first} {second}"
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerEmbedder:
+    """
+    Wraps a sentence-transformers model on CPU. Requires the optional
+    sentence-transformers package.
+    """
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name
+        self._model = SentenceTransformer(model_name, device="cpu")
+
+    def embed(self, texts):
+        return self._model.encode(
+            list(texts), normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False
+        ).astype(np.float32)
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder():
+    """
+    Returns the process-wide embedder selected by EMBEDDING_MODEL ("hashing"
+    or a sentence-transformers model name), creating it on first use.
+    """
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            if EMBEDDING_MODEL == "hashing":
+                _embedder = HashingEmbedder()
+            else:
+                logger.info("Loading embedding model %s.", EMBEDDING_MODEL)
+                _embedder = SentenceTransformerEmbedder(EMBEDDING_MODEL)
+        return _embedder
+
+
+def _article_text(article):
+    return f"{article['title']}\n{article['abstract']}"
+
+
+class EmbeddingIndex:
+    """
+    NumPy-backed store of article embeddings saved next to the arXiv listing
+    cache. Vectors are computed once per article id and embedder; only
+    articles missing from the index are embedded on later calls, and the
+    oldest rows are dropped once the index holds more than max_rows.
+    """
+
+    def __init__(self, path, embedder, max_rows=5000):
+        self.path = path
+        self.embedder = embedder
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data["model"]) != self.embedder.name:
+                    logger.info("Embedding index at %s was built with another model; rebuilding.", self.path)
+                    return
+                ids = [str(i) for i in data["ids"]]
+                self._vectors = data["vectors"]
+        except Exception as e:
+            logger.warning("Could not read embedding index %s: %s", self.path, e)
+            return
+        self._rows = {article_id: row for row, article_id in enumerate(ids)}
+        logger.debug("Loaded %d cached embeddings from %s", len(ids), self.path)
+
+    def _save(self):
+        ids = sorted(self._rows, key=self._rows.get)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp_path, model=np.array(self.embedder.name), ids=np.array(ids), vectors=self._vectors)
+        os.replace(tmp_path, self.path)
+
+    def _prune(self, wanted_ids):
+        order = sorted(self._rows, key=self._rows.get)
+        excess = len(order) - self.max_rows
+        dropped = set([i for i in order if i not in wanted_ids][:excess])
+        kept = [i for i in order if i not in dropped]
+        self._vectors = self._vectors[[self._rows[i] for i in kept]]
+        self._rows = {article_id: row for row, article_id in enumerate(kept)}
+
+    def vectors_for(self, articles):
+        """
+        Returns an (n, dim) array of normalized embeddings aligned with articles.
+        """
+        with self._lock:
+            missing = [a for a in articles if a["id"] not in self._rows]
+            if missing:
+                logger.info("Embedding %d new articles for the prefilter.", len(missing))
+                new_vectors = self.embedder.embed([_article_text(a) for a in missing])
+                start = len(self._rows)
+                self._vectors = new_vectors if start == 0 else np.vstack([self._vectors, new_vectors])
+                for offset, article in enumerate(missing):
+                    self._rows[article["id"]] = start + offset
+                if len(self._rows) > self.max_rows:
+                    self._prune({a["id"] for a in articles})
+                self._save()
+            return self._vectors[[self._rows[a["id"]] for a in articles]]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_embedding_index(path=None):
+    """
+    Returns the process-wide EmbeddingIndex stored at path (default
+    EMBEDDING_INDEX_FILE), loading it from disk on first use.
+    """
+    path = path or EMBEDDING_INDEX_FILE
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = EmbeddingIndex(path, get_embedder())
+        return _indexes[path]
+
+
+def prefilter_articles(articles, user_info, top_k, index_path=None):
+    """
+    Keeps the top_k articles whose title and abstract are most similar (cosine)
+    to user_info, preserving listing order. Returns articles unchanged when
+    top_k is not positive or there are no more than top_k articles.
+    """
+    if not top_k or top_k <= 0 or len(articles) <= top_k:
+        return articles
+    embedder = get_embedder()
+    vectors = get_embedding_index(index_path).vectors_for(articles)
+    query = embedder.embed([user_info])[0]
+    scores = vectors @ query
+    top = np.argpartition(-scores, top_k - 1)[:top_k]
+    kept = [articles[i] for i in sorted(top)]
+    logger.info("Embedding prefilter kept %d of %d articles.", len(kept), len(articles))
+    return kept
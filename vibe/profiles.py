@@ -0,0 +1,61 @@
+import re
+import logging
+
+import tomli
+
+logger = logging.getLogger(__name__)
+
+_NAME = re.compile(r"^[A-Za-z0-9._-]+$")
+
+
+def normalize_profiles(entries, defaults=None):
+    """
+    Validates a list of profile dicts and fills in defaults. Each profile has
+    a file-name-safe, unique "name", a non-empty "user_info", "max_articles"
+    and "personalized" (default true: summaries written for this reader;
+    false opts in to the shared, audience-neutral ones, which are cheaper).
+    Raises ValueError on invalid input.
+    """
+    defaults = defaults or {}
+    profiles = []
+    seen = set()
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Profile #{index + 1} is not a table.")
+        name = str(entry.get("name", "")).strip()
+        if not _NAME.match(name):
+            raise ValueError(f"Profile #{index + 1} needs a name made of letters, digits, '.', '_' or '-'.")
+        if name in seen:
+            raise ValueError(f"Duplicate profile name '{name}'.")
+        seen.add(name)
+        user_info = str(entry.get("user_info", "")).strip()
+        if not user_info:
+            raise ValueError(f"Profile '{name}' has no user_info.")
+        profiles.append({
+            "name": name,
+            "user_info": user_info,
+            "max_articles": int(entry.get("max_articles", defaults.get("max_articles", 5))),
+            "personalized": bool(entry.get("personalized", defaults.get("personalized", True))),
+        })
+    if not profiles:
+        raise ValueError("No profiles given.")
+    return profiles
+
+
+def load_profiles(path):
+    """
+    Reads profiles from a TOML file:
+
+        [defaults]
+        max_articles = 5
+        personalized = true
+
+        [[profile]]
+        name = "alice"
+        user_info = "Compilers, GPU programming"
+    """
+    with open(path, "rb") as f:
+        data = tomli.load(f)
+    profiles = normalize_profiles(data.get("profile", []), data.get("defaults", {}))
+    logger.info("Loaded %d profiles from %s", len(profiles), path)
+    return profiles
@@ -0,0 +1,179 @@
+import time
+import logging
+import threading
+import collections
+
+from .config import PROGRESS_MIN_INTERVAL, PROGRESS_HISTORY, JOB_RESULT_TTL
+
+logger = logging.getLogger(__name__)
+
+# Share of a job's overall progress covered by each stage, as (start, end) percent.
+STAGE_RANGES = {
+    "queued": (0, 0),
+    "fetch": (0, 5),
+    "prefilter": (5, 10),
+    "relevance": (10, 25),
+    "rerank": (25, 35),
+    "convert": (35, 40),
+    "summarize": (40, 85),
+    "tts": (85, 100),
+    "done": (100, 100),
+    "error": (100, 100),
+}
+# Stages that end a job; their events are delivered without delay.
+FINAL_STAGES = ("done", "error")
+
+
+class ProgressChannel:
+    """
+    Progress of one job: numbered, structured events that are kept (the last
+    `history` of them) for clients that reconnect, and delivered live through
+    emit(payload) at most once per min_interval seconds. Events published in
+    between are coalesced into a single payload {"job_id", "events": [...]};
+    a change of stage or a final event flushes immediately.
+
+    Each event carries job_id, seq, time, elapsed (seconds since the job
+    started), stage, stage_elapsed, percent, message and, when known,
+    article, done and total.
+    """
+
+    def __init__(self, job_id, emit=None, min_interval=None, history=None):
+        self.job_id = job_id
+        self.emit = emit
+        self.min_interval = PROGRESS_MIN_INTERVAL if min_interval is None else min_interval
+        self.started_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._events = collections.deque(maxlen=history or PROGRESS_HISTORY)
+        self._seq = 0
+        self._stage = None
+        self._stage_started = self.started_at
+        self._percent = 0.0
+        self._pending = []
+        self._last_emit = 0.0
+        self._timer = None
+
+    def _percent_for(self, stage, done, total):
+        start, end = STAGE_RANGES.get(stage, (self._percent, self._percent))
+        fraction = min(max(done / total, 0.0), 1.0) if done is not None and total else 0.0
+        # Stages may interleave (conversions finish while summaries stream); never go backwards.
+        return max(self._percent, round(start + (end - start) * fraction, 1))
+
+    def publish(self, message, stage=None, article=None, done=None, total=None, **data):
+        """
+        Records an event and schedules its delivery. Returns the event.
+        """
+        now = time.time()
+        with self._lock:
+            stage = stage or self._stage
+            new_stage = stage != self._stage
+            if new_stage:
+                self._stage = stage
+                self._stage_started = now
+            self._percent = self._percent_for(stage, done, total)
+            self._seq += 1
+            event = {
+                "job_id": self.job_id,
+                "seq": self._seq,
+                "time": now,
+                "elapsed": round(now - self.started_at, 3),
+                "stage": stage,
+                "stage_elapsed": round(now - self._stage_started, 3),
+                "percent": self._percent,
+                "message": message,
+            }
+            for key, value in (("article", article), ("done", done), ("total", total)):
+                if value is not None:
+                    event[key] = value
+            event.update(data)
+            self._events.append(event)
+            if stage in FINAL_STAGES:
+                self.finished_at = now
+            if self.emit is None:
+                return event
+            self._pending.append(event)
+            wait = self._last_emit + self.min_interval - now
+            if new_stage or stage in FINAL_STAGES or wait <= 0:
+                flush_now = True
+            else:
+                flush_now = False
+                if self._timer is None:
+                    self._timer = threading.Timer(wait, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if flush_now:
+            self.flush()
+        return event
+
+    def __call__(self, message, **kwargs):
+        # Lets a channel be passed wherever a trace_callback is expected.
+        self.publish(message, **kwargs)
+
+    def flush(self):
+        """
+        Delivers the events published since the last delivery, if any.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            events, self._pending = self._pending, []
+            if not events:
+                return
+            self._last_emit = time.time()
+            try:
+                # Emitting under the lock keeps payloads in seq order.
+                self.emit({"job_id": self.job_id, "events": events})
+            except Exception as e:
+                logger.warning("Could not deliver progress of job %s: %s", self.job_id, e)
+
+    def replay(self, after=0):
+        """
+        Returns (events with seq > after, truncated); truncated is True when
+        some of those events were already dropped from the history.
+        """
+        with self._lock:
+            events = [event for event in self._events if event["seq"] > after]
+            oldest = self._events[0]["seq"] if self._events else self._seq + 1
+            return events, after + 1 < oldest
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+
+class ProgressHub:
+    """
+    The progress channels of all jobs in this process, by job id. Channels of
+    finished jobs are dropped after ttl seconds.
+    """
+
+    def __init__(self, emit=None, min_interval=None, ttl=None):
+        self.emit = emit
+        self.min_interval = min_interval
+        self.ttl = JOB_RESULT_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def channel(self, job_id):
+        """
+        Returns the channel of job_id, creating it if needed. emit, if set,
+        is called as emit(job_id, payload).
+        """
+        with self._lock:
+            self._prune()
+            channel = self._channels.get(job_id)
+            if channel is None:
+                emit = (lambda payload: self.emit(job_id, payload)) if self.emit else None
+                channel = ProgressChannel(job_id, emit=emit, min_interval=self.min_interval)
+                self._channels[job_id] = channel
+            return channel
+
+    def get(self, job_id):
+        with self._lock:
+            return self._channels.get(job_id)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [job_id for job_id, c in self._channels.items() if c.finished and c.finished_at < cutoff]:
+            del self._channels[job_id]
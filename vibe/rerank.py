@@ -1,20 +1,19 @@
 import json
 import re
 import logging
+import concurrent.futures
 
 from .llm import chat_llm
+from .config import RERANK_GROUP_SIZE, RERANK_WORKERS
 
 logger = logging.getLogger(__name__)
 
-def rerank_articles(articles, user_info, llm_level="medium"):
+
+def _rank_group(articles, user_info, llm_level="medium", use_cache=True):
     """
-    Calls the LLM to reorder the articles by importance. Returns the reordered list.
-    Expects a JSON response with a 'ranking' key pointing to a list of article IDs.
+    Ranks one group of articles with a single LLM call. Articles the
+    response leaves out keep their relative order after the ranked ones.
     """
-    if not articles:
-        return []
-
-    logger.info("Starting rerank for %d articles.", len(articles))
     prompt_lines = [
         f"User info: {user_info}\n",
         ('Please rank the following articles from most relevant to least relevant. '
@@ -27,7 +26,7 @@ def rerank_articles(articles, user_info, llm_level="medium"):
     prompt = "\n".join(prompt_lines)
 
     try:
-        response_text = chat_llm(prompt, level=llm_level)
+        response_text = chat_llm(prompt, level=llm_level, use_cache=use_cache)
         match = re.search(r"\{.*\}", response_text, re.DOTALL)
         if not match:
             logger.error("No valid JSON found in rerank response.")
@@ -36,10 +35,64 @@ def rerank_articles(articles, user_info, llm_level="medium"):
         rerank_result = json.loads(json_str)
         ranking_list = rerank_result.get("ranking", [])
         article_map = {a["id"]: a for a in articles}
-        reordered = [article_map[art_id] for art_id in ranking_list if art_id in article_map]
+        reordered = []
+        for art_id in ranking_list:
+            if art_id in article_map and article_map[art_id] not in reordered:
+                reordered.append(article_map[art_id])
+        if len(reordered) < len(articles):
+            logger.debug("Rerank response ranked %d of %d articles.", len(reordered), len(articles))
         remaining = [a for a in articles if a["id"] not in ranking_list]
         reordered.extend(remaining)
         return reordered
     except Exception as e:
         logger.exception("Error during rerank: %s", e)
-        return articles
\ No newline at end of file
+        return articles
+
+
+def rerank_articles(articles, user_info, llm_level="medium", use_cache=True, top_n=None, group_size=None):
+    """
+    Calls the LLM to reorder the articles by importance. Returns the reordered list.
+    Expects a JSON response with a 'ranking' key pointing to a list of article IDs.
+
+    Up to group_size articles are ranked with one prompt. Larger sets are
+    ranked as a tournament: each round splits the candidates into groups
+    that are ranked concurrently, and only the leaders of each group (the
+    top_n, or half the group when top_n is unset or too large) advance until
+    the finalists fit in one prompt. Eliminated articles follow the
+    finalists, later rounds first, so the full list is still returned; only
+    the order of the top_n is exact.
+    """
+    if not articles:
+        return []
+
+    group_size = max(group_size or RERANK_GROUP_SIZE, 2)
+    logger.info("Starting rerank for %d articles.", len(articles))
+    if len(articles) <= group_size:
+        return _rank_group(articles, user_info, llm_level=llm_level, use_cache=use_cache)
+
+    advance = top_n if top_n and top_n < group_size else group_size // 2
+    candidates = list(articles)
+    eliminated = []
+    round_number = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=RERANK_WORKERS) as executor:
+        while len(candidates) > group_size:
+            round_number += 1
+            # Full groups always eliminate someone, so every round shrinks the field.
+            groups = [candidates[i: i + group_size] for i in range(0, len(candidates), group_size)]
+            logger.debug("Rerank round %d: %d candidates in %d groups.", round_number, len(candidates), len(groups))
+            ranked_groups = list(executor.map(
+                lambda group: _rank_group(group, user_info, llm_level=llm_level, use_cache=use_cache),
+                groups,
+            ))
+            candidates = [article for ranked in ranked_groups for article in ranked[:advance]]
+            # Within a round, losers are ordered by their position in their group.
+            losers = [
+                (position, index, article)
+                for index, ranked in enumerate(ranked_groups)
+                for position, article in enumerate(ranked[advance:])
+            ]
+            eliminated.insert(0, [article for _, _, article in sorted(losers, key=lambda item: item[:2])])
+
+    finalists = _rank_group(candidates, user_info, llm_level=llm_level, use_cache=use_cache)
+    logger.info("Rerank tournament settled %d finalists after %d rounds.", len(finalists), round_number)
+    return finalists + [article for round_losers in eliminated for article in round_losers]
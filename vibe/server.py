@@ -1,16 +1,424 @@
-from flask import Flask, send_file, request, jsonify, render_template
+from flask import Flask, Response, send_file, request, jsonify, render_template
+import os
+import re
+import time
+import uuid
 import logging
-from vibe.orchestrator import process_articles
-from vibe.config import CACHE_DIR
-from flask_socketio import SocketIO, emit
+import threading
+from vibe.orchestrator import (
+    build_report_segments, build_profile_reports, stream_report_sentences,
+)
+from vibe.profiles import normalize_profiles
+from vibe.config import (
+    DEBUG, WARMUP, PREFILTER_TOP_K, PRECOMPUTE, PRECOMPUTE_INTERVAL, JOBS_DIR, JOBS_DB_PATH, JOB_WORKERS, JOB_QUEUE_LIMIT, JOB_RESULT_TTL, JOB_CLEANUP_INTERVAL,
+)
+from vibe.jobs import JobManager, QueueFullError, DONE, FAILED
+from vibe.limits import stage_slot, stage_usage
+from vibe.metrics import REGISTRY, span
+from vibe.llm_cache import get_llm_cache
+from vibe.episode_cache import get_episode_cache, episode_key, link_or_copy
+from vibe.fetcher import fetch_arxiv_list, cached_arxiv_list
+from vibe.progress import ProgressHub
+from flask_socketio import SocketIO, emit, join_room, leave_room
 
 logger = logging.getLogger(__name__)
 app = Flask(__name__, template_folder="../templates")
-socketio = SocketIO(app)
+# Threads rather than eventlet/gevent: jobs use process pools, ffmpeg pipes and blocking
+# SQLite, which do not mix with monkey patching. Run it under gunicorn's gthread worker.
+socketio = SocketIO(app, async_mode="threading")
+
+# LLM quality level of server requests; hard-coded here, could be user-configurable.
+LLM_LEVEL = "medium"
+# Job and stream ids are uuid4 hex strings; stream clients may pick their own.
+_PROGRESS_ID = re.compile(r"^[0-9a-f]{8,64}$")
+
+
+def _room(job_id):
+    return f"job:{job_id}"
+
+
+progress_hub = ProgressHub(emit=lambda job_id, payload: socketio.emit("progress", payload, to=_room(job_id)))
+
+
+def run_job(job_id, params):
+    """
+    Job runner: builds the report for params and synthesizes it to JOBS_DIR/<job_id>.mp3.
+    Batch jobs (params with "profiles") are handed to run_batch_job.
+    Progress is published to the job's channel, which is delivered to the job's room.
+    """
+    channel = progress_hub.channel(job_id)
+    try:
+        result = _run_job(job_id, params, channel)
+    except Exception as e:
+        channel.publish(f"Processing failed: {e}", stage="error")
+        raise
+    channel.publish("Done.", stage="done")
+    return result
+
+
+def _run_job(job_id, params, trace_callback):
+    if "profiles" in params:
+        return run_batch_job(job_id, params, trace_callback)
+
+    output_mp3 = os.path.join(JOBS_DIR, f"{job_id}.mp3")
+    key = _episode_key(params, fetch_arxiv_list)
+    if key is None:
+        build_report_mp3(params, trace_callback, output_mp3)
+        return output_mp3
+
+    # Equivalent requests share one stored episode; concurrent ones wait for the first.
+    built = []
+
+    def produce(path):
+        built.append(path)
+        build_report_mp3(params, trace_callback, path)
+
+    episode = get_episode_cache().get_or_create(key, produce)
+    link_or_copy(episode, output_mp3)
+    if not built:
+        trace_callback("Reusing the stored episode of an equivalent request.", stage="tts", done=1, total=1)
+    return output_mp3
+
+
+def build_report_mp3(params, trace_callback, output_mp3):
+    """
+    Builds the report for single-report params and synthesizes it to output_mp3.
+    """
+    segments = build_report_segments(
+        params["user_info"],
+        arxiv_url=None,
+        max_articles=params.get("max_articles", 5),
+        new_only=params.get("new_only", False),
+        trace_callback=trace_callback,
+        llm_level=LLM_LEVEL,
+        use_cache=not params.get("no_cache", False),
+        prefilter_top_k=params.get("prefilter_top_k")
+    )
+    if not "".join(segments).strip():
+        raise RuntimeError("No summaries generated.")
+
+    from vibe.tts import segments_to_speech
+    trace_callback("Converting summaries to speech...", stage="tts")
+    with stage_slot("tts"):
+        segments_to_speech(segments, output_mp3)
+    trace_callback("Text-to-Speech conversion complete. MP3 file generated.", stage="tts", done=1, total=1)
+
+
+def _episode_key(params, listing):
+    """
+    Returns the episode cache key of single-report params, or None when the
+    cache is disabled or the result should not be shared: with no_cache, and
+    with new_only, whose result depends on what was processed before.
+    listing() returns the current arXiv listing, or None if it is not known
+    (then there is no key either).
+    """
+    if get_episode_cache() is None or params.get("no_cache") or params.get("new_only"):
+        return None
+    articles = listing()
+    if articles is None:
+        return None
+    from vibe.tts import get_engine
+
+    engine = get_engine()
+    prefilter_top_k = params.get("prefilter_top_k")
+    return episode_key(
+        params["user_info"],
+        articles,
+        max_articles=params.get("max_articles", 5),
+        llm_level=LLM_LEVEL,
+        voice=[engine.model_id, engine.voice, engine.speed],
+        prefilter_top_k=PREFILTER_TOP_K if prefilter_top_k is None else prefilter_top_k,
+    )
+
+
+def _stored_episode(params):
+    """
+    Returns the path of a stored episode for params, or None. Meant for
+    request threads: it only uses a cached listing, never fetches one, and
+    never raises, so that callers can fall back to building the report.
+    """
+    if not params.get("user_info"):
+        return None
+    try:
+        key = _episode_key(params, cached_arxiv_list)
+    except Exception as e:
+        logger.warning("Could not look up a stored episode: %s", e)
+        return None
+    return get_episode_cache().lookup(key) if key else None
+
+
+def run_batch_job(job_id, params, trace_callback):
+    """
+    Builds one report per profile and synthesizes each to
+    JOBS_DIR/<job_id>/<name>.mp3. Returns the directory.
+    """
+    reports = build_profile_reports(
+        params["profiles"],
+        arxiv_url=None,
+        new_only=params.get("new_only", False),
+        trace_callback=trace_callback,
+        llm_level=LLM_LEVEL,
+        use_cache=not params.get("no_cache", False),
+        prefilter_top_k=params.get("prefilter_top_k")
+    )
+    output_dir = os.path.join(JOBS_DIR, job_id)
+    os.makedirs(output_dir, exist_ok=True)
+    from vibe.tts import segments_to_speech
+    trace_callback("Converting summaries to speech...", stage="tts")
+    for done, (name, report) in enumerate(reports.items(), start=1):
+        with stage_slot("tts"):
+            segments_to_speech(report["segments"], os.path.join(output_dir, f"{name}.mp3"))
+        trace_callback(f"Generated MP3 for profile {name}.", stage="tts", done=done, total=len(reports))
+    return output_dir
+
+
+# Created by start(), so that importing this module has no side effects.
+job_manager = None
+
+# /process/stream requests run on their request thread rather than as jobs;
+# they are counted here and share JOB_QUEUE_LIMIT with pending jobs.
+_streams = 0
+_streams_lock = threading.Lock()
+
+
+def _start_stream():
+    """
+    Counts a new stream unless pending jobs and streams already reach
+    JOB_QUEUE_LIMIT. Returns whether it was counted.
+    """
+    global _streams
+    with _streams_lock:
+        if job_manager.pending() + _streams >= JOB_QUEUE_LIMIT:
+            return False
+        _streams += 1
+        return True
+
+
+def _end_stream():
+    global _streams
+    with _streams_lock:
+        _streams -= 1
+
+
+def _busy_response():
+    response = jsonify({"error": "Server is busy, please retry later."})
+    response.headers["Retry-After"] = "30"
+    return response, 503
+
+
+def _queue_metrics():
+    """
+    Scrape-time gauges: job and stream counts and per-stage concurrency slots.
+    """
+    for status, count in job_manager.depth().items():
+        yield "vibe_jobs", "Jobs by status.", {"status": status}, count
+    yield "vibe_streams_active", "Streaming requests in progress.", {}, _streams
+    for stage, usage in stage_usage().items():
+        yield "vibe_stage_slots_limit", "Concurrency limit per stage.", {"stage": stage}, usage["limit"]
+        yield "vibe_stage_slots_active", "Stage slots in use.", {"stage": stage}, usage["active"]
+        yield "vibe_stage_slots_waiting", "Callers waiting for a stage slot.", {"stage": stage}, usage["waiting"]
+    if precomputer is not None:
+        status = precomputer.status()
+        for key in ("total", "done", "converted", "failed"):
+            yield "vibe_precompute_articles", "Articles of the current precompute pass.", {"progress": key}, status[key]
+    cache = get_llm_cache()
+    if cache is not None:
+        stats = cache.stats()
+        yield "vibe_llm_cache_entries", "Responses in the LLM cache.", {}, stats["entries"]
+        yield "vibe_llm_cache_bytes", "Size of the LLM cache.", {}, stats["bytes"]
+    episodes = get_episode_cache()
+    if episodes is not None:
+        stats = episodes.stats()
+        yield "vibe_episode_cache_entries", "Finished episodes in the episode cache.", {}, stats["entries"]
+        yield "vibe_episode_cache_bytes", "Size of the episode cache.", {}, stats["bytes"]
+
+
+def _job_params(data):
+    return {
+        "user_info": data.get("user_info", ""),
+        "max_articles": data.get("max_articles", 5),
+        "new_only": data.get("new_only", False),
+        "no_cache": data.get("no_cache", False),
+        "prefilter_top_k": data.get("prefilter_top_k"),
+    }
+
+
+def _batch_params(data):
+    return {
+        "profiles": normalize_profiles(data.get("profiles") or [], data.get("defaults")),
+        "new_only": data.get("new_only", False),
+        "no_cache": data.get("no_cache", False),
+        "prefilter_top_k": data.get("prefilter_top_k"),
+    }
+
+
+def _submit(data, batch=False):
+    """
+    Validates a request body and queues a job for it.
+    Returns (job_id, None) or (None, error_response).
+    """
+    if batch:
+        try:
+            params = _batch_params(data or {})
+        except (TypeError, ValueError) as e:
+            logger.error("Invalid batch request: %s", e)
+            return None, (jsonify({"error": str(e)}), 400)
+    else:
+        params = _job_params(data or {})
+        if not params["user_info"]:
+            logger.error("user_info not provided in request.")
+            return None, (jsonify({"error": "user_info not provided"}), 400)
+    try:
+        if _streams and job_manager.pending() + _streams >= JOB_QUEUE_LIMIT:
+            raise QueueFullError(f"{_streams} streams and pending jobs reach the limit of {JOB_QUEUE_LIMIT}")
+        job_id = job_manager.submit(params)
+    except QueueFullError as e:
+        logger.warning("Rejecting request, job queue is full: %s", e)
+        return None, _busy_response()
+    progress_hub.channel(job_id).publish("Queued.", stage="queued")
+    if batch:
+        logger.info("Queued batch job %s for %d profiles.", job_id, len(params["profiles"]))
+    else:
+        logger.info("Queued job %s with user_info: %s, max_articles: %s, new_only: %s",
+                    job_id, params["user_info"], params["max_articles"], params["new_only"])
+    return job_id, None
+
 
 @app.route("/process", methods=["POST"])
 def process_endpoint():
     data = request.get_json()
+    stored = _stored_episode(_job_params(data or {}))
+    if stored:
+        logger.info("Returning the stored episode of an equivalent request.")
+        return send_file(stored, as_attachment=True, download_name="summary.mp3")
+
+    job_id, error = _submit(data)
+    if error:
+        return error
+
+    job = job_manager.wait(job_id)
+    if job["status"] != DONE:
+        logger.error("Job %s failed: %s", job_id, job["error"])
+        return jsonify({"error": job["error"] or "Processing failed."}), 500
+
+    logger.info("Process complete. Returning MP3 file.")
+    return send_file(job["result_path"], as_attachment=True)
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_job_endpoint():
+    job_id, error = _submit(request.get_json())
+    if error:
+        return error
+    return jsonify({
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result",
+    }), 202
+
+
+@app.route("/batch", methods=["POST"])
+def submit_batch_endpoint():
+    """
+    Queues one job that builds a report for each of several profiles,
+    sharing the fetch, relevance checks, conversions and summaries.
+    """
+    job_id, error = _submit(request.get_json(), batch=True)
+    if error:
+        return error
+    return jsonify({
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result",
+    }), 202
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status_endpoint(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job."}), 404
+    return jsonify({
+        "job_id": job["id"],
+        "status": job["status"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    })
+
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events_endpoint(job_id):
+    """
+    Returns the progress events of a job (or stream) with seq greater than
+    the "after" query parameter, for clients that poll or reconnect.
+    """
+    channel = progress_hub.get(job_id)
+    if channel is None:
+        if job_manager.get(job_id) is None:
+            return jsonify({"error": "Unknown job."}), 404
+        return jsonify({"job_id": job_id, "events": [], "truncated": False})
+    events, truncated = channel.replay(request.args.get("after", 0, type=int))
+    return jsonify({"job_id": job_id, "events": events, "truncated": truncated})
+
+
+@app.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result_endpoint(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job."}), 404
+    if job["status"] == FAILED:
+        return jsonify({"error": job["error"]}), 500
+    if job["status"] != DONE or not job["result_path"] or not os.path.exists(job["result_path"]):
+        return jsonify({"status": job["status"]}), 409
+    if os.path.isdir(job["result_path"]):
+        names = sorted(name[:-len(".mp3")] for name in os.listdir(job["result_path"]) if name.endswith(".mp3"))
+        return jsonify({"profiles": {name: f"/jobs/{job_id}/result/{name}" for name in names}})
+    return send_file(job["result_path"], as_attachment=True, download_name="summary.mp3")
+
+
+@app.route("/jobs/<job_id>/result/<name>", methods=["GET"])
+def job_profile_result_endpoint(job_id, name):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job."}), 404
+    if job["status"] == FAILED:
+        return jsonify({"error": job["error"]}), 500
+    if job["status"] != DONE or not job["result_path"] or not os.path.isdir(job["result_path"]):
+        return jsonify({"status": job["status"]}), 409
+    path = os.path.join(job["result_path"], f"{os.path.basename(name)}.mp3")
+    if not os.path.exists(path):
+        return jsonify({"error": "Unknown profile."}), 404
+    return send_file(path, as_attachment=True, download_name=f"{os.path.basename(name)}.mp3")
+
+
+def _request_params():
+    """
+    Reads pipeline parameters from a JSON body or, for GET requests, the query string.
+    """
+    if request.method == "GET":
+        args = request.args
+        return {
+            "user_info": args.get("user_info", ""),
+            "max_articles": args.get("max_articles", 5, type=int),
+            "new_only": args.get("new_only", "false").lower() in ("1", "true", "yes"),
+            "no_cache": args.get("no_cache", "false").lower() in ("1", "true", "yes"),
+            "prefilter_top_k": args.get("prefilter_top_k", type=int),
+            "progress_id": args.get("progress_id"),
+        }
+    return request.get_json() or {}
+
+
+@app.route("/process/stream", methods=["GET", "POST"])
+def process_stream_endpoint():
+    """
+    Streams the report as a chunked MP3 response. Summaries are streamed from
+    the LLM and spoken sentence by sentence, so audio for the first article
+    starts while its summary is still being written; later articles follow
+    in rerank order. Progress goes to the room of the "progress_id" parameter
+    (generated if absent) and is returned in the X-Progress-Id header.
+    """
+    data = _request_params()
     user_info = data.get("user_info", "")
     if not user_info:
         logger.error("user_info not provided in request.")
@@ -18,46 +426,215 @@ def process_endpoint():
 
     max_articles = data.get("max_articles", 5)
     new_only = data.get("new_only", False)
+    use_cache = not data.get("no_cache", False)
+
+    progress_id = str(data.get("progress_id") or uuid.uuid4().hex).lower()
+    if not _PROGRESS_ID.match(progress_id):
+        return jsonify({"error": "progress_id must be 8 to 64 hexadecimal characters"}), 400
+    if progress_hub.get(progress_id) is not None or job_manager.get(progress_id) is not None:
+        return jsonify({"error": "progress_id is already in use"}), 409
+    channel = progress_hub.channel(progress_id)
+
+    stored = _stored_episode(data)
+    if stored:
+        channel.publish("Reusing the stored episode of an equivalent request.", stage="done")
+        response = send_file(stored, mimetype="audio/mpeg")
+        response.headers["X-Progress-Id"] = progress_id
+        return response
 
-    logger.info("Processing request with user_info: %s, max_articles: %s, new_only: %s", user_info, max_articles, new_only)
-    # Define trace_callback to emit trace messages via WebSockets
-    def trace_callback(message):
-        socketio.emit("trace", {"message": message})
+    if not _start_stream():
+        logger.warning("Rejecting stream request, job queue is full.")
+        channel.publish("Server is busy.", stage="error")
+        return _busy_response()
 
-    final_summary = process_articles(
+    logger.info("Streaming request with user_info: %s, max_articles: %s, new_only: %s", user_info, max_articles, new_only)
+    sentences = stream_report_sentences(
         user_info,
         arxiv_url=None,
         max_articles=max_articles,
         new_only=new_only,
-        trace_callback=trace_callback,
-        llm_level="medium"  # hard-coded here; could be user-configurable
+        trace_callback=channel,
+        llm_level=LLM_LEVEL,
+        use_cache=use_cache,
+        prefilter_top_k=data.get("prefilter_top_k")
     )
-    if not final_summary.strip():
-        logger.error("No summaries generated.")
-        return jsonify({"error": "No summaries generated."}), 500
 
-    import uuid, os
-    mp3_filename = f"final_{uuid.uuid4().hex}.mp3"
-    output_mp3 = os.path.join(CACHE_DIR, mp3_filename)
+    def close():
+        # Called by the WSGI server once the response is finished or abandoned, even if never iterated.
+        _end_stream()
+        if not channel.finished:
+            channel.publish("Stream closed before it started.", stage="error")
+
+    response = Response(_stream_audio(channel, sentences), mimetype="audio/mpeg")
+    response.call_on_close(close)
+    response.headers["X-Progress-Id"] = progress_id
+    return response
+
 
+def _stream_audio(channel, sentences):
+    """
+    Yields the MP3 stream of sentences and ends the stream's progress with
+    a "done" event, or an "error" event if synthesis fails or the client
+    goes away (the generator is closed early).
+    """
+    from vibe.tts import get_engine
+
+    error = "Stream closed by the client."
     try:
-        from vibe.tts import text_to_speech
-        text_to_speech(final_summary, output_mp3)
-        trace_callback("Text-to-Speech conversion complete. MP3 file generated.")
+        # stream_mp3 takes a "tts" stage slot per segment, while it synthesizes.
+        yield from get_engine().stream_mp3(sentences)
+        error = None
     except Exception as e:
-        logger.exception("TTS conversion failed: %s", e)
-        return jsonify({"error": f"TTS conversion failed: {e}"}), 500
+        error = f"Streaming failed: {e}"
+        raise
+    finally:
+        if error:
+            channel.publish(error, stage="error")
+        else:
+            channel.publish("Done.", stage="done")
 
-    logger.info("Process complete. Returning MP3 file.")
-    return send_file(output_mp3, as_attachment=True)
+@app.route("/precompute", methods=["GET"])
+def precompute_status_endpoint():
+    if precomputer is None:
+        return jsonify({"state": "disabled"})
+    return jsonify(precomputer.status())
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
 
 @app.route("/")
 def index():
     return render_template("index.html")
 
-@socketio.on("connect")
-def handle_connect():
-    emit("trace", {"message": "Connected to server. Ready to process your request."})
+@socketio.on("subscribe")
+def handle_subscribe(data):
+    """
+    Joins the room of data["job_id"] and replays the events after data["after"]
+    (a seq number, default 0) to this client only. Live events may overlap the
+    replay, so clients should ignore seq numbers they have already seen.
+    """
+    data = data if isinstance(data, dict) else {}
+    job_id = str(data.get("job_id", "")).lower()
+    if not _PROGRESS_ID.match(job_id):
+        emit("progress_error", {"job_id": job_id, "error": "Invalid job id."})
+        return
+    join_room(_room(job_id))
+    channel = progress_hub.get(job_id)
+    events, truncated = channel.replay(int(data.get("after") or 0)) if channel else ([], False)
+    emit("progress", {"job_id": job_id, "events": events, "replay": True, "truncated": truncated})
+
+
+@socketio.on("unsubscribe")
+def handle_unsubscribe(data):
+    data = data if isinstance(data, dict) else {}
+    leave_room(_room(str(data.get("job_id", "")).lower()))
+
+
+_warmup_started = False
+_warmup_lock = threading.Lock()
+
+
+def start_warmup():
+    """
+    Loads the LLM client, the Docling workers and the Kokoro pipeline in a
+    background thread so that the first request does not pay for them.
+    Engines are otherwise created lazily on first use. Safe to call twice.
+    """
+    global _warmup_started
+    with _warmup_lock:
+        if _warmup_started:
+            return
+        _warmup_started = True
+
+    def warm():
+        from vibe import llm, converter
+        from vibe.tts import get_engine
+
+        for component, load in (("llm", llm.warm_up), ("docling", converter.warm_up), ("tts", get_engine().load)):
+            started = time.time()
+            try:
+                with span("warmup", component=component):
+                    load()
+                logger.info("Warmed up %s in %.1fs.", component, time.time() - started)
+            except Exception as e:
+                logger.exception("Warm-up of %s failed: %s", component, e)
+
+    threading.Thread(target=warm, name="warmup", daemon=True).start()
+
+
+precomputer = None
+_precompute_lock = threading.Lock()
+
+
+def _interactive_busy():
+    """
+    True while requests are queued or running, or waiting for a stage slot.
+    """
+    return job_manager.pending() > 0 or any(usage["waiting"] for usage in stage_usage().values())
+
+
+def start_precompute(scope=None, profiles=None):
+    """
+    Starts the background precompute scheduler (see precompute.Precomputer),
+    which converts each new listing while the server is otherwise idle.
+    profiles default to the PRECOMPUTE_PROFILES file. Safe to call twice.
+    """
+    global precomputer
+    from vibe.precompute import Precomputer, load_known_profiles
+
+    with _precompute_lock:
+        if precomputer is not None:
+            return precomputer
+        precomputer = Precomputer(
+            scope=scope,
+            profiles=profiles if profiles is not None else load_known_profiles(),
+            is_busy=_interactive_busy,
+            progress_callback=lambda status: socketio.emit("precompute", status),
+        )
+    precomputer.start(PRECOMPUTE_INTERVAL)
+    logger.info("Started precompute scheduler (scope %s, every %ds).", precomputer.scope, PRECOMPUTE_INTERVAL)
+    return precomputer
+
+
+_start_lock = threading.Lock()
+
+
+def start():
+    """
+    Starts the server's background machinery: the job manager (which
+    requeues jobs left unfinished by a previous process and sweeps old
+    results), the metrics collector and, per VIBE_WARMUP and
+    VIBE_PRECOMPUTE, warm-up and precompute. Safe to call twice.
+    """
+    global job_manager
+    with _start_lock:
+        if job_manager is not None:
+            return
+        job_manager = JobManager(
+            run_job,
+            db_path=JOBS_DB_PATH,
+            workers=JOB_WORKERS,
+            queue_limit=JOB_QUEUE_LIMIT,
+            result_ttl=JOB_RESULT_TTL,
+            cleanup_interval=JOB_CLEANUP_INTERVAL,
+        )
+        REGISTRY.register_collector(_queue_metrics)
+    if WARMUP:
+        start_warmup()
+    if PRECOMPUTE:
+        start_precompute()
+
+
+def create_app():
+    """
+    App factory for WSGI servers (gunicorn "vibe.server:create_app()"):
+    starts the server and returns the app.
+    """
+    start()
+    return app
+
 
 if __name__ == "__main__":
-    socketio.run(app, debug=True)
\ No newline at end of file
+    start()
+    socketio.run(app, debug=DEBUG)
\ No newline at end of file
@@ -1,24 +1,92 @@
 import logging
-from .llm import chat_llm
+import concurrent.futures
+
+from .llm import chat_llm, chat_llm_stream, llm_setting
+from .content import reduce_content, chunk_content, estimate_tokens
 
 logger = logging.getLogger(__name__)
 
-def generate_article_summary(article, content, user_info, llm_level="medium"):
-    """
-    Generates a fluid, narrative summary for the article using the LLM.
-    The summary starts with a connecting phrase.
-    """
-    prompt = (
+DEFAULT_TOKEN_BUDGET = 24000
+MAP_WORKERS = 4
+
+
+def _summary_prompt(article, user_info, body_label, body):
+    return (
         f"User info: {user_info}\n\n"
         f"Please summarize the following article titled '{article['title']}' in a fluid narrative prose style without lists or visual cues. "
         f"Begin the summary with a connecting segment like 'And now, Article: {article['title']}'.\n\n"
-        f"Article Content:\n{content}"
+        f"{body_label}:\n{body}"
     )
 
+
+def _summarize_part(article, user_info, part, index, total, llm_level, use_cache):
+    prompt = (
+        f"User info: {user_info}\n\n"
+        f"The following is part {index} of {total} of the article titled '{article['title']}'. "
+        "Write concise notes on what this part contributes: problem, method, key results and numbers, "
+        "and limitations. Plain prose, no preamble.\n\n"
+        f"Article Part:\n{part}"
+    )
+    return chat_llm(prompt, level=llm_level, use_cache=use_cache)
+
+
+def _final_prompt(article, content, user_info, llm_level, use_cache):
+    """
+    Returns the prompt for the article's narrative summary. Low-value
+    sections are dropped first; if the rest still exceeds the level's
+    summary_token_budget, sections are summarized concurrently and the
+    prompt asks to merge those notes. Returns None if no notes were produced.
+    """
+    reduced = reduce_content(content) or content
+    budget = llm_setting(llm_level, "summary_token_budget", DEFAULT_TOKEN_BUDGET)
+    if estimate_tokens(reduced) <= budget:
+        return _summary_prompt(article, user_info, "Article Content", reduced)
+
+    parts = chunk_content(reduced, budget)
+    logger.info("Article '%s' is ~%d tokens; summarizing %d parts before merging.",
+                article["id"], estimate_tokens(reduced), len(parts))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAP_WORKERS, len(parts))) as executor:
+        notes = list(executor.map(
+            lambda item: _summarize_part(article, user_info, item[1], item[0], len(parts), llm_level, use_cache),
+            enumerate(parts, start=1),
+        ))
+    notes = [n for n in notes if n]
+    if not notes:
+        logger.error("No part summaries produced for article '%s'.", article["id"])
+        return None
+    return _summary_prompt(article, user_info, "Notes on the article, in order", "\n\n".join(notes))
+
+
+def generate_article_summary(article, content, user_info, llm_level="medium", use_cache=True):
+    """
+    Generates a fluid, narrative summary for the article using the LLM.
+    The summary starts with a connecting phrase.
+    Low-value sections are dropped first; if the rest still exceeds the
+    level's summary_token_budget, sections are summarized concurrently and
+    the notes are merged into the final narrative.
+    """
     logger.info("Generating summary for article '%s'.", article["id"])
     try:
-        response_text = chat_llm(prompt, level=llm_level)
-        return response_text
+        prompt = _final_prompt(article, content, user_info, llm_level, use_cache)
+        if prompt is None:
+            return ""
+        return chat_llm(prompt, level=llm_level, use_cache=use_cache)
+    except Exception as e:
+        logger.exception("Error summarizing article '%s': %s", article["id"], e)
+        return ""
+
+
+def stream_article_summary(article, content, user_info, llm_level="medium", use_cache=True):
+    """
+    Like generate_article_summary, but yields the summary in pieces while
+    the LLM writes it. For long articles the part notes are produced first;
+    only the final narrative is streamed.
+    """
+    logger.info("Streaming summary for article '%s'.", article["id"])
+    try:
+        prompt = _final_prompt(article, content, user_info, llm_level, use_cache)
     except Exception as e:
         logger.exception("Error summarizing article '%s': %s", article["id"], e)
-        return ""
\ No newline at end of file
+        return
+    if prompt is not None:
+        yield from chat_llm_stream(prompt, level=llm_level, use_cache=use_cache)
@@ -0,0 +1,127 @@
+import re
+import logging
+import threading
+import statistics
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Share of non-space characters that must be letters; formulas and tables
+# lower it, but a usable text layer of a paper stays well above this.
+MIN_LETTER_RATIO = 0.55
+# Share of characters that may be undecodable glyphs (U+FFFD, private use, "(cid:NN)").
+MAX_GARBAGE_RATIO = 0.02
+# Mean word length outside this range means broken spacing ("w o r d s" or "wordsruntogether").
+WORD_LENGTH_RANGE = (2.5, 12.0)
+
+_NUMBERED_HEADING = re.compile(r"^(\d+(\.\d+)*\.?|[IVX]+\.)\s+[A-Z][^.!?]{1,80}$")
+_NAMED_HEADING = re.compile(
+    r"^(abstract|introduction|related work|background|conclusions?|discussion|"
+    r"references|bibliography|acknowledge?ments?|appendix|appendices)\b.{0,40}$",
+    re.IGNORECASE,
+)
+_PAGE_NUMBER = re.compile(r"^\s*\d{1,4}\s*$")
+_ARXIV_STAMP = re.compile(r"^arXiv:\d{4}\.\d{4,5}(v\d+)?\s+\[[^\]]+\]")
+_CID = re.compile(r"\(cid:\d+\)")
+_WORD = re.compile(r"[^\W\d_]+")
+
+# pdfium is not thread-safe; extraction is fast enough to serialize.
+_pdfium_lock = threading.Lock()
+
+
+def extract_pages(pdf_path):
+    """
+    Returns the text layer of each page of the PDF, using pypdfium2.
+    Raises ImportError if pypdfium2 is not installed.
+    """
+    import pypdfium2
+
+    pages = []
+    with _pdfium_lock:
+        pdf = pypdfium2.PdfDocument(pdf_path)
+        try:
+            for index in range(len(pdf)):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                try:
+                    pages.append(textpage.get_text_range())
+                finally:
+                    textpage.close()
+                    page.close()
+        finally:
+            pdf.close()
+    return pages
+
+
+def assess_pages(pages, min_chars_per_page):
+    """
+    Decides whether an extracted text layer is good enough to skip layout
+    analysis. Returns (ok, reason); reason explains a rejection.
+    """
+    if not pages:
+        return False, "no pages"
+    text = "".join(pages)
+    chars_per_page = len(text.strip()) / len(pages)
+    if chars_per_page < min_chars_per_page:
+        return False, f"{chars_per_page:.0f} characters per page, likely scanned"
+
+    visible = [c for c in text if not c.isspace()]
+    if not visible:
+        return False, "empty text layer"
+    garbage = len(_CID.findall(text)) * 8 + sum(
+        1 for c in visible if c == "\ufffd" or unicodedata.category(c) in ("Co", "Cc")
+    )
+    if garbage / len(visible) > MAX_GARBAGE_RATIO:
+        return False, f"{garbage / len(visible):.1%} undecodable glyphs"
+    letters = sum(1 for c in visible if c.isalpha())
+    if letters / len(visible) < MIN_LETTER_RATIO:
+        return False, f"only {letters / len(visible):.0%} letters"
+    words = _WORD.findall(text)
+    mean_length = sum(len(w) for w in words) / len(words) if words else 0.0
+    if not WORD_LENGTH_RANGE[0] <= mean_length <= WORD_LENGTH_RANGE[1]:
+        return False, f"mean word length {mean_length:.1f}, broken spacing"
+    return True, ""
+
+
+def _is_heading(line):
+    return len(line) <= 90 and bool(_NUMBERED_HEADING.match(line) or _NAMED_HEADING.match(line))
+
+
+def pages_to_markdown(pages):
+    """
+    Turns page texts into Markdown that content.split_sections understands:
+    numbered and well-known section titles become "##" headings, wrapped
+    lines are joined into paragraphs (undoing end-of-line hyphenation), and
+    page numbers and arXiv margin stamps are dropped.
+    """
+    lines = []
+    for page in pages:
+        for line in page.splitlines():
+            line = line.strip()
+            if not line or _PAGE_NUMBER.match(line) or _ARXIV_STAMP.match(line):
+                continue
+            lines.append(line)
+    if not lines:
+        return ""
+    typical = statistics.median(len(line) for line in lines)
+
+    blocks = []
+    paragraph = ""
+    for line in lines:
+        if _is_heading(line):
+            if paragraph:
+                blocks.append(paragraph)
+            blocks.append(f"## {line}")
+            paragraph = ""
+            continue
+        if paragraph.endswith("-") and line[:1].islower():
+            paragraph = paragraph[:-1] + line
+        else:
+            paragraph = f"{paragraph} {line}".strip()
+        # A short line ending a sentence closes the paragraph.
+        if line[-1:] in ".!?:" and len(line) < 0.8 * typical:
+            blocks.append(paragraph)
+            paragraph = ""
+    if paragraph:
+        blocks.append(paragraph)
+    return "\n\n".join(blocks)
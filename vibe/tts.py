@@ -1,33 +1,551 @@
 import os
-import subprocess
+import re
+import json
+import queue
+import hashlib
 import tempfile
+import subprocess
+import threading
 import logging
-import soundfile as sf
-from kokoro import KPipeline
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+from importlib import metadata
+import numpy as np
+
+from .config import (
+    AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES, TTS_WORKERS, TTS_TORCH_THREADS, TTS_SHARD_CHARS, TTS_PARAGRAPH_PAUSE,
+)
+from .content import iter_sentences
+from .metrics import span, record_cache_lookup
+from .limits import stage_slot
 
 logger = logging.getLogger(__name__)
 
-def text_to_speech(text, output_mp3):
+SAMPLE_RATE = 24000
+
+
+def _kokoro_version():
+    try:
+        return metadata.version("kokoro")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _to_pcm(audio):
     """
-    Converts the provided text to speech using KPipeline.
-    Generates a temporary WAV file and converts it to MP3 using ffmpeg.
+    Converts a Kokoro audio chunk (tensor or array) to raw little-endian float32 bytes.
     """
-    logger.info("Starting text-to-speech conversion.")
-    pipeline = KPipeline(lang_code="a")
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_wav:
-        temp_wav_path = tmp_wav.name
-    logger.debug("Temporary WAV file created at %s", temp_wav_path)
+    if hasattr(audio, "detach"):
+        audio = audio.detach().cpu().numpy()
+    return np.asarray(audio, dtype="<f4").tobytes()
+
+
+def _silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype="<f4").tobytes()
+
 
+def split_shards(text, max_chars=None):
+    """
+    Splits text into synthesis shards: one per paragraph, with paragraphs
+    longer than max_chars (default TTS_SHARD_CHARS) cut into runs of whole
+    sentences. Returns (shard, starts_paragraph) pairs; the pause between
+    paragraphs is inserted at shards that start one.
+    """
+    max_chars = max_chars or TTS_SHARD_CHARS
+    shards = []
+    for paragraph in re.split(r"\n+", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        current = ""
+        starts_paragraph = True
+        for sentence in iter_sentences([paragraph], min_chars=0):
+            if current and len(current) + len(sentence) + 1 > max_chars:
+                shards.append((current, starts_paragraph))
+                current = ""
+                starts_paragraph = False
+            current = f"{current} {sentence}".strip()
+        if current:
+            shards.append((current, starts_paragraph))
+    return shards
+
+
+_tts_pool = None
+_tts_pool_lock = threading.Lock()
+# Seconds load() waits for all TTS workers to start (and load Kokoro) before giving up.
+WORKER_START_TIMEOUT = 600
+# Set in each TTS worker process by _init_tts_worker.
+_worker_engine = None
+_worker_barrier = None
+
+
+def _torch_threads(workers):
+    return TTS_TORCH_THREADS or max(1, (os.cpu_count() or 1) // workers)
+
+
+def _init_tts_worker(lang_code, torch_threads, barrier):
+    """
+    Runs once in each TTS worker process: limits torch to torch_threads so
+    that workers do not oversubscribe the cores, and creates the worker's
+    engine and loads its pipeline, so no shard is ever run by a cold worker.
+    """
+    global _worker_engine, _worker_barrier
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[name] = str(torch_threads)
     try:
-        generator = pipeline(text, voice="af_bella", speed=1, split_pattern=r"\n+")
-        with sf.SoundFile(temp_wav_path, "w", 24000, channels=1) as f:
+        import torch
+
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    _worker_barrier = barrier
+    _worker_engine = TTSEngine(lang_code=lang_code, workers=1)
+    _worker_engine.load()
+
+
+def _wait_for_tts_workers():
+    # Holds this worker until every worker has started, so that each of these tasks needs its own process.
+    _worker_barrier.wait(WORKER_START_TIMEOUT)
+    return True
+
+
+def _synthesize_shard(text, voice, speed):
+    """
+    Runs in a TTS worker: returns the float32 PCM of text at SAMPLE_RATE.
+    """
+    # Each worker process runs one task at a time.
+    _worker_engine.voice = voice
+    _worker_engine.speed = speed
+    return b"".join(_to_pcm(audio) for audio in _worker_engine.iter_audio(text))
+
+
+def _get_tts_pool(lang_code, workers):
+    """
+    Returns the shared TTS worker pool, creating it on first use. Each
+    worker loads its own Kokoro pipeline when it starts.
+    """
+    global _tts_pool
+    with _tts_pool_lock:
+        if _tts_pool is None:
+            threads = _torch_threads(workers)
+            logger.info("Starting TTS pool with %d workers, %d torch threads each.", workers, threads)
+            context = multiprocessing.get_context("spawn")
+            _tts_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=context,
+                initializer=_init_tts_worker,
+                initargs=(lang_code, threads, context.Barrier(workers)),
+            )
+        return _tts_pool
+
+
+def _reset_tts_pool(pool):
+    """
+    Drops pool, e.g. after one of its workers died (BrokenProcessPool), so
+    that the next _get_tts_pool starts a fresh one.
+    """
+    global _tts_pool
+    with _tts_pool_lock:
+        if _tts_pool is pool:
+            logger.warning("Restarting the TTS worker pool.")
+            _tts_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+class TTSEngine:
+    """
+    Long-lived Kokoro text-to-speech engine. The pipeline is loaded once and
+    reused across calls; audio chunks are piped straight into ffmpeg so MP3
+    encoding overlaps synthesis and no intermediate WAV is written.
+
+    Text is synthesized per paragraph with a fixed pause between paragraphs
+    (and between segments).
+    With workers > 1 (default TTS_WORKERS) the paragraphs are sharded across
+    a pool of worker processes, each with its own warm pipeline, and the
+    audio is reassembled in order; the result matches serial synthesis.
+    """
+
+    def __init__(self, lang_code="a", voice="af_bella", speed=1, workers=None):
+        self.lang_code = lang_code
+        self.voice = voice
+        self.speed = speed
+        self.workers = TTS_WORKERS if workers is None else workers
+        self._pipeline = None
+        self._load_lock = threading.Lock()
+        # KPipeline is not safe to drive from several threads at once.
+        self._synth_lock = threading.Lock()
+
+    @property
+    def model_id(self):
+        return f"kokoro-{_kokoro_version()}-{self.lang_code}"
+
+    def segment_key(self, text):
+        """
+        Returns the audio cache key for text under this engine's model, voice and speed.
+        """
+        raw = json.dumps([self.model_id, self.voice, self.speed, TTS_PARAGRAPH_PAUSE, text])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def load(self):
+        """
+        Loads the Kokoro pipeline, or with workers > 1 starts the worker pool
+        and loads a pipeline in every worker. Blocks until done.
+        """
+        if self.workers > 1:
+            pool = _get_tts_pool(self.lang_code, self.workers)
+            try:
+                # The pool starts a new worker for each task submitted while the others are busy;
+                # these tasks stay busy until all workers are up, so every worker is started.
+                for future in [pool.submit(_wait_for_tts_workers) for _ in range(self.workers)]:
+                    future.result()
+            except Exception:
+                # A worker died or never arrived (its barrier is broken now); start over next time.
+                _reset_tts_pool(pool)
+                raise
+            return None
+        with self._load_lock:
+            if self._pipeline is None:
+                # Kokoro pulls in torch; import it only when speech is first needed.
+                from kokoro import KPipeline
+
+                logger.info("Loading Kokoro pipeline (lang_code=%s).", self.lang_code)
+                self._pipeline = KPipeline(lang_code=self.lang_code)
+        return self._pipeline
+
+    def iter_audio(self, text):
+        """
+        Yields audio chunks for text, split on blank lines.
+        """
+        pipeline = self.load()
+        with self._synth_lock:
+            generator = pipeline(text, voice=self.voice, speed=self.speed, split_pattern=r"\n+")
             for chunk_index, (_, _, audio) in enumerate(generator):
-                logger.debug("Writing audio chunk %d to WAV file.", chunk_index)
-                f.write(audio)
-        logger.info("WAV file generated. Converting to MP3 with ffmpeg.")
-        subprocess.run(["ffmpeg", "-y", "-i", temp_wav_path, output_mp3], check=True)
+                logger.debug("Synthesized audio chunk %d.", chunk_index)
+                yield audio
+
+    def start_pcm(self, text):
+        """
+        Starts synthesizing text and returns an iterator of float32 PCM byte
+        chunks, in order, with TTS_PARAGRAPH_PAUSE of silence between
+        paragraphs. With workers > 1 every shard is submitted to the worker
+        pool right away, so several texts can be started before any is read;
+        otherwise synthesis happens lazily in this process as it is read.
+        """
+        shards = split_shards(text)
+        pause = _silence(TTS_PARAGRAPH_PAUSE)
+        if self.workers <= 1:
+            def serial():
+                for index, (shard, starts_paragraph) in enumerate(shards):
+                    if index and starts_paragraph:
+                        yield pause
+                    for audio in self.iter_audio(shard):
+                        yield _to_pcm(audio)
+            return serial()
+
+        def submit(start):
+            pool = _get_tts_pool(self.lang_code, self.workers)
+            try:
+                futures = [pool.submit(_synthesize_shard, shard, self.voice, self.speed) for shard, _ in shards[start:]]
+            except BrokenProcessPool:
+                _reset_tts_pool(pool)
+                raise
+            return pool, futures
+
+        try:
+            pool, futures = submit(0)
+        except BrokenProcessPool:
+            pool, futures = submit(0)
+
+        def sharded():
+            # A worker that dies (e.g. OOM-killed) breaks the whole pool; restart it and resubmit once.
+            nonlocal pool, futures
+            retried = False
+            offset = 0
+            try:
+                for index, (_, starts_paragraph) in enumerate(shards):
+                    if index and starts_paragraph:
+                        yield pause
+                    try:
+                        data = futures[index - offset].result()
+                    except BrokenProcessPool:
+                        if retried:
+                            raise
+                        retried = True
+                        _reset_tts_pool(pool)
+                        pool, futures = submit(index)
+                        offset = index
+                        data = futures[0].result()
+                    yield data
+            finally:
+                for future in futures:
+                    future.cancel()
+        return sharded()
+
+    def synthesize(self, text, output_mp3, pcm=None):
+        """
+        Synthesizes text and encodes it to output_mp3 in a single streaming
+        pass. pcm may be an iterator already returned by start_pcm(text).
+        """
+        logger.info("Starting text-to-speech conversion.")
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "f32le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+            output_mp3,
+        ]
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        try:
+            for data in pcm if pcm is not None else self.start_pcm(text):
+                process.stdin.write(data)
+            process.stdin.close()
+        except BrokenPipeError:
+            logger.error("ffmpeg exited before all audio was written.")
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        returncode = process.wait()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
         logger.info("MP3 file created at %s", output_mp3)
+
+    def synthesize_segments(self, segments, output_mp3, cache_dir=None):
+        """
+        Synthesizes each text segment to its own cached MP3 and joins them into
+        output_mp3 with ffmpeg's concat demuxer, without re-encoding, with
+        TTS_PARAGRAPH_PAUSE of silence between segments. Only
+        segments missing from the audio cache are synthesized; with workers > 1
+        the shards of all of them are queued on the worker pool at once.
+        """
+        cache_dir = cache_dir or AUDIO_CACHE_DIR
+        paths = []
+        missing = []
+        for text in segments:
+            if not text.strip():
+                continue
+            path = os.path.join(cache_dir, f"{self.segment_key(text)}.mp3")
+            record_cache_lookup("audio", os.path.exists(path))
+            if os.path.exists(path):
+                logger.info("Reusing cached audio segment %s.", os.path.basename(path))
+                os.utime(path, None)
+            elif path not in paths:
+                missing.append((text, path))
+            paths.append(path)
+
+        started = {path: self.start_pcm(text) for text, path in missing} if self.workers > 1 else {}
+        for text, path in missing:
+            partial = f"{path[:-4]}.{os.getpid()}.{threading.get_ident()}.partial.mp3"
+            try:
+                with span("tts", chars=len(text)):
+                    self.synthesize(text, partial, pcm=started.get(path))
+                os.replace(partial, path)
+            finally:
+                if os.path.exists(partial):
+                    os.unlink(partial)
+        if TTS_PARAGRAPH_PAUSE > 0 and len(paths) > 1:
+            pause = self._pause_mp3(cache_dir)
+            paths = [path for segment in paths for path in (pause, segment)][1:]
+        concat_mp3(paths, output_mp3)
+        prune_audio_cache(cache_dir, AUDIO_CACHE_MAX_BYTES, keep=paths)
+
+    def _pause_mp3(self, cache_dir):
+        """
+        Returns the cached MP3 of TTS_PARAGRAPH_PAUSE seconds of silence, encoded
+        like the segments so that it can be joined between them.
+        """
+        raw = json.dumps(["pause", SAMPLE_RATE, TTS_PARAGRAPH_PAUSE])
+        path = os.path.join(cache_dir, f"{hashlib.sha256(raw.encode('utf-8')).hexdigest()}.mp3")
+        if not os.path.exists(path):
+            partial = f"{path[:-4]}.{os.getpid()}.{threading.get_ident()}.partial.mp3"
+            try:
+                self.synthesize("", partial, pcm=iter([_silence(TTS_PARAGRAPH_PAUSE)]))
+                os.replace(partial, path)
+            finally:
+                if os.path.exists(partial):
+                    os.unlink(partial)
+        return path
+
+    def stream_mp3(self, segments, chunk_size=16384):
+        """
+        Synthesizes an iterable of text segments and yields MP3 bytes as soon as
+        ffmpeg produces them. Segments are consumed lazily, so audio for the
+        first segment streams out while later segments are still being produced.
+        With workers > 1, each segment is submitted to the worker pool as soon
+        as it arrives, while earlier ones are still being written. Blank
+        segments (such as content.PARAGRAPH_BREAK) become a pause of
+        TTS_PARAGRAPH_PAUSE, as between the paragraphs of a segment.
+
+        A "tts" stage slot is held while each segment is synthesized and
+        written, not while waiting for the next one, so callers must not
+        hold one themselves.
+        """
+        cmd = [
+            "ffmpeg", "-loglevel", "error",
+            "-f", "f32le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+            "-f", "mp3", "-flush_packets", "1", "pipe:1",
+        ]
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        errors = []
+        started = queue.Queue()
+        stopped = threading.Event()
+
+        def produce():
+            # Pulls segments (which may block on the LLM) and starts their synthesis.
+            pause = False
+            spoken = False
+            try:
+                for text in segments:
+                    if stopped.is_set():
+                        break
+                    if not text.strip():
+                        # Runs of breaks make one pause; none before the first words.
+                        pause = spoken
+                        continue
+                    if pause:
+                        started.put(("", iter([_silence(TTS_PARAGRAPH_PAUSE)])))
+                        pause = False
+                    started.put((text, self.start_pcm(text)))
+                    spoken = True
+            except Exception as e:
+                logger.exception("Producing segments for streaming failed: %s", e)
+                errors.append(e)
+            finally:
+                started.put(None)
+                if hasattr(segments, "close"):
+                    segments.close()
+
+        def feed():
+            try:
+                while True:
+                    item = started.get()
+                    if item is None:
+                        break
+                    text, pcm = item
+                    if not text:
+                        for data in pcm:
+                            process.stdin.write(data)
+                        continue
+                    with stage_slot("tts"), span("tts", chars=len(text)):
+                        for data in pcm:
+                            process.stdin.write(data)
+                            process.stdin.flush()
+            except BrokenPipeError:
+                logger.debug("ffmpeg closed its input; stopping synthesis.")
+            except Exception as e:
+                logger.exception("Streaming synthesis failed: %s", e)
+                errors.append(e)
+            finally:
+                stopped.set()
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+
+        threading.Thread(target=produce, name="tts-stream-producer", daemon=True).start()
+
+        feeder = threading.Thread(target=feed, name="tts-stream-feeder", daemon=True)
+        feeder.start()
+        try:
+            while True:
+                data = process.stdout.read1(chunk_size)
+                if not data:
+                    break
+                yield data
+        finally:
+            aborted = process.poll() is None and feeder.is_alive()
+            if aborted:
+                # The consumer went away mid-stream; the feeder stops on its next write.
+                process.kill()
+            process.stdout.close()
+            process.wait()
+            if not aborted:
+                feeder.join()
+        if errors:
+            raise errors[0]
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd)
+
+
+def concat_mp3(paths, output_mp3):
+    """
+    Concatenates MP3 files into output_mp3 by stream copy (no re-encoding).
+    """
+    if not paths:
+        raise ValueError("No audio segments to concatenate.")
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as list_file:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            list_file.write(f"file '{escaped}'\n")
+        list_path = list_file.name
+    try:
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+             "-i", list_path, "-c", "copy", output_mp3],
+            check=True,
+        )
+        logger.info("Concatenated %d audio segments into %s", len(paths), output_mp3)
     finally:
-        if os.path.exists(temp_wav_path):
-            os.unlink(temp_wav_path)
-            logger.debug("Temporary WAV file %s removed.", temp_wav_path)
\ No newline at end of file
+        os.unlink(list_path)
+
+
+def prune_audio_cache(cache_dir, max_bytes, keep=()):
+    """
+    Deletes the least recently used cached segments until the cache fits in max_bytes.
+    Files listed in keep are never removed.
+    """
+    if not max_bytes:
+        return
+    keep = {os.path.abspath(path) for path in keep}
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".mp3") or name.endswith(".partial.mp3"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if os.path.abspath(path) in keep:
+            continue
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        logger.debug("Evicted cached audio segment %s", path)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Returns the process-wide TTSEngine, creating it on first use.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = TTSEngine()
+        return _engine
+
+
+def text_to_speech(text, output_mp3, engine=None):
+    """
+    Converts the provided text to speech and writes it to output_mp3.
+    Uses the shared warm engine unless a specific engine is given.
+    """
+    (engine or get_engine()).synthesize(text, output_mp3)
+
+
+def segments_to_speech(segments, output_mp3, engine=None):
+    """
+    Converts a list of text segments to speech, reusing cached per-segment
+    audio, and writes the joined result to output_mp3.
+    """
+    (engine or get_engine()).synthesize_segments(segments, output_mp3)
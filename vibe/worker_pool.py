@@ -0,0 +1,239 @@
+import os
+import time
+import logging
+import threading
+import multiprocessing
+import concurrent.futures
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of a busy worker's deadline, memory and liveness.
+POLL_SECONDS = 0.5
+# Seconds a retiring worker gets to exit before it is killed.
+STOP_GRACE_SECONDS = 5.0
+
+
+class WorkerError(Exception):
+    """
+    A task failed in its worker process or took it down. reason is "error"
+    (the task raised an exception of class error_type), "timeout", "memory"
+    or "crashed"; in the last three cases the worker is gone.
+    """
+
+    def __init__(self, message, reason, error_type=None):
+        super().__init__(message)
+        self.reason = reason
+        self.error_type = error_type
+
+
+def rss_bytes(pid):
+    """
+    Returns the resident set size of process pid, or None where /proc is not available.
+    """
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _worker_main(conn):
+    """
+    Runs in the worker process: executes (func, args) tasks from conn until
+    told to stop (None) or the parent goes away.
+    """
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        func, args = task
+        try:
+            result = ("ok", func(*args), None)
+        except BaseException as e:  # Docling calls sys.exit on some inputs.
+            result = ("error", f"{type(e).__name__}: {e}", type(e).__name__)
+        try:
+            conn.send(result)
+        except (BrokenPipeError, OSError):
+            return
+
+
+class _Worker:
+    def __init__(self, context, name):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), name=name, daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def run(self, func, args, timeout, max_rss):
+        try:
+            self.conn.send((func, args))
+        except (BrokenPipeError, ConnectionResetError):
+            self.kill()
+            raise WorkerError(f"worker exited with code {self.process.exitcode}", "crashed")
+        deadline = time.monotonic() + timeout if timeout else None
+        while not self.conn.poll(POLL_SECONDS):
+            if not self.process.is_alive():
+                if self.conn.poll():
+                    break
+                self.kill()
+                raise WorkerError(f"worker exited with code {self.process.exitcode}", "crashed")
+            if deadline is not None and time.monotonic() > deadline:
+                self.kill()
+                raise WorkerError(f"no result after {timeout}s", "timeout")
+            rss = rss_bytes(self.process.pid) if max_rss else None
+            if rss and rss > max_rss:
+                self.kill()
+                raise WorkerError(f"worker used {rss / 2 ** 20:.0f} MiB, above the {max_rss / 2 ** 20:.0f} MiB limit",
+                                  "memory")
+        try:
+            status, value, error_type = self.conn.recv()
+        except (EOFError, OSError):
+            self.kill()
+            raise WorkerError("worker exited before returning a result", "crashed")
+        self.tasks += 1
+        if status != "ok":
+            raise WorkerError(value, "error", error_type)
+        return value
+
+    def rss(self):
+        return rss_bytes(self.process.pid)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(STOP_GRACE_SECONDS)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class IsolatedWorkerPool:
+    """
+    Runs module-level functions in up to `workers` spawned worker processes,
+    one task per worker at a time, so that a task that hangs, leaks or
+    crashes cannot take the caller down with it:
+
+      - a task still running after timeout seconds has its worker killed;
+      - a worker whose resident memory exceeds max_rss bytes, while running
+        a task or after it, is killed (mid-task) or retired (after it);
+      - a worker is retired after max_tasks tasks to bound slow leaks.
+
+    Workers are started on demand and replaced as needed. Failures raise
+    WorkerError. Memory is read from /proc, so max_rss only applies on Linux.
+    """
+
+    def __init__(self, workers, timeout=None, max_rss=None, max_tasks=None, name="worker"):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_rss = max_rss
+        self.max_tasks = max_tasks
+        self.name = name
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._spawned = 0
+        self._closed = False
+
+    def _spawn(self):
+        with self._lock:
+            self._spawned += 1
+            name = f"vibe-{self.name}-{self._spawned}"
+        logger.debug("Starting worker process %s.", name)
+        return _Worker(self._context, name)
+
+    def _checkout(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._spawn()
+
+    def _checkin(self, worker):
+        reason = None
+        if self.max_tasks and worker.tasks >= self.max_tasks:
+            reason = "recycled"
+        elif self.max_rss and (worker.rss() or 0) > self.max_rss:
+            reason = "memory"
+        if reason is None:
+            with self._lock:
+                if not self._closed and len(self._idle) < self.workers:
+                    self._idle.append(worker)
+                    return
+            worker.stop()
+            return
+        logger.info("Retiring %s worker after %d tasks (%s).", self.name, worker.tasks, reason)
+        self._count_restart(reason)
+        worker.stop()
+
+    def _count_restart(self, reason):
+        REGISTRY.inc("vibe_worker_restarts_total", help="Worker processes replaced, by pool and reason.",
+                     pool=self.name, reason=reason)
+
+    def run(self, func, *args):
+        """
+        Runs func(*args) in a worker process and returns its result.
+        func and its arguments must be picklable.
+        """
+        with self._slots:
+            worker = self._checkout()
+            try:
+                result = worker.run(func, args, self.timeout, self.max_rss)
+            except WorkerError as e:
+                if e.reason != "error":
+                    logger.warning("%s worker lost (%s): %s", self.name.capitalize(), e.reason, e)
+                    self._count_restart(e.reason)
+                    worker = None
+                raise
+            finally:
+                if worker is not None:
+                    self._checkin(worker)
+            return result
+
+    def warm_up(self, func, *args):
+        """
+        Starts a worker in every free slot and runs func(*args) in each, e.g.
+        to load models. Slots busy with tasks are skipped. Blocks until done.
+        """
+        free = 0
+        while free < self.workers and self._slots.acquire(blocking=False):
+            free += 1
+        try:
+            if not free:
+                return
+            with self._lock:
+                idle, self._idle = self._idle[:free], self._idle[free:]
+            workers = idle + [self._spawn() for _ in range(free - len(idle))]
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(workers)) as executor:
+                futures = [executor.submit(worker.run, func, args, None, None) for worker in workers]
+                concurrent.futures.wait(futures)
+            for worker, future in zip(workers, futures):
+                error = future.exception()
+                if error is None or getattr(error, "reason", None) == "error":
+                    self._checkin(worker)
+            for future in futures:
+                future.result()
+        finally:
+            for _ in range(free):
+                self._slots.release()
+
+    def shutdown(self):
+        """
+        Stops the idle workers; busy ones stop when their task is checked in.
+        """
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()